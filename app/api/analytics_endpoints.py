@@ -0,0 +1,49 @@
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal
+
+from app.json_handler.db_handler import GenericRepo
+from app.api.deps import archive_repo, bookings_repo, cars_repo
+from app.core.executor import run_blocking
+from app.api.responses import RowsResponse
+from app.service import analytics
+
+router = APIRouter(tags=["Analytics"])
+
+Grouping = Literal["car", "seats", "make"]
+
+@router.get("/analytics/utilisation", summary="Share of car-days booked per car, seat class or make")
+async def analytics_utilisation(
+    start: date,
+    end: date,
+    group_by: Grouping = "seats",
+    daily: bool = True,
+    cars_db: GenericRepo = Depends(cars_repo),
+    bookings_db: GenericRepo = Depends(bookings_repo),
+    archive_db: GenericRepo = Depends(archive_repo),
+):
+    try:
+        report = await run_blocking(
+            analytics.utilisation, cars_db, bookings_db, start, end, group_by, daily, archive_repo=archive_db
+        )
+        return RowsResponse(report)
+    except ValueError as ex:
+        raise HTTPException(status_code=400, detail=str(ex))
+
+@router.get("/analytics/revenue", summary="Revenue per car, seat class or make")
+async def analytics_revenue(
+    start: date,
+    end: date,
+    group_by: Grouping = "seats",
+    daily: bool = True,
+    cars_db: GenericRepo = Depends(cars_repo),
+    bookings_db: GenericRepo = Depends(bookings_repo),
+    archive_db: GenericRepo = Depends(archive_repo),
+):
+    try:
+        report = await run_blocking(
+            analytics.revenue, cars_db, bookings_db, start, end, group_by, daily, archive_repo=archive_db
+        )
+        return RowsResponse(report)
+    except ValueError as ex:
+        raise HTTPException(status_code=400, detail=str(ex))
@@ -1,39 +1,70 @@
-from fastapi import APIRouter, HTTPException
-from pathlib import Path
-from typing import List
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Literal, Optional
 import logging
 
-from app.models.schemas import Booking, BookingCreate, BookingCreateBySeats, BookingWithPrice
-from app.json_handler.json_store import JSONStore
+from app.models.schemas import (
+    Booking, BookingCreate, BookingCreateBySeats, BookingWithPrice, BatchBookingRequest, BatchBookingResult,
+    BookingCancelRequest, BookingCancelResult,
+)
 from app.json_handler.db_handler import GenericRepo
-from app.service.booking_service import ensure_available_and_create_booking, book_by_seats
+from app.api.deps import archive_repo, bookings_repo, cars_repo
+from app.json_handler.async_repo import AsyncRepo
+from app.core.executor import run_blocking
+from app.api.paging import MAX_PAGE, list_page
+from app.api.responses import RowsResponse
+from app.service.allocation import ALLOCATION_STRATEGY
+from app.service.booking_service import (
+    ALTERNATIVES_LIMIT, ALTERNATIVES_RANK, ensure_available_and_create_booking, book_by_seats, create_bookings_batch,
+    cancel_bookings,
+)
 
 router = APIRouter(tags=["Bookings"])
 logger = logging.getLogger("app.booking_endpoint")
 
-def cars_repo() -> GenericRepo:
-    return GenericRepo(JSONStore(Path("data/cars.json")))
-
-def bookings_repo() -> GenericRepo:
-    return GenericRepo(JSONStore(Path("data/bookings.json")))
+MAX_ALTERNATIVES = 20
 
 @router.get("/bookings", response_model=List[Booking])
-def list_bookings():
-    rows = bookings_repo().list()
-    logger.info("list_bookings count=%d", len(rows))
-    return rows
+async def list_bookings(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE),
+    after_id: int = Query(0, ge=0),
+    format: Literal["json", "ndjson"] = "json",
+    bookings_db: GenericRepo = Depends(bookings_repo),
+):
+    resp, count = await run_blocking(list_page, bookings_db, limit, after_id, format)
+    if count is not None:
+        logger.info("list_bookings count=%d after_id=%s", count, after_id)
+    return resp
 
 @router.get("/bookings/by-car/{car_id}", response_model=List[Booking])
-def bookings_by_car(car_id: int):
-    rows = [b for b in bookings_repo().list() if b["car_id"] == car_id]
+async def bookings_by_car(
+    car_id: int, start: Optional[date] = None, end: Optional[date] = None,
+    bookings_db: GenericRepo = Depends(bookings_repo),
+):
+    # Optional window: bookings overlapping [start, end] (inclusive).
+    window = {}
+    if start:
+        window["end_date__gte"] = start
+    if end:
+        window["start_date__lte"] = end
+    rows = await AsyncRepo(bookings_db).find(car_id=car_id, **window)
     logger.info("bookings_by_car car_id=%s count=%d", car_id, len(rows))
-    return rows
+    return RowsResponse(rows)
 
 @router.post("/bookings", response_model=BookingWithPrice, status_code=201)
-def create_booking(body: BookingCreate):
+async def create_booking(
+    body: BookingCreate,
+    alternatives: int = Query(ALTERNATIVES_LIMIT, ge=0, le=MAX_ALTERNATIVES),
+    rank: Literal["price", "nearest_price", "same_make"] = ALTERNATIVES_RANK,
+    cars_db: GenericRepo = Depends(cars_repo),
+    bookings_db: GenericRepo = Depends(bookings_repo),
+    archive_db: GenericRepo = Depends(archive_repo),
+):
     try:
-        created = ensure_available_and_create_booking(
-            cars_repo(), bookings_repo(), body.car_id, body.start_date, body.end_date
+        created = await run_blocking(
+            ensure_available_and_create_booking,
+            cars_db, bookings_db, body.car_id, body.start_date, body.end_date,
+            alternatives_limit=alternatives, alternatives_rank=rank, archive_repo=archive_db
         )
         return created
     except ValueError as ex:
@@ -41,31 +72,78 @@ def create_booking(body: BookingCreate):
         raise HTTPException(status_code=400, detail=detail)
 
 @router.post("/bookings/by-seats", response_model=BookingWithPrice, status_code=201)
-def create_booking_by_seats(body: BookingCreateBySeats):
+async def create_booking_by_seats(
+    body: BookingCreateBySeats,
+    strategy: Literal["first_fit", "best_fit", "cheapest"] = ALLOCATION_STRATEGY,
+    allow_larger: bool = False,
+    cars_db: GenericRepo = Depends(cars_repo),
+    bookings_db: GenericRepo = Depends(bookings_repo),
+    archive_db: GenericRepo = Depends(archive_repo),
+):
     try:
-        created = book_by_seats(
-            cars_repo(), bookings_repo(),
+        created = await run_blocking(
+            book_by_seats,
+            cars_db, bookings_db,
             seats=body.seats,
             start=body.start_date,
-            end=body.end_date
+            end=body.end_date,
+            strategy=strategy,
+            allow_larger=allow_larger,
+            archive_repo=archive_db
         )
         logger.info(
-            "booking_by_seats_success id=%s seats=%s start=%s end=%s",
-            created["id"], body.seats, body.start_date.isoformat(), body.end_date.isoformat()
+            "booking_by_seats_success id=%s car_id=%s seats=%s start=%s end=%s",
+            created["id"], created["car_id"], body.seats, body.start_date.isoformat(), body.end_date.isoformat()
         )
         return created
     except ValueError as ex:
         raise HTTPException(status_code=400, detail=str(ex))
 
+@router.post("/bookings/batch", response_model=BatchBookingResult, status_code=201)
+async def create_bookings_batch_endpoint(
+    body: BatchBookingRequest,
+    cars_db: GenericRepo = Depends(cars_repo),
+    bookings_db: GenericRepo = Depends(bookings_repo),
+    archive_db: GenericRepo = Depends(archive_repo),
+):
+    items = [item.model_dump() for item in body.items]
+    created, failed = await run_blocking(
+        create_bookings_batch, cars_db, bookings_db, items,
+        all_or_nothing=body.mode == "all_or_nothing", archive_repo=archive_db
+    )
+    if failed and body.mode == "all_or_nothing":
+        raise HTTPException(status_code=400, detail={"message": "Batch rejected, nothing was booked", "failed": failed})
+    return {"created": created, "failed": failed}
+
+@router.delete("/bookings", response_model=BookingCancelResult, summary="Cancel bookings by id and/or filter")
+async def cancel_bookings_endpoint(
+    body: BookingCancelRequest,
+    bookings_db: GenericRepo = Depends(bookings_repo),
+    archive_db: GenericRepo = Depends(archive_repo),
+):
+    try:
+        cancelled = await run_blocking(
+            cancel_bookings, bookings_db,
+            ids=body.ids, car_id=body.car_id, start=body.start_date, end=body.end_date, archive_repo=archive_db
+        )
+    except ValueError as ex:
+        raise HTTPException(status_code=400, detail=str(ex))
+    return RowsResponse({"cancelled": cancelled})
+
 @router.delete("/bookings/{booking_id}", status_code=204, summary="Cancel a booking")
-def delete_booking(booking_id: int):
-    repo = bookings_repo()
-    booking = repo.get(booking_id)
-    if not booking:
+async def delete_booking(
+    booking_id: int,
+    bookings_db: GenericRepo = Depends(bookings_repo),
+    archive_db: GenericRepo = Depends(archive_repo),
+):
+    # The delete itself returns the removed booking, from the hot table or,
+    # once compacted, from the archive.
+    deleted = await run_blocking(cancel_bookings, bookings_db, ids=[booking_id], archive_repo=archive_db)
+    if not deleted:
         logger.warning("delete_booking_failed id=%s not_found", booking_id)
         raise HTTPException(status_code=404, detail="Booking not found")
 
-    repo.delete(booking_id)
+    booking = deleted[0]
     logger.info(
         "delete_booking_success id=%s car_id=%s start=%s end=%s",
         booking_id, booking["car_id"], booking["start_date"], booking["end_date"]
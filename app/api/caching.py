@@ -0,0 +1,56 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+from fastapi import Request, Response
+
+from app.core.metrics import RESPONSE_CACHE
+
+CACHE_CONTROL = os.getenv("HTTP_CACHE_CONTROL", "no-cache")
+AVAILABLE_CACHE_SIZE = int(os.getenv("AVAILABLE_CACHE_SIZE", "256"))
+
+# Strong ETag from table versions, e.g. etag(c=4, b=17) -> '"c4-b17"'. Take it
+# before reading the data: a response may then carry an older tag than its
+# content (the next request just misses), never a newer one.
+def etag(**versions: int) -> str:
+    return '"' + "-".join(f"{k}{v}" for k, v in versions.items()) + '"'
+
+def cache_headers(tag: str) -> Dict[str, str]:
+    return {"ETag": tag, "Cache-Control": CACHE_CONTROL}
+
+# A 304 if the request's If-None-Match lists `tag` (or is "*"), else None.
+def not_modified(request: Request, tag: str) -> Optional[Response]:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    if "*" in tags or tag in tags:
+        return Response(status_code=304, headers=cache_headers(tag))
+    return None
+
+# Rendered response bodies, least recently used evicted first. Keys include the
+# table versions the body was built from, so entries never go stale; they are
+# just no longer asked for.
+class ResponseCache:
+    def __init__(self, name: str, size: int = AVAILABLE_CACHE_SIZE):
+        self.size = size
+        self.entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self.mutex = threading.Lock()
+        self.hits = RESPONSE_CACHE.labels(name, "hit")
+        self.misses = RESPONSE_CACHE.labels(name, "miss")
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self.mutex:
+            body = self.entries.get(key)
+            if body is not None:
+                self.entries.move_to_end(key)
+        (self.hits if body is not None else self.misses).inc()
+        return body
+
+    def put(self, key: Hashable, body: bytes) -> None:
+        with self.mutex:
+            self.entries[key] = body
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
@@ -1,48 +1,99 @@
 import logging
 from datetime import date
-from fastapi import APIRouter, HTTPException
-from pathlib import Path
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import List, Literal, Optional
 
 from app.models.schemas import Car, CarCreate
-from app.json_handler.json_store import JSONStore
 from app.json_handler.db_handler import GenericRepo
-from app.service.booking_service import list_available_cars_for_period
+from app.api.caching import ResponseCache, cache_headers, etag, not_modified
+from app.api.deps import archive_repo, available_cache, bookings_repo, cars_repo
+from app.json_handler.async_repo import AsyncRepo
+from app.core.executor import run_blocking
+from app.api.paging import MAX_PAGE, list_page
+from app.api.responses import RowsResponse
+from app.service.booking_service import list_available_cars_for_period, availability_calendar
 
 router = APIRouter(tags=["Cars"])
 logger = logging.getLogger("app.cars")
 
-def cars_repo() -> GenericRepo:
-    return GenericRepo(JSONStore(Path("data/cars.json")))
-
-def bookings_repo() -> GenericRepo:
-    return GenericRepo(JSONStore(Path("data/bookings.json")))
+def _versions(*repos: GenericRepo) -> tuple:
+    return tuple(r.version() for r in repos)
 
+# The read endpoints below tag responses with the versions of the tables they
+# read (ETag) and answer a matching If-None-Match with 304 before touching the
+# data. Available-car bodies are also kept in an LRU keyed by
+# (start, end, cars version, bookings version, archive version).
 @router.get("/cars/available", summary="List available cars for a period")
-def cars_available(start: date, end: date):
+async def cars_available(
+    start: date,
+    end: date,
+    request: Request,
+    cars_db: GenericRepo = Depends(cars_repo),
+    bookings_db: GenericRepo = Depends(bookings_repo),
+    archive_db: GenericRepo = Depends(archive_repo),
+    cache: ResponseCache = Depends(available_cache),
+):
+    cv, bv, av = await run_blocking(_versions, cars_db, bookings_db, archive_db)
+    tag = etag(c=cv, b=bv, a=av)
+    if (resp := not_modified(request, tag)) is not None:
+        return resp
+    key = (start, end, cv, bv, av)
+    body = cache.get(key)
+    if body is not None:
+        return Response(body, media_type="application/json", headers=cache_headers(tag))
+    try:
+        cars = await run_blocking(list_available_cars_for_period, cars_db, bookings_db, start, end, archive_db)
+    except ValueError as ex:
+        raise HTTPException(status_code=400, detail=str(ex))
+    resp = RowsResponse({"start": start, "end": end, "cars": cars}, headers=cache_headers(tag))
+    cache.put(key, resp.body)
+    return resp
+
+@router.get("/cars/availability-calendar", summary="Per-day availability of every car for a period")
+async def cars_availability_calendar(
+    start: date,
+    end: date,
+    cars_db: GenericRepo = Depends(cars_repo),
+    bookings_db: GenericRepo = Depends(bookings_repo),
+    archive_db: GenericRepo = Depends(archive_repo),
+):
     try:
-        cars = list_available_cars_for_period(cars_repo(), bookings_repo(), start, end)
-        return {"start": start, "end": end, "cars": cars}
+        calendar = await run_blocking(availability_calendar, cars_db, bookings_db, start, end, archive_db)
+        return RowsResponse(calendar)
     except ValueError as ex:
         raise HTTPException(status_code=400, detail=str(ex))
 
 @router.get("/cars", response_model=List[Car])
-def list_cars():
-    rows = cars_repo().list()
-    logger.info("list_cars count=%d", len(rows))
-    return rows
+async def list_cars(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE),
+    after_id: int = Query(0, ge=0),
+    format: Literal["json", "ndjson"] = "json",
+    cars_db: GenericRepo = Depends(cars_repo),
+):
+    tag = etag(c=await run_blocking(cars_db.version))
+    if (resp := not_modified(request, tag)) is not None:
+        return resp
+    resp, count = await run_blocking(list_page, cars_db, limit, after_id, format)
+    resp.headers.update(cache_headers(tag))
+    if count is not None:
+        logger.info("list_cars count=%d after_id=%s", count, after_id)
+    return resp
 
 @router.get("/cars/{car_id}", response_model=Car)
-def get_car(car_id: int):
-    car = cars_repo().get(car_id)
+async def get_car(car_id: int, request: Request, cars_db: GenericRepo = Depends(cars_repo)):
+    tag = etag(c=await run_blocking(cars_db.version))
+    if (resp := not_modified(request, tag)) is not None:
+        return resp
+    car = await AsyncRepo(cars_db).get(car_id)
     if not car:
         logger.info("get_car not_found id=%s", car_id)
         raise HTTPException(status_code=404, detail="Car not found")
     logger.info("get_car ok id=%s", car_id)
-    return car
+    return RowsResponse(car, headers=cache_headers(tag))
 
 @router.post("/cars", response_model=Car, status_code=201)
-def create_car(body: CarCreate):
-    created = cars_repo().insert(body.model_dump())
+async def create_car(body: CarCreate, cars_db: GenericRepo = Depends(cars_repo)):
+    created = await AsyncRepo(cars_db).insert(body.model_dump())
     logger.info("create_car ok id=%s make=%s model=%s", created["id"], created.get("make"), created.get("model"))
     return created
\ No newline at end of file
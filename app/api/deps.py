@@ -0,0 +1,49 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from fastapi import Depends, Request
+
+from app.api.caching import ResponseCache
+from app.json_handler.db_handler import GenericRepo
+from app.json_handler.factory import DATA_DIR, open_store
+
+@dataclass
+class Repos:
+    cars: GenericRepo
+    bookings: GenericRepo
+    bookings_archive: GenericRepo  # past bookings moved out by the compactor
+    data_dir: Path = DATA_DIR
+    available_cache: ResponseCache = field(default_factory=lambda: ResponseCache("cars_available"))
+
+    def close(self) -> None:
+        for repo in (self.cars, self.bookings, self.bookings_archive):
+            close = getattr(repo.store, "close", None)
+            if close is not None:
+                close()
+
+def build_repos(data_dir: Optional[Path] = None) -> Repos:
+    data_dir = DATA_DIR if data_dir is None else data_dir
+    return Repos(cars=GenericRepo(open_store("cars", data_dir)),
+                 bookings=GenericRepo(open_store("bookings", data_dir)),
+                 bookings_archive=GenericRepo(open_store("bookings_archive", data_dir)),
+                 data_dir=data_dir)
+
+# Repositories are built once in the app lifespan (app.state.repos) and shared
+# by every request. An app driven without its lifespan, e.g. TestClient(app)
+# outside a `with` block, gets fresh ones per request.
+async def get_repos(request: Request) -> Repos:
+    repos = getattr(request.app.state, "repos", None)
+    return repos if repos is not None else build_repos()
+
+async def cars_repo(repos: Repos = Depends(get_repos)) -> GenericRepo:
+    return repos.cars
+
+async def bookings_repo(repos: Repos = Depends(get_repos)) -> GenericRepo:
+    return repos.bookings
+
+async def archive_repo(repos: Repos = Depends(get_repos)) -> GenericRepo:
+    return repos.bookings_archive
+
+async def available_cache(repos: Repos = Depends(get_repos)) -> ResponseCache:
+    return repos.available_cache
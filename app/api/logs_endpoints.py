@@ -1,15 +1,120 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from fastapi.responses import PlainTextResponse, StreamingResponse
+from pathlib import Path
+from typing import AsyncIterator, List, Optional
+from app.core.executor import run_blocking
 from app.core.logger import LOG_FILE
 import asyncio, os
 
 router = APIRouter(tags=["Admin Pannel"])
 
+MAX_TAIL = 5000
+_BLOCK = 64 * 1024
+_POLL = 0.5
+_KEEPALIVE = 15.0
+
+# Last `n` lines of a file, read backwards from EOF in fixed blocks so only the
+# tail is ever loaded, whatever the file size.
+def tail_lines(path: Path, n: int, block: int = _BLOCK) -> List[str]:
+    with path.open("rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        buf = b""
+        # n + 1 newlines guarantee n complete lines (one may terminate the file).
+        while pos > 0 and buf.count(b"\n") <= n:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+    lines = buf.decode("utf-8", errors="replace").splitlines(keepends=True)
+    return lines[-n:] if n else []
+
+# Reads of a followed file, one bounded step at a time: each call stats the
+# file, reopens it after a rotation (new inode) or truncation and returns at
+# most _BLOCK new bytes. The old file is drained before switching to the new
+# one. A file that exists on the first call is followed from EOF; one created
+# later, like every file after a rotation, is read from the start.
+class _Follower:
+    def __init__(self, path: Path):
+        self.path = path
+        self.f = None
+        self.ino: Optional[int] = None
+        self.at_start = True
+
+    def read(self) -> bytes:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            st = None
+        if st is not None and (self.f is None or st.st_ino != self.ino or st.st_size < self.f.tell()):
+            if self.f is not None:
+                # Drain whatever was written to the old file before rotation.
+                chunk = self.f.read(_BLOCK)
+                if chunk:
+                    return chunk
+                self.f.close()
+            self.f, self.ino = self.path.open("rb"), st.st_ino
+            if self.at_start:
+                self.f.seek(0, os.SEEK_END)
+        self.at_start = False
+        return self.f.read(_BLOCK) if self.f is not None else b""
+
+    def close(self) -> None:
+        if self.f is not None:
+            self.f.close()
+
+# Follows `path` like `tail -F` (see _Follower) and yields complete lines as
+# they are appended. File access runs on the store I/O pool, so a burst of log
+# output or a large rotated file never blocks the event loop.
+# Each idle poll yields None, so callers get a chance to notice a disconnect.
+async def follow(path: Path, poll: float = _POLL) -> AsyncIterator[Optional[str]]:
+    follower = _Follower(path)
+    partial = b""
+    try:
+        while True:
+            chunk = await run_blocking(follower.read)
+            partial += chunk
+            if b"\n" in partial:
+                done, _, partial = partial.rpartition(b"\n")
+                for raw in done.split(b"\n"):
+                    yield raw.decode("utf-8", errors="replace")
+            elif not chunk:
+                await asyncio.sleep(poll)
+                yield None
+    finally:
+        follower.close()
+
+def _event(line: str) -> str:
+    return f"data: {line}\n\n"
+
 @router.get("/logs", response_class=PlainTextResponse)
 def tail_logs(n: int = 200):
     if not LOG_FILE.exists():
         return ""
-    with LOG_FILE.open("r", encoding="utf-8") as f:
-        lines = f.readlines()
-    n = max(1, min(n, 5000))
-    return "".join(lines[-n:])
\ No newline at end of file
+    return "".join(tail_lines(LOG_FILE, max(1, min(n, MAX_TAIL))))
+
+# Server-sent events: the last `n` lines, then every new line as it is logged.
+# Idle connections get a comment line every few seconds, and the stream ends
+# when the client disconnects.
+@router.get("/logs/stream", summary="Follow the application log (server-sent events)")
+async def stream_logs(request: Request, n: int = 0):
+    n = max(0, min(n, MAX_TAIL))
+
+    async def events():
+        if n and await run_blocking(LOG_FILE.exists):
+            for line in await run_blocking(tail_lines, LOG_FILE, n):
+                yield _event(line.rstrip("\n"))
+        idle = 0.0
+        async for line in follow(LOG_FILE):
+            if line is not None:
+                idle = 0.0
+                yield _event(line)
+                continue
+            if await request.is_disconnected():
+                return
+            idle += _POLL
+            if idle >= _KEEPALIVE:
+                idle = 0.0
+                yield ": keepalive\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
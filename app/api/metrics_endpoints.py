@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.core import metrics
+
+router = APIRouter(tags=["Admin Pannel"])
+
+# Prometheus text exposition format 0.0.4.
+@router.get("/metrics", response_class=PlainTextResponse, summary="Request and store metrics (Prometheus)")
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,32 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+
+from app.api.responses import RowsResponse
+from app.json_handler import codec
+from app.json_handler.db_handler import GenericRepo
+
+MAX_PAGE = 1000
+NEXT_CURSOR_HEADER = "X-Next-After-Id"
+
+def _ndjson(rows: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    for row in rows:
+        yield codec.dumps(row) + b"\n"
+
+# Shared by the list endpoints:
+# - no paging arguments: every row (the original behaviour);
+# - limit/after_id: one keyset page, with the cursor for the next page in the
+#   X-Next-After-Id header when the page is full;
+# - format=ndjson: every row after `after_id` streamed one JSON object per line,
+#   read from the store page by page so memory stays bounded.
+# Returns the response and the number of rows in it (None when streamed).
+def list_page(repo: GenericRepo, limit: Optional[int], after_id: int, fmt: str) -> Tuple[Response, Optional[int]]:
+    if fmt == "ndjson":
+        return StreamingResponse(_ndjson(repo.stream(after_id=after_id)), media_type="application/x-ndjson"), None
+    if limit is None and not after_id:
+        rows = repo.list()
+        return RowsResponse(rows), len(rows)
+    rows: List[Dict[str, Any]] = repo.find(id__gt=after_id, limit=limit or MAX_PAGE)
+    headers = {NEXT_CURSOR_HEADER: str(rows[-1]["id"])} if len(rows) == (limit or MAX_PAGE) else None
+    return RowsResponse(rows, headers=headers), len(rows)
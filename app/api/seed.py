@@ -1,28 +1,22 @@
 import json
 import logging
-from pathlib import Path
-from fastapi import APIRouter
+import time
+from datetime import date
+from fastapi import APIRouter, Depends, Query
 
-from app.json_handler.json_store import JSONStore
 from app.json_handler.db_handler import GenericRepo
+from app.api.deps import archive_repo, bookings_repo, cars_repo
+from app.service.fleet_generator import generate_bookings, generate_cars
 
 router = APIRouter(tags=["Admin Pannel"])
 logger = logging.getLogger("app.seed")
 
-DATA_CARS = Path("data/cars.json")
-
-def cars_repo() -> GenericRepo:
-    return GenericRepo(JSONStore(DATA_CARS))
-
 @router.post("/seed/cars")
-def seed_cars(reset: bool = False):
-    DATA_CARS.parent.mkdir(parents=True, exist_ok=True)
-
+def seed_cars(reset: bool = False, repo: GenericRepo = Depends(cars_repo)):
     if reset:
-        DATA_CARS.write_text('{ "_meta": { "seq": 0 }, "items": {} }', encoding="utf-8")
+        repo.store.write({"_meta": {"seq": 0}, "items": {}})
         logger.info("seed_cars reset=true: cars.json cleared")
 
-    repo = cars_repo()
     existing = repo.list()
     if existing and not reset:
         logger.info("seed_cars skipped: already populated count=%d", len(existing))
@@ -35,4 +29,26 @@ def seed_cars(reset: bool = False):
     ]
     created = [repo.insert(car) for car in seed]
     logger.info("seed_cars done: reset=%s inserted=%d", reset, len(created))
-    return {"inserted": len(created), "cars": created}
\ No newline at end of file
+    return {"inserted": len(created), "cars": created}
+
+# Replaces both tables with a generated fleet and booking history (see
+# app/service/fleet_generator.py); each table is written in one store write.
+@router.post("/seed/fleet", summary="Replace cars and bookings with generated data")
+def seed_fleet(
+    cars: int = Query(1000, ge=1, le=100_000),
+    bookings: int = Query(0, ge=0, le=5_000_000),
+    seed: int = 42,
+    start: date = date(2025, 1, 1),
+    cars_db: GenericRepo = Depends(cars_repo),
+    bookings_db: GenericRepo = Depends(bookings_repo),
+    archive_db: GenericRepo = Depends(archive_repo),
+):
+    t0 = time.perf_counter()
+    car_items = generate_cars(cars, seed)
+    booking_items = generate_bookings([int(k) for k in car_items], bookings, start, seed)
+    cars_db.store.write({"_meta": {"seq": cars}, "items": car_items})
+    bookings_db.store.write({"_meta": {"seq": bookings}, "items": booking_items})
+    archive_db.store.write({"_meta": {"seq": 0}, "items": {}})
+    elapsed = round(time.perf_counter() - t0, 3)
+    logger.info("seed_fleet done: cars=%d bookings=%d seed=%d seconds=%s", cars, bookings, seed, elapsed)
+    return {"cars": cars, "bookings": bookings, "seed": seed, "seconds": elapsed}
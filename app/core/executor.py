@@ -0,0 +1,33 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Pool for blocking store work (file I/O, lock waits, SQLite calls) issued from
+# async endpoints, sized with STORE_IO_WORKERS. Kept separate from Starlette's
+# threadpool so slow lock holders cannot starve request handling.
+_executor: Optional[ThreadPoolExecutor] = None
+_guard = threading.Lock()
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _guard:
+        if _executor is None:
+            workers = int(os.getenv("STORE_IO_WORKERS", "32"))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="store-io")
+        return _executor
+
+async def run_blocking(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), partial(fn, *args, **kwargs))
+
+def shutdown_executor() -> None:
+    global _executor
+    with _guard:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
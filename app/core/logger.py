@@ -1,25 +1,80 @@
+from datetime import datetime, timezone
+from logging.handlers import (QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler,
+                              WatchedFileHandler)
 from pathlib import Path
-import logging
+from typing import Optional
+import atexit, json, logging, os, queue
 
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 LOG_DIR = PROJECT_ROOT / "data"
-LOG_FILE = LOG_DIR / "app.log"
+LOG_FILE = Path(os.getenv("LOG_FILE", str(LOG_DIR / "app.log")))
 _FMT = "%(asctime)s %(levelname)s %(name)s - %(message)s"
 
-def init_logging() -> None:
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+
+# One JSON object per line: ts, level, logger, msg. Tracebacks are already
+# part of msg by the time a record leaves the queue.
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        return json.dumps(out, ensure_ascii=False)
+
+# LOG_ROTATE=size (default) rolls the file at LOG_MAX_BYTES; LOG_ROTATE=time
+# rolls it at LOG_WHEN (e.g. midnight). LOG_BACKUPS old files are kept.
+# LOG_ROTATE=external only appends and leaves rotation to e.g. logrotate: the
+# handler reopens the file once it has been moved. Rotating handlers roll the
+# file from whichever process decides to while the other workers keep writing
+# to the renamed one, so with WORKERS>1 the file is always opened this way.
+def _file_handler(path: Path) -> logging.Handler:
+    rotate = os.getenv("LOG_ROTATE", "size")
+    if rotate == "external" or int(os.getenv("WORKERS", "1")) > 1:
+        return WatchedFileHandler(path, encoding="utf-8")
+    backups = int(os.getenv("LOG_BACKUPS", "5"))
+    if rotate == "time":
+        return TimedRotatingFileHandler(path, when=os.getenv("LOG_WHEN", "midnight"),
+                                        backupCount=backups, encoding="utf-8")
+    return RotatingFileHandler(path, maxBytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+                               backupCount=backups, encoding="utf-8")
+
+# The root logger only gets a QueueHandler, so a log call on the request path is
+# a queue put; formatting and console/file I/O happen on the listener thread.
+# LOG_FORMAT=json switches the output to JSON lines, LOG_LEVEL sets the level.
+def init_logging(log_file: Path = LOG_FILE) -> None:
+    global _listener, _queue_handler
     root = logging.getLogger()
     if root.handlers:
         return
 
-    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    log_file.parent.mkdir(parents=True, exist_ok=True)
 
-    root.setLevel(logging.INFO)
-    fmt = logging.Formatter(_FMT)
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    fmt = JsonFormatter() if os.getenv("LOG_FORMAT", "text") == "json" else logging.Formatter(_FMT)
 
     sh = logging.StreamHandler()
     sh.setFormatter(fmt)
-    root.addHandler(sh)
-
-    fh = logging.FileHandler(LOG_FILE, encoding="utf-8")
+    fh = _file_handler(log_file)
     fh.setFormatter(fmt)
-    root.addHandler(fh)
\ No newline at end of file
+
+    q: queue.SimpleQueue = queue.SimpleQueue()
+    _queue_handler = QueueHandler(q)
+    root.addHandler(_queue_handler)
+    _listener = QueueListener(q, sh, fh, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+# Flushes queued records and closes the handlers.
+def shutdown_logging() -> None:
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener.stop()
+    for h in _listener.handlers:
+        h.close()
+    _listener = _queue_handler = None
@@ -0,0 +1,184 @@
+from bisect import bisect_left
+from time import perf_counter
+from typing import Dict, List, Sequence, Tuple
+import threading
+
+# Minimal Prometheus-style metrics. A metric's labelled children are created
+# once and kept (callers cache them), so recording a value is a lock and a few
+# integer/float updates with no allocation.
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REGISTRY: List["_Metric"] = []
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            out.extend(self._render_child(values, child))
+        return out
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def _render_child(self, values, child) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, values)} {child.value:g}"]
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def _render_child(self, values, child) -> List[str]:
+        with child._lock:
+            counts, total = list(child.counts), child.sum
+        out, acc = [], 0
+        for bound, n in zip((*self.buckets, float("inf")), counts):
+            acc += n
+            le = 'le="+Inf"' if bound == float("inf") else f'le="{bound:g}"'
+            out.append(f"{self.name}_bucket{_labels(self.labelnames, values, le)} {acc}")
+        out.append(f"{self.name}_sum{_labels(self.labelnames, values)} {total:g}")
+        out.append(f"{self.name}_count{_labels(self.labelnames, values)} {acc}")
+        return out
+
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "Request latency by route template.", ("method", "route"))
+HTTP_REQUESTS = Counter("http_requests_total", "Responses by route template and status.", ("method", "route", "status"))
+STORE_SECONDS = Histogram("store_operation_duration_seconds",
+                          "Store operation latency (read: any read incl. cache hits, load: file parse, write: file write).",
+                          ("store", "op"))
+LOCK_WAIT = Histogram("store_lock_wait_seconds", "Time spent waiting to acquire a store file lock.", ("store", "lock"))
+BYTES_READ = Counter("store_bytes_read_total", "Bytes read from store files.", ("store",))
+BYTES_WRITTEN = Counter("store_bytes_written_total", "Bytes written to store files.", ("store",))
+RESPONSE_CACHE = Counter("response_cache_requests_total", "Server-side response cache lookups.", ("cache", "result"))
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# Context manager around a FileLock that records how long acquiring it took.
+class TimedLock:
+    __slots__ = ("lock", "_wait")
+
+    def __init__(self, lock, store: str, kind: str):
+        self.lock = lock
+        self._wait = LOCK_WAIT.labels(store, kind)
+
+    def __enter__(self):
+        t0 = perf_counter()
+        self.lock.acquire()
+        self._wait.observe(perf_counter() - t0)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.lock.release()
+
+# ASGI middleware recording latency and status per matched route template
+# (e.g. /cars/{car_id}) rather than the raw path, so the label set stays bounded.
+# Full route template for the `route` label, e.g. "/api/cars/{car_id}". Routes
+# of a router included with a prefix only carry their own relative path, so the
+# prefix is taken from the request path: the shortest leading part after which
+# the route's pattern matches the rest.
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    if route is None:
+        return "<unmatched>"
+    path = scope["path"]
+    for i, ch in enumerate(path):
+        if ch == "/" and route.path_regex.match(path[i:]):
+            return path[:i] + route.path
+    return route.path
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self._children: Dict[Tuple[str, str], Tuple[_HistogramChild, Dict[int, _CounterChild]]] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        t0 = perf_counter()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            elapsed = perf_counter() - t0
+            key = (scope["method"], _route_label(scope))
+            entry = self._children.get(key)
+            if entry is None:
+                entry = self._children[key] = (HTTP_LATENCY.labels(*key), {})
+            entry[0].observe(elapsed)
+            counter = entry[1].get(status)
+            if counter is None:
+                counter = entry[1][status] = HTTP_REQUESTS.labels(*key, str(status))
+            counter.inc()
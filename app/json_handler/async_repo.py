@@ -0,0 +1,26 @@
+from typing import Any, Dict, List, Optional
+
+from app.core.executor import run_blocking
+from .db_handler import GenericRepo
+
+# Awaitable facade over GenericRepo for async endpoints: every call runs on the
+# store I/O executor, so file reads, lock waits and SQLite calls never block
+# the event loop.
+class AsyncRepo:
+    def __init__(self, repo: GenericRepo):
+        self.repo = repo
+
+    async def list(self) -> List[Dict[str, Any]]:
+        return await run_blocking(self.repo.list)
+
+    async def get(self, id_: int) -> Optional[Dict[str, Any]]:
+        return await run_blocking(self.repo.get, id_)
+
+    async def find(self, **kwargs: Any) -> List[Dict[str, Any]]:
+        return await run_blocking(self.repo.find, **kwargs)
+
+    async def insert(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        return await run_blocking(self.repo.insert, doc)
+
+    async def delete(self, id_: int) -> bool:
+        return await run_blocking(self.repo.delete, id_)
@@ -0,0 +1,439 @@
+from datetime import date
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import mmap, os, re, struct, tempfile, threading, zlib
+from filelock import FileLock
+
+from app.core.metrics import BYTES_WRITTEN, TimedLock
+from .json_store import Op, STRIPES
+from .query import OPS, Query, Row
+from .views import Change, ViewSet
+
+# File layout (little endian):
+#   preamble   magic, base id, capacity, retired flag                32 bytes
+#   header 0/1 gen, seq, count, version, crc32                       2 x 64 bytes
+#   bitmap 0/1 one "live" bit per record slot                        2 x capacity / 8
+#   records    (id, car_id, start, end, days) int32, dates as day   capacity x 20 bytes
+#              ordinals; booking `id` lives in slot id - base
+MAGIC = b"BKBIN001"
+_PRE = struct.Struct("<8sQQI4x")
+_RETIRED = struct.Struct("<I")
+_RETIRED_AT = 24
+_HDR = struct.Struct("<QQQQ")
+_CRC = struct.Struct("<I")
+_HDR_AT = _PRE.size
+_HDR_SLOT = 64
+RECORD = struct.Struct("<5i")
+MIN_CAPACITY = 1024
+
+FIELDS = ("car_id", "start_date", "end_date", "days")
+_COLUMNS = {"id": 0, "car_id": 1, "start_date": 2, "end_date": 3, "days": 4}
+_DATES = (2, 3)
+_NONZERO = re.compile(rb"[^\x00]")
+
+Header = Tuple[int, int, int, int]  # (gen, seq, count, version)
+Record = Tuple[int, int, int, int, int]  # (id, car_id, start, end, days)
+
+@lru_cache(maxsize=1 << 16)
+def _ord(value: str) -> int:
+    return date.fromisoformat(value).toordinal()
+
+@lru_cache(maxsize=1 << 16)
+def _iso(day: int) -> str:
+    return date.fromordinal(day).isoformat()
+
+# Booking document -> record fields. Only the booking fields fit in a record;
+# `days` defaults to the length of the range.
+def _fields(doc: Dict[str, Any]) -> Tuple[int, int, int, int]:
+    extra = set(doc) - set(FIELDS)
+    if extra:
+        raise ValueError(f"Binary store cannot hold fields: {', '.join(sorted(extra))}")
+    try:
+        start, end = _ord(str(doc["start_date"])), _ord(str(doc["end_date"]))
+        return int(doc["car_id"]), start, end, int(doc.get("days", end - start + 1))
+    except KeyError as ex:
+        raise ValueError(f"Booking is missing {ex.args[0]}") from None
+
+def _doc(rec: Record) -> Dict[str, Any]:
+    return {"car_id": rec[1], "start_date": _iso(rec[2]), "end_date": _iso(rec[3]), "days": rec[4]}
+
+def _bitmap_size(capacity: int) -> int:
+    return (capacity + 63) // 64 * 8
+
+def _used_bytes(base: int, seq: int) -> int:
+    return (max(seq - base + 1, 0) + 7) // 8
+
+# One mapped file. A rewrite replaces the file and marks the old one retired,
+# so processes still mapping it know to reopen the path.
+class _File:
+    def __init__(self, path: Path):
+        with open(path, "r+b") as f:
+            self.mm = mmap.mmap(f.fileno(), 0)
+        magic, self.base, self.capacity, _ = _PRE.unpack_from(self.mm)
+        if magic != MAGIC:
+            raise ValueError(f"Not a binary booking file: {path}")
+        self.buf = memoryview(self.mm)
+        self.bitmap_size = _bitmap_size(self.capacity)
+        self.records = _HDR_AT + 2 * _HDR_SLOT + 2 * self.bitmap_size
+
+    def retired(self) -> bool:
+        return _RETIRED.unpack_from(self.mm, _RETIRED_AT)[0] != 0
+
+    def set_retired(self, value: bool) -> None:
+        _RETIRED.pack_into(self.mm, _RETIRED_AT, int(value))
+
+    # Newest header with a valid checksum; a torn header write leaves the
+    # previous one in charge.
+    def header(self) -> Header:
+        best = None
+        for slot in (0, 1):
+            at = _HDR_AT + slot * _HDR_SLOT
+            hdr = _HDR.unpack_from(self.mm, at)
+            if hdr[0] & 1 == slot and _CRC.unpack_from(self.mm, at + _HDR.size)[0] == zlib.crc32(self.buf[at:at + _HDR.size]):
+                if best is None or hdr[0] > best[0]:
+                    best = hdr
+        if best is None:
+            raise ValueError("Binary booking file has no valid header")
+        return best
+
+    def write_header(self, hdr: Header) -> None:
+        at = _HDR_AT + (hdr[0] & 1) * _HDR_SLOT
+        _HDR.pack_into(self.mm, at, *hdr)
+        _CRC.pack_into(self.mm, at + _HDR.size, zlib.crc32(self.buf[at:at + _HDR.size]))
+
+    def bitmap(self, gen: int) -> int:
+        return _HDR_AT + 2 * _HDR_SLOT + (gen & 1) * self.bitmap_size
+
+    # Live bits of `gen` for slots up to `seq`, copied out of the mapping.
+    # Returns None if a commit overwrote that bitmap while it was copied.
+    def bits(self, hdr: Header) -> Optional[bytes]:
+        at = self.bitmap(hdr[0])
+        bits = bytes(self.buf[at:at + _used_bytes(self.base, hdr[1])])
+        return bits if self.header()[0] == hdr[0] else None
+
+    def record(self, slot: int) -> Record:
+        return RECORD.unpack_from(self.mm, self.records + slot * RECORD.size)
+
+    # Live records in id order, parsed straight from the mapping.
+    def scan(self, hdr: Header, bits: bytes, first_slot: int = 0) -> Iterator[Record]:
+        used = max(hdr[1] - self.base + 1, 0)
+        first_slot = max(first_slot, 0)
+        view = self.buf[self.records + first_slot * RECORD.size:self.records + used * RECORD.size]
+        for slot, rec in enumerate(RECORD.iter_unpack(view), first_slot):
+            if bits[slot >> 3] >> (slot & 7) & 1:
+                yield rec
+
+class _TableState:
+    # Shared by every BinaryStore opened on the same path.
+    def __init__(self, path: str):
+        name = os.path.basename(path)
+        self.lock = TimedLock(FileLock(path + ".lock"), name, "table")
+        self.stripes = [TimedLock(FileLock(f"{path}.stripe-{i}.lock"), name, "stripe") for i in range(STRIPES)]
+        self.mutex = threading.RLock()
+        self.file: Optional[_File] = None
+        self.views = ViewSet()
+        self.token = object()
+        self.key: Optional[Tuple[_File, int]] = None  # (file, gen) the views match
+        self.key_bits = b""  # live bits at `key`
+        self.doc: Optional[Dict[str, Any]] = None
+        self.doc_key: Optional[Tuple[_File, int]] = None
+        self.bytes_written = BYTES_WRITTEN.labels(name)
+
+_states: Dict[str, _TableState] = {}
+_states_guard = threading.Lock()
+
+# Bookings as fixed-width records in a memory-mapped file (BOOKINGS_STORE=binary).
+# get_item() is one bitmap test and one struct unpack at a computed offset, and
+# scans parse records straight from the mapping without building a dict per
+# row. Every commit (a batch of inserts and deletes) writes new records past
+# `seq`, builds the next bitmap in the spare bitmap slot and then writes the
+# spare header with a checksum; until that last write lands the old header and
+# bitmap stay in charge, so a crash at any point leaves the previous commit.
+# Slots are never reused and committed records never change, so readers need
+# no lock: they copy the bitmap of the header they saw and retry if a commit
+# overwrote it meanwhile. The header also serves as the change sequence other
+# workers check (see changeseq.py). Running out of slots, write() and
+# compact() rewrite the file and replace it.
+class BinaryStore:
+    def __init__(self, path: Path, fsync: bool = False):
+        self.path = path
+        self.fsync = fsync
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        key = str(path.resolve())
+        with _states_guard:
+            if key not in _states:
+                _states[key] = _TableState(key)
+            self._state = _states[key]
+        self.lock = self._state.lock
+        if self._state.file is None:
+            with self.lock:
+                if not self.path.exists():
+                    self._replace([], 0, 0)
+                elif self._state.file is None:
+                    self._open()
+
+    # ---- file handling ----
+
+    # Caller holds self.lock. A retired file at the path means a crash between
+    # retiring it and replacing it: it is still the current table.
+    def _open(self) -> _File:
+        f = _File(self.path)
+        if f.retired():
+            f.set_retired(False)
+        with self._state.mutex:
+            self._state.file = f
+        return f
+
+    def _file(self) -> _File:
+        f = self._state.file
+        if f.retired():
+            with self.lock:
+                f = self._state.file
+                if f.retired():
+                    f = self._open()
+        return f
+
+    # Consistent (file, header, live bits) without taking the lock.
+    def _snapshot(self) -> Tuple[_File, Header, bytes]:
+        while True:
+            f = self._file()
+            hdr = f.header()
+            bits = f.bits(hdr)
+            if bits is not None:
+                return f, hdr, bits
+
+    # Writes a fresh file holding `records` and swaps it in (caller holds the
+    # lock). Capacity is twice the slots needed up to id `reserve`.
+    def _replace(self, records: List[Record], seq: int, version: int, reserve: int = 0) -> _File:
+        records.sort()
+        base = records[0][0] if records else seq + 1
+        capacity = MIN_CAPACITY
+        while capacity < 2 * (max(seq, reserve) - base + 1):
+            capacity *= 2
+        bitmap_size = _bitmap_size(capacity)
+        size = _HDR_AT + 2 * _HDR_SLOT + 2 * bitmap_size + capacity * RECORD.size
+        tmp = None
+        try:
+            with tempfile.NamedTemporaryFile("w+b", delete=False, dir=str(self.path.parent)) as tf:
+                tmp = tf.name
+                tf.truncate(size)
+                with mmap.mmap(tf.fileno(), size) as mm:
+                    _PRE.pack_into(mm, 0, MAGIC, base, capacity, 0)
+                    bits = bytearray(bitmap_size)
+                    rec_at = _HDR_AT + 2 * _HDR_SLOT + 2 * bitmap_size
+                    for rec in records:
+                        slot = rec[0] - base
+                        RECORD.pack_into(mm, rec_at + slot * RECORD.size, *rec)
+                        bits[slot >> 3] |= 1 << (slot & 7)
+                    mm[_HDR_AT + 2 * _HDR_SLOT:_HDR_AT + 2 * _HDR_SLOT + bitmap_size] = bits
+                    hdr = (0, seq, len(records), version)
+                    _HDR.pack_into(mm, _HDR_AT, *hdr)
+                    _CRC.pack_into(mm, _HDR_AT + _HDR.size, zlib.crc32(_HDR.pack(*hdr)))
+                    mm.flush()
+                if self.fsync:
+                    os.fsync(tf.fileno())
+            old = self._state.file
+            if old is not None:
+                old.set_retired(True)
+            os.replace(tmp, self.path)
+            tmp = None
+            self._state.bytes_written.inc(size)
+            return self._open()
+        finally:
+            if tmp and os.path.exists(tmp):
+                try: os.remove(tmp)
+                except OSError: pass
+
+    def _rewrite(self, f: _File, hdr: Header, bits: bytes, version: int, reserve: int = 0) -> _File:
+        return self._replace(list(f.scan(hdr, bits)), hdr[1], version, reserve)
+
+    # ---- views (caller holds self.lock) ----
+
+    # Moves the views to the current commit. Commits by other processes on the
+    # same file are applied as inserts and deletes found by comparing the live
+    # bits; a replaced file rebuilds them.
+    def _catch_up(self, f: _File, hdr: Header, bits: bytes) -> None:
+        st = self._state
+        if st.key == (f, hdr[0]):
+            return
+        token = object()
+        if st.key is not None and st.key[0] is f and st.views.views:
+            st.views.apply(st.token, token, self._diff(f, st.key_bits, bits))
+        with st.mutex:
+            st.key, st.token, st.key_bits = (f, hdr[0]), token, bits
+
+    def _diff(self, f: _File, old: bytes, new: bytes) -> List[Change]:
+        old = old.ljust(len(new), b"\0")
+        delta = (int.from_bytes(old, "little") ^ int.from_bytes(new, "little")).to_bytes(len(new), "little")
+        changes: List[Change] = []
+        for m in _NONZERO.finditer(delta):
+            i = m.start()
+            for b in range(8):
+                if delta[i] >> b & 1:
+                    slot = i * 8 + b
+                    rec = f.record(slot)
+                    changes.append(("insert" if new[i] >> b & 1 else "delete", rec[0], _doc(rec)))
+        return changes
+
+    # ---- store interface ----
+
+    def read(self) -> Dict[str, Any]:
+        st = self._state
+        f, hdr, bits = self._snapshot()
+        with st.mutex:
+            if st.doc_key == (f, hdr[0]):
+                return st.doc
+        items = {str(rec[0]): _doc(rec) for rec in f.scan(hdr, bits)}
+        doc = {"_meta": {"seq": hdr[1], "version": hdr[3]}, "items": items}
+        with st.mutex:
+            st.doc, st.doc_key = doc, (f, hdr[0])
+        return doc
+
+    # Whole-table replacement. The version only moves forward, as in JSONStore.
+    def write(self, data: Dict[str, Any]) -> None:
+        records = [(int(k), *_fields(v)) for k, v in data.get("items", {}).items()]
+        meta = data.get("_meta", {})
+        with self.lock:
+            hdr = self._file().header()
+            seq = max([int(meta.get("seq", 0)), *(r[0] for r in records)])
+            self._replace(records, seq, max(int(meta.get("version", 0)), hdr[3] + 1))
+
+    def get_item(self, id_: int) -> Optional[Dict[str, Any]]:
+        while True:
+            f = self._file()
+            hdr = f.header()
+            slot = id_ - f.base
+            if slot < 0 or id_ > hdr[1]:
+                return None
+            live = f.mm[f.bitmap(hdr[0]) + (slot >> 3)] >> (slot & 7) & 1
+            rec = f.record(slot)
+            if f.header()[0] == hdr[0]:
+                return _doc(rec) if live else None
+
+    def version(self) -> int:
+        return self._file().header()[3]
+
+    # One commit per batch; inserts deleted again within the batch never
+    # become live.
+    def apply(self, ops: List[Op]) -> List[Change]:
+        with self.lock:
+            f = self._file()
+            hdr = f.header()
+            bits = f.bits(hdr)
+            gen, seq, count, version = hdr
+            inserts: Dict[int, Tuple[int, int, int, int]] = {}
+            deletes: Dict[int, Record] = {}
+            changes: List[Change] = []
+            for op, arg in ops:
+                if op == "insert":
+                    fields = _fields(arg)
+                    seq += 1
+                    inserts[seq] = fields
+                    changes.append(("insert", seq, _doc((seq, *fields))))
+                elif op == "delete":
+                    id_ = int(arg)
+                    slot = id_ - f.base
+                    if id_ in inserts:
+                        changes.append(("delete", id_, _doc((id_, *inserts.pop(id_)))))
+                    elif 0 <= slot and id_ <= hdr[1] and id_ not in deletes and bits[slot >> 3] >> (slot & 7) & 1:
+                        deletes[id_] = f.record(slot)
+                        changes.append(("delete", id_, _doc(deletes[id_])))
+                else:
+                    raise ValueError(f"Unknown store operation: {op}")
+            if not changes:
+                return []
+            self._catch_up(f, hdr, bits)
+            if seq - f.base + 1 > f.capacity:
+                f = self._rewrite(f, hdr, bits, version, reserve=seq)
+                hdr = f.header()
+                bits = f.bits(hdr)
+                with self._state.mutex:
+                    self._state.key, self._state.key_bits = (f, hdr[0]), bits
+            new = (hdr[0] + 1, seq, hdr[2] + len(inserts) - len(deletes), version + 1)
+            new_bits = self._commit(f, hdr, new, inserts, deletes)
+            st = self._state
+            token = object()
+            st.views.apply(st.token, token, changes)
+            with st.mutex:
+                st.key, st.token, st.key_bits = (f, new[0]), token, new_bits
+        return changes
+
+    def _commit(self, f: _File, hdr: Header, new: Header, inserts: Dict[int, Tuple[int, int, int, int]],
+                deletes: Dict[int, Record]) -> bytes:
+        src, dst = f.bitmap(hdr[0]), f.bitmap(new[0])
+        n = _used_bytes(f.base, new[1])
+        bits = bytearray(f.buf[src:src + n])
+        for id_ in range(hdr[1] + 1, new[1] + 1):
+            slot = id_ - f.base
+            if id_ in inserts:
+                RECORD.pack_into(f.mm, f.records + slot * RECORD.size, id_, *inserts[id_])
+                bits[slot >> 3] |= 1 << (slot & 7)
+            else:
+                bits[slot >> 3] &= ~(1 << (slot & 7)) & 0xFF
+        for id_ in deletes:
+            slot = id_ - f.base
+            bits[slot >> 3] &= ~(1 << (slot & 7)) & 0xFF
+        f.buf[dst:dst + n] = bits
+        if self.fsync:
+            f.mm.flush()
+        f.write_header(new)
+        if self.fsync:
+            f.mm.flush()
+        return bytes(bits)
+
+    def insert_item(self, doc: Dict[str, Any]) -> int:
+        return self.apply([("insert", doc)])[0][1]
+
+    def delete_item(self, id_: int) -> bool:
+        return bool(self.apply([("delete", id_)]))
+
+    # Conditions on booking fields are tested on the raw records; only
+    # matching rows become dicts.
+    def select(self, query: Query) -> Iterator[Row]:
+        f, hdr, bits = self._snapshot()
+        tests = []
+        for name, op, want in query.conditions:
+            col = _COLUMNS.get(name)
+            if col is None:
+                return iter(())
+            tests.append((col, op, _ord(want) if col in _DATES else want))
+        lo = query.min_id()
+        recs = f.scan(hdr, bits, 0 if lo is None else lo - f.base)
+        rows = ((rec[0], _doc(rec)) for rec in recs if all(OPS[op](rec[col], want) for col, op, want in tests))
+        return query.run(rows)
+
+    def stripe_lock(self, key: int) -> TimedLock:
+        return self._state.stripes[hash(key) % STRIPES]
+
+    def stripe_locks(self) -> List[TimedLock]:
+        return self._state.stripes
+
+    # A view class may provide `from_records(records)` to be built from the
+    # (id, car_id, start, end, days) tuples instead of booking dicts.
+    def view(self, factory: type) -> Any:
+        st = self._state
+        f = self._file()
+        gen = f.header()[0]
+        with st.mutex:
+            token = st.token if st.key == (f, gen) else None
+        if token is not None:
+            v = st.views.peek(factory, token)
+            if v is not None:
+                return v
+        with self.lock:
+            f = self._file()
+            hdr = f.header()
+            bits = f.bits(hdr)
+            self._catch_up(f, hdr, bits)
+            hook = getattr(factory, "from_records", None)
+            build = (lambda: hook(f.scan(hdr, bits))) if hook is not None else None
+            return st.views.get(factory, st.token, lambda: self.read()["items"], build)
+
+    # Rewrites the file without tombstones, see compactor.py.
+    def compact(self) -> None:
+        with self.lock:
+            f = self._file()
+            hdr = f.header()
+            if hdr[2] < hdr[1] - f.base + 1:
+                self._rewrite(f, hdr, f.bits(hdr), hdr[3])
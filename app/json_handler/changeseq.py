@@ -0,0 +1,46 @@
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Tuple
+
+# STORE_CHANGE_SEQ=stat (default): a store notices writes by other processes by
+# stat-ing its files under the table lock on every read. STORE_CHANGE_SEQ=mmap:
+# every write also bumps a counter in a small memory-mapped file next to the
+# table, and readers only fall back to the lock and the stat when the counter
+# moved. Use mmap when running several workers; it assumes every writer goes
+# through the stores (a file replaced by hand is not noticed).
+CHANGE_SEQ = os.getenv("STORE_CHANGE_SEQ", "stat")
+
+_HEADER = struct.Struct("<QQ")  # (seq, epoch)
+
+# Change sequence of one table, shared by every process that maps the file:
+# `seq` moves on every write, `epoch` only on whole-table rewrites, so a reader
+# whose epoch is unchanged knows the table only saw inserts and deletes since
+# it last looked. Bumps happen under the table lock, after the data is on disk.
+# Values are read without a lock: a torn or stale read only ever looks like
+# "changed", which sends the reader down the locked path.
+class ChangeSeq:
+    def __init__(self, path: Path):
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < _HEADER.size:
+                os.ftruncate(fd, _HEADER.size)
+            self._mm = mmap.mmap(fd, _HEADER.size)
+        finally:
+            os.close(fd)
+
+    def seq(self) -> int:
+        return _HEADER.unpack_from(self._mm)[0]
+
+    def read(self) -> Tuple[int, int]:
+        return _HEADER.unpack_from(self._mm)
+
+    def bump(self, rewrite: bool = False) -> Tuple[int, int]:
+        seq, epoch = _HEADER.unpack_from(self._mm)
+        new = (seq + 1, epoch + 1 if rewrite else epoch)
+        _HEADER.pack_into(self._mm, 0, *new)
+        return new
+
+def open_change_seq(path: Path):
+    return ChangeSeq(path) if CHANGE_SEQ == "mmap" else None
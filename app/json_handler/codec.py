@@ -0,0 +1,35 @@
+import json, os
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+# STORE_CODEC=std (default): table files are indented JSON and everything is
+# encoded/decoded by the stdlib. STORE_CODEC=fast: table files are written
+# compact, and orjson does the encoding/decoding when it is installed. Either
+# mode reads files written by the other.
+FAST = os.getenv("STORE_CODEC", "std") == "fast"
+_ORJSON = FAST and orjson is not None
+
+def _default(obj: Any) -> Any:
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+# Compact UTF-8 JSON (journal lines, responses); dates become ISO strings.
+def dumps(obj: Any) -> bytes:
+    if _ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+def dump_table(doc: Any) -> bytes:
+    if FAST:
+        return dumps(doc)
+    return json.dumps(doc, indent=2, ensure_ascii=False).encode("utf-8")
+
+def loads(data: Any) -> Any:
+    if _ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -1,6 +1,11 @@
-from typing import List, Dict, Any, Optional
+from contextlib import ExitStack, contextmanager
+from typing import List, Dict, Any, Iterator, Optional
 from .json_store import JSONStore
+from .query import Query
 
+# Works with any store exposing read/write/get_item/insert_item/delete_item/
+# apply/select/view/version and the lock helpers (JSONStore, JournalStore, SQLiteStore,
+# BinaryStore).
 class GenericRepo:
     def __init__(self, store: JSONStore):
         self.store = store
@@ -10,25 +15,101 @@ class GenericRepo:
         return [{"id": int(k), **v} for k, v in d.get("items", {}).items()]
 
     def get(self, id_: int) -> Optional[Dict[str, Any]]:
-        d = self.store.read()
-        v = d.get("items", {}).get(str(id_))
+        v = self.store.get_item(id_)
         return {"id": id_, **v} if v else None
 
+    # Filtered query executed by the store, e.g.
+    #     find(car_id=3, end_date__gte=today, order_by="start_date", limit=10)
+    # Lookups: field (equality), field__lt/__lte/__gt/__gte; "-field" sorts
+    # descending. Only matching rows are turned into dicts.
+    def find(self, order_by: Optional[str] = None, limit: Optional[int] = None,
+             offset: int = 0, **lookups: Any) -> List[Dict[str, Any]]:
+        query = Query.from_lookups(order_by, limit, offset, **lookups)
+        return [{"id": i, **v} for i, v in self.store.select(query)]
+
+    # All matching rows in id order, fetched in keyset pages of `chunk` rows so
+    # a consumer never holds more than one page.
+    def stream(self, after_id: int = 0, chunk: int = 500, **lookups: Any) -> Iterator[Dict[str, Any]]:
+        while True:
+            page = self.find(id__gt=after_id, limit=chunk, **lookups)
+            yield from page
+            if len(page) < chunk:
+                return
+            after_id = page[-1]["id"]
+
     def insert(self, doc: Dict[str, Any]) -> Dict[str, Any]:
-        d = self.store.read()
-        d.setdefault("_meta", {}).setdefault("seq", 0)
-        d.setdefault("items", {})
-        d["_meta"]["seq"] += 1
-        new_id = d["_meta"]["seq"]
-        d["items"][str(new_id)] = doc
-        self.store.write(d)
+        new_id = self.store.insert_item(doc)
         return {"id": new_id, **doc}
 
     def delete(self, id_: int) -> bool:
-        d = self.store.read()
-        k = str(id_)
-        if k in d.get("items", {}):
-            del d["items"][k]
-            self.store.write(d)
-            return True
-        return False
+        return self.store.delete_item(id_)
+
+    # Deletes every id in one store write; returns the rows that existed.
+    def delete_many(self, ids: List[int]) -> List[Dict[str, Any]]:
+        if not ids:
+            return []
+        return [{"id": id_, **doc} for _, id_, doc in self.store.apply([("delete", i) for i in ids])]
+
+    # Changes with every insert, delete or whole-table write.
+    def version(self) -> int:
+        return self.store.version()
+
+    # Incrementally maintained derived structure, see views.py.
+    def view(self, factory: type) -> Any:
+        return self.store.view(factory)
+
+    # Read-check-write under one lock:
+    #
+    #     with repo.transaction(stripe=car_id) as tx:
+    #         if tx.view(Index).is_free(...):
+    #             tx.insert(doc)
+    #     created = tx.created
+    #
+    # Writes are buffered and committed in one store write when the block exits
+    # without an exception. With `stripe`, only that key's lock is held while the
+    # block runs, so transactions on different keys proceed in parallel; this is
+    # safe as long as everything that can conflict on a key uses its stripe.
+    # Without `stripe`, every stripe plus the table lock is held.
+    @contextmanager
+    def transaction(self, stripe: Optional[int] = None) -> Iterator["Transaction"]:
+        if stripe is not None:
+            locks = [self.store.stripe_lock(stripe)]
+        else:
+            locks = [*self.store.stripe_locks(), self.store.lock]
+        with ExitStack() as stack:
+            for lock in locks:
+                stack.enter_context(lock)
+            tx = Transaction(self)
+            yield tx
+            tx.commit()
+
+class Transaction:
+    def __init__(self, repo: GenericRepo):
+        self.repo = repo
+        self.created: List[Dict[str, Any]] = []
+        self.deleted: List[Dict[str, Any]] = []
+        self._ops: List[tuple] = []
+
+    def get(self, id_: int) -> Optional[Dict[str, Any]]:
+        return self.repo.get(id_)
+
+    def view(self, factory: type) -> Any:
+        return self.repo.view(factory)
+
+    # See GenericRepo.find; buffered writes are not visible until commit.
+    def find(self, order_by: Optional[str] = None, limit: Optional[int] = None,
+             offset: int = 0, **lookups: Any) -> List[Dict[str, Any]]:
+        return self.repo.find(order_by=order_by, limit=limit, offset=offset, **lookups)
+
+    def insert(self, doc: Dict[str, Any]) -> None:
+        self._ops.append(("insert", doc))
+
+    def delete(self, id_: int) -> None:
+        self._ops.append(("delete", id_))
+
+    def commit(self) -> None:
+        ops, self._ops = self._ops, []
+        if not ops:
+            return
+        for op, id_, doc in self.repo.store.apply(ops):
+            (self.created if op == "insert" else self.deleted).append({"id": id_, **doc})
@@ -0,0 +1,74 @@
+import os
+from pathlib import Path
+from typing import Optional
+
+from .binary_store import BinaryStore
+from .json_store import JSONStore
+from .journal_store import JournalStore
+from .sqlite_store import SQLiteStore
+
+# Directory holding the table files, relative to the working directory unless
+# DATA_DIR is absolute.
+DATA_DIR = Path(os.getenv("DATA_DIR", "data"))
+SQLITE_DB = "app.db"
+ENGINES = ("json", "journal", "sqlite")
+
+# Fields indexed per table when the SQLite engine is used.
+SQLITE_INDEXES = {
+    "bookings": [("car_id", "start_date", "end_date")],
+    "bookings_archive": [("car_id", "start_date", "end_date")],
+    "cars": [("seats",)],
+}
+
+# Tables that may use the binary engine: it only holds booking records.
+BINARY_TABLES = ("bookings", "bookings_archive")
+
+_default_engine = "json"
+
+def set_default_engine(engine: str) -> None:
+    global _default_engine
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown storage engine: {engine}")
+    _default_engine = engine
+
+# A table last served by the journal engine can have records in
+# `<name>.json.journal` that its snapshot does not hold yet. JSONStore only
+# reads the snapshot, so they are folded in and the journal is removed before
+# the json engine opens the table; otherwise those rows would be invisible,
+# their ids reused, and a later switch back would replay them over newer rows.
+def _fold_journal(path: Path) -> None:
+    journal = path.with_name(path.name + ".journal")
+    if not journal.exists():
+        return
+    store = JournalStore(path)
+    with store.lock:
+        if journal.exists():
+            store.compact()
+            journal.unlink()
+
+# Engine per table defaults to the app-wide engine (see app/main.py) and can be
+# overridden per table, e.g. BOOKINGS_STORE=journal. The json and journal
+# engines keep `data/<name>.json` in the same layout, so either can take over a
+# table from the other (see _fold_journal); moving to sqlite or binary
+# (bookings tables only, kept in `data/<name>.bin`) goes through
+# app.json_handler.migrate.
+def open_store(name: str, data_dir: Optional[Path] = None):
+    data_dir = DATA_DIR if data_dir is None else data_dir
+    backend = os.getenv(f"{name.upper()}_STORE", _default_engine).lower()
+    path = data_dir / f"{name}.json"
+    if backend == "json":
+        _fold_journal(path)
+        return JSONStore(path)
+    if backend == "journal":
+        return JournalStore(
+            path,
+            fsync=os.getenv("JOURNAL_FSYNC", "0") == "1",
+            compact_every=int(os.getenv("JOURNAL_COMPACT_EVERY", "10000")),
+        )
+    if backend == "sqlite":
+        return SQLiteStore(data_dir / SQLITE_DB, name, SQLITE_INDEXES.get(name, ()))
+    if backend == "binary":
+        if name not in BINARY_TABLES:
+            raise ValueError(f"The binary store only holds bookings, not {name}")
+        return BinaryStore(data_dir / f"{name}.bin", fsync=os.getenv("BINARY_FSYNC", "0") == "1")
+    raise ValueError(f"Unknown store backend for {name}: {backend}")
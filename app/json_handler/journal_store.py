@@ -0,0 +1,289 @@
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional
+import os, tempfile, threading
+import logging
+
+from app.core.metrics import BYTES_READ, BYTES_WRITTEN
+from . import codec
+from .changeseq import open_change_seq
+from .json_store import JSONStore, Op
+from .query import Query, Row, candidate_rows
+from .views import Change, RowIds, ViewSet
+
+logger = logging.getLogger("app.journal_store")
+
+class _JournalState:
+    # Replayed table state, shared by every JournalStore opened on the same path.
+    def __init__(self, seq_path: str):
+        self.base: Optional[Dict[str, Any]] = None
+        self.meta: Dict[str, Any] = {"seq": 0, "gen": 0}
+        self.items: Dict[str, Dict[str, Any]] = {}
+        self.journal_ino: Optional[int] = None
+        self.offset = 0
+        self.pending = 0
+        self.compacting = False
+        self.views = ViewSet()
+        self.mutex = threading.RLock()  # guards in-place updates of the state
+        self.changes = open_change_seq(seq_path)
+        self.seen: Optional[int] = None  # journal change seq the state matches
+
+_states: Dict[str, _JournalState] = {}
+_states_guard = threading.Lock()
+
+def _shared(path: Path) -> _JournalState:
+    key = str(path.resolve())
+    with _states_guard:
+        st = _states.get(key)
+        if st is None:
+            st = _states[key] = _JournalState(key + ".journal.seq")
+        return st
+
+def _line(rec: Dict[str, Any]) -> bytes:
+    return codec.dumps(rec) + b"\n"
+
+# Append-only table: inserts and deletes are appended to `<path>.journal` as JSON
+# lines, and `<path>` holds a snapshot in the same layout JSONStore uses. State is
+# rebuilt by loading the snapshot and replaying the journal; once `compact_every`
+# records accumulate, a background thread folds them into a new snapshot.
+#
+# The snapshot's `_meta.gen` must match the journal's header line. A crash between
+# writing a snapshot and resetting the journal leaves an older header, and that
+# journal is then discarded because the snapshot already contains it.
+#
+# With STORE_CHANGE_SEQ=mmap, appends, rewrites and compactions bump the
+# journal's change sequence, and reads whose sequence is unchanged skip the
+# table lock and the stat of the snapshot and the journal.
+class JournalStore:
+    def __init__(self, path: Path, fsync: bool = False, compact_every: int = 10_000):
+        self.path = path
+        self.journal_path = path.with_name(path.name + ".journal")
+        self.fsync = fsync
+        self.compact_every = compact_every
+        self._snapshot = JSONStore(path)
+        self.lock = self._snapshot.lock
+        self._state = _shared(path)
+        self._bytes_read = BYTES_READ.labels(self.journal_path.name)
+        self._bytes_written = BYTES_WRITTEN.labels(self.journal_path.name)
+
+    # ---- journal file handling (caller holds self.lock) ----
+
+    def _reset_journal(self, gen: int) -> None:
+        header = _line({"gen": gen})
+        tmp = None
+        try:
+            with tempfile.NamedTemporaryFile("wb", delete=False, dir=str(self.path.parent)) as tf:
+                tf.write(header)
+                tf.flush()
+                if self.fsync:
+                    os.fsync(tf.fileno())
+                tmp = tf.name
+            os.replace(tmp, self.journal_path)
+        finally:
+            if tmp and os.path.exists(tmp):
+                try: os.remove(tmp)
+                except OSError: pass
+        st = self._state
+        st.journal_ino = os.stat(self.journal_path).st_ino
+        st.offset = len(header)
+        st.pending = 0
+
+    def _apply(self, rec: Dict[str, Any]) -> Optional[Change]:
+        st = self._state
+        op = rec.get("op")
+        if op == "put":
+            st.items[str(rec["id"])] = rec["doc"]
+            st.meta["seq"] = max(st.meta.get("seq", 0), int(rec["id"]))
+            change = ("insert", int(rec["id"]), rec["doc"])
+        elif op == "del":
+            old = st.items.pop(str(rec["id"]), None)
+            if old is None:
+                return None
+            change = ("delete", int(rec["id"]), old)
+        else:
+            return None
+        st.meta["version"] = st.meta.get("version", 0) + 1
+        st.pending += 1
+        st.views.apply(st, st, [change])
+        return change
+
+    def _replay(self) -> None:
+        st = self._state
+        with self.journal_path.open("rb") as f:
+            f.seek(st.offset)
+            chunk = f.read()
+        self._bytes_read.inc(len(chunk))
+        end = chunk.rfind(b"\n") + 1  # a torn last line is left for truncation
+        for raw in chunk[:end].splitlines():
+            if raw.strip():
+                self._apply(codec.loads(raw))
+        st.offset += end
+
+    def _reload(self, snap: Dict[str, Any]) -> None:
+        st = self._state
+        st.base = snap
+        st.meta = {"seq": 0, "gen": 0, **snap.get("_meta", {})}
+        st.items = dict(snap.get("items", {}))
+        st.pending = 0
+        st.views.clear()
+        header = b""
+        if self.journal_path.exists():
+            with self.journal_path.open("rb") as f:
+                header = f.readline()
+        try:
+            gen = codec.loads(header).get("gen") if header.endswith(b"\n") else None
+        except ValueError:
+            gen = None
+        if gen != st.meta["gen"]:
+            self._reset_journal(st.meta["gen"])
+            return
+        st.journal_ino = os.stat(self.journal_path).st_ino
+        st.offset = len(header)
+        self._replay()
+
+    def _sync(self) -> None:
+        st = self._state
+        seen = st.changes.seq() if st.changes is not None else None
+        if seen is not None and seen == st.seen and st.base is not None:
+            return
+        snap = self._snapshot.read()
+        try:
+            jst = os.stat(self.journal_path)
+        except FileNotFoundError:
+            jst = None
+        with st.mutex:
+            if snap is not st.base or jst is None or jst.st_ino != st.journal_ino or jst.st_size < st.offset:
+                self._reload(snap)
+            elif jst.st_size > st.offset:
+                self._replay()
+            st.seen = seen
+
+    # Publishes a change made under self.lock to the other workers.
+    def _bump(self) -> None:
+        st = self._state
+        if st.changes is not None:
+            st.seen = st.changes.bump()[0]
+
+    def _append(self, recs: List[Dict[str, Any]]) -> List[Change]:
+        st = self._state
+        data = b"".join(_line(r) for r in recs)
+        with self.journal_path.open("r+b") as f:
+            f.truncate(st.offset)
+            f.seek(st.offset)
+            f.write(data)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        st.offset += len(data)
+        self._bytes_written.inc(len(data))
+        with st.mutex:
+            changes = [c for c in map(self._apply, recs) if c]
+            self._bump()
+        if st.pending >= self.compact_every and not st.compacting:
+            st.compacting = True
+            threading.Thread(target=self._background_compact, name="journal-compact", daemon=True).start()
+        return changes
+
+    def _background_compact(self) -> None:
+        try:
+            self.compact()
+        except Exception:
+            logger.exception("journal_compaction_failed path=%s", self.path)
+        finally:
+            self._state.compacting = False
+
+    # Runs fn on the replayed state: without the table lock while the change
+    # sequence shows no write since the last sync, else after a sync under it.
+    # fn must not take the table lock.
+    def _on_state(self, fn):
+        st = self._state
+        if st.changes is not None:
+            seen = st.changes.seq()
+            with st.mutex:
+                if seen == st.seen and st.base is not None:
+                    return fn(st)
+        with self.lock:
+            self._sync()
+            with st.mutex:
+                return fn(st)
+
+    # ---- store interface ----
+
+    def read(self) -> Dict[str, Any]:
+        return self._on_state(lambda st: {"_meta": dict(st.meta), "items": dict(st.items)})
+
+    def write(self, data: Dict[str, Any]) -> None:
+        with self.lock:
+            self._sync()
+            meta = {**data.get("_meta", {}), "gen": self._state.meta.get("gen", 0) + 1,
+                    "version": self._state.meta.get("version", 0) + 1}
+            self._snapshot.write({**data, "_meta": meta})
+            self._reset_journal(meta["gen"])
+            with self._state.mutex:
+                self._reload(self._snapshot.read())
+                self._bump()
+
+    def get_item(self, id_: int) -> Optional[Dict[str, Any]]:
+        return self._on_state(lambda st: st.items.get(str(id_)))
+
+    # Counted per journal record, so every worker replaying the same journal
+    # arrives at the same number.
+    def version(self) -> int:
+        return self._on_state(lambda st: int(st.meta.get("version", 0)))
+
+    # All records of one batch go out in a single write.
+    def apply(self, ops: List[Op]) -> List[Change]:
+        with self.lock:
+            self._sync()
+            seq = self._state.meta.get("seq", 0)
+            live = set()
+            recs = []
+            for op, arg in ops:
+                if op == "insert":
+                    seq += 1
+                    live.add(str(seq))
+                    recs.append({"op": "put", "id": seq, "doc": arg})
+                elif op == "delete":
+                    if str(arg) in self._state.items or str(arg) in live:
+                        recs.append({"op": "del", "id": int(arg)})
+                else:
+                    raise ValueError(f"Unknown store operation: {op}")
+            return self._append(recs) if recs else []
+
+    def insert_item(self, doc: Dict[str, Any]) -> int:
+        return self.apply([("insert", doc)])[0][1]
+
+    def delete_item(self, id_: int) -> bool:
+        return bool(self.apply([("delete", id_)]))
+
+    # Rows are collected under the state mutex because the replayed state is
+    # mutated in place.
+    def select(self, query: Query) -> Iterator[Row]:
+        rows = self._on_state(lambda st: list(query.run(candidate_rows(
+            query, st.items, lambda: st.views.get(RowIds, st, lambda: st.items)))))
+        return iter(rows)
+
+    def stripe_lock(self, key: int):
+        return self._snapshot.stripe_lock(key)
+
+    def stripe_locks(self):
+        return self._snapshot.stripe_locks()
+
+    # Views follow the journal record by record, including records appended by
+    # other workers, so they are only rebuilt after a snapshot reload.
+    def view(self, factory: type) -> Any:
+        return self._on_state(lambda st: st.views.get(factory, st, lambda: st.items))
+
+    def compact(self) -> None:
+        with self.lock:
+            self._sync()
+            st = self._state
+            if st.pending == 0:
+                return
+            gen = st.meta.get("gen", 0) + 1
+            snap = {"_meta": {**st.meta, "gen": gen}, "items": dict(st.items)}
+            self._snapshot.write(snap)
+            self._reset_journal(gen)
+            with st.mutex:
+                st.base, st.meta = snap, dict(snap["_meta"])
+                self._bump()
+        logger.info("journal_compacted path=%s gen=%s items=%d", self.path, gen, len(snap["items"]))
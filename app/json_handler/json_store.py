@@ -1,33 +1,216 @@
 from pathlib import Path
-from typing import Dict, Any
-import json, os, tempfile
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+import os, tempfile, threading
+from time import perf_counter
 from filelock import FileLock
 
+from app.core.metrics import BYTES_READ, BYTES_WRITTEN, STORE_SECONDS, TimedLock
+from . import codec
+from .changeseq import open_change_seq
+from .query import Query, Row, candidate_rows
+from .views import Change, RowIds, ViewSet
+
+Signature = Tuple[int, int, int]
+Op = Tuple[str, Any]  # ("insert", doc) | ("delete", id)
+
+# Number of key-striped locks per table, see stripe_lock().
+STRIPES = 16
+
+class _CachedDoc:
+    # One per file per process, shared by every JSONStore opened on that path.
+    def __init__(self, path: str):
+        name = os.path.basename(path)
+        self.lock = TimedLock(FileLock(path + ".lock"), name, "table")
+        self.mutex = threading.Lock()
+        self.data: Optional[Dict[str, Any]] = None
+        self.sig: Optional[Signature] = None
+        self.changes = open_change_seq(path + ".seq")
+        self.seen: Optional[Tuple[int, int]] = None  # (seq, epoch) the cached data matches
+        self.hits = 0
+        self.misses = 0
+        self.views = ViewSet()
+        self.stripes = [TimedLock(FileLock(f"{path}.stripe-{i}.lock"), name, "stripe") for i in range(STRIPES)]
+        self.t_read = STORE_SECONDS.labels(name, "read")
+        self.t_load = STORE_SECONDS.labels(name, "load")
+        self.t_write = STORE_SECONDS.labels(name, "write")
+        self.bytes_read = BYTES_READ.labels(name)
+        self.bytes_written = BYTES_WRITTEN.labels(name)
+
+_cache: Dict[str, _CachedDoc] = {}
+_cache_guard = threading.Lock()
+
+def _shared(path: Path) -> _CachedDoc:
+    key = str(path.resolve())
+    with _cache_guard:
+        entry = _cache.get(key)
+        if entry is None:
+            entry = _cache[key] = _CachedDoc(key)
+        return entry
+
+def _signature(st: os.stat_result) -> Signature:
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+# Inserts and deletes that turn one document into the other. Only used between
+# versions of the same epoch, where rows are never modified in place.
+def _diff(old: Dict[str, Any], new: Dict[str, Any]) -> List[Change]:
+    a, b = old.get("items", {}), new.get("items", {})
+    changes: List[Change] = [("delete", int(k), a[k]) for k in a.keys() - b.keys()]
+    changes += sorted((("insert", int(k), b[k]) for k in b.keys() - a.keys()), key=lambda c: c[1])
+    return changes
+
+# Reads are served from memory while the file's (mtime_ns, size, inode) signature
+# is unchanged. Every write goes through os.replace, so a write from another worker
+# always yields a new signature. The document returned by read() is shared: treat it
+# as read-only and pass a modified copy to write().
+# With STORE_CHANGE_SEQ=mmap (see changeseq.py) a read whose change sequence is
+# unchanged skips the lock and the stat, and a reload after another worker's
+# inserts and deletes updates the views instead of rebuilding them.
 class JSONStore:
     def __init__(self, path: Path):
         self.path = path
-        self.lock = FileLock(str(path) + ".lock")
         self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._shared = _shared(path)
+        self.lock = self._shared.lock
         if not self.path.exists():
-            self._atomic_write({"_meta": {"seq": 0}, "items": {}})
+            with self.lock:
+                if not self.path.exists():
+                    self._atomic_write({"_meta": {"seq": 0}, "items": {}})
 
-    def _atomic_write(self, data: Dict[str, Any]) -> None:
+    def _atomic_write(self, data: Dict[str, Any]) -> Signature:
         tmp = None
         try:
-            with tempfile.NamedTemporaryFile("w", delete=False, dir=str(self.path.parent), encoding="utf-8") as tf:
-                json.dump(data, tf, indent=2, ensure_ascii=False)
+            with tempfile.NamedTemporaryFile("wb", delete=False, dir=str(self.path.parent)) as tf:
+                tf.write(codec.dump_table(data))
+                tf.flush()
+                st = os.fstat(tf.fileno())
+                sig = _signature(st)
                 tmp = tf.name
             os.replace(tmp, self.path)
+            self._shared.bytes_written.inc(st.st_size)
+            return sig
         finally:
             if tmp and os.path.exists(tmp):
                 try: os.remove(tmp)
                 except OSError: pass
 
     def read(self) -> Dict[str, Any]:
-        with self.lock:
-            with self.path.open("r", encoding="utf-8") as f:
-                return json.load(f)
+        t0 = perf_counter()
+        c = self._shared
+        try:
+            if c.changes is not None:
+                seen = c.changes.read()
+                with c.mutex:
+                    if c.data is not None and c.seen == seen:
+                        c.hits += 1
+                        return c.data
+            with self.lock:
+                # Writers bump under the lock, so this matches the file on disk.
+                seen = c.changes.read() if c.changes is not None else None
+                sig = _signature(os.stat(self.path))
+                with c.mutex:
+                    if c.data is not None and c.sig == sig:
+                        c.hits += 1
+                        c.seen = seen
+                        return c.data
+                t1 = perf_counter()
+                with self.path.open("rb") as f:
+                    data = codec.loads(f.read())
+                    st = os.fstat(f.fileno())
+                c.t_load.observe(perf_counter() - t1)
+                c.bytes_read.inc(st.st_size)
+                old = c.data
+                if seen is not None and old is not None and c.seen is not None and c.seen[1] == seen[1]:
+                    c.views.apply(old, data, _diff(old, data))
+                with c.mutex:
+                    c.misses += 1
+                    c.data, c.sig, c.seen = data, _signature(st), seen
+                return data
+        finally:
+            c.t_read.observe(perf_counter() - t0)
 
+    # Whole-table replacement (seeding, journal snapshots). `_meta.version` only
+    # moves forward, so a version handed out for the old content (e.g. in an
+    # ETag) never matches the new one.
     def write(self, data: Dict[str, Any]) -> None:
         with self.lock:
-            self._atomic_write(data)
+            meta = data.get("_meta", {})
+            current = self.version()
+            if int(meta.get("version", 0)) <= current:
+                data = {**data, "_meta": {**meta, "version": current + 1}}
+            self._write(data, rewrite=True)
+
+    def _write(self, data: Dict[str, Any], rewrite: bool = False) -> None:
+        c = self._shared
+        with self.lock:
+            t0 = perf_counter()
+            sig = self._atomic_write(data)
+            seen = c.changes.bump(rewrite) if c.changes is not None else None
+            with c.mutex:
+                c.data, c.sig, c.seen = data, sig, seen
+            c.t_write.observe(perf_counter() - t0)
+
+    def get_item(self, id_: int) -> Optional[Dict[str, Any]]:
+        return self.read().get("items", {}).get(str(id_))
+
+    # Bumped by every write; a cache hit costs one stat of the file (or one
+    # look at the change sequence).
+    def version(self) -> int:
+        return int(self.read().get("_meta", {}).get("version", 0))
+
+    # Applies a batch of inserts/deletes in one read-modify-write. The cached
+    # document is shared, so a new one is built instead of mutating it.
+    def apply(self, ops: List[Op]) -> List[Change]:
+        with self.lock:
+            d = self.read()
+            meta = dict(d.get("_meta", {}))
+            items = dict(d.get("items", {}))
+            changes: List[Change] = []
+            for op, arg in ops:
+                if op == "insert":
+                    meta["seq"] = meta.get("seq", 0) + 1
+                    items[str(meta["seq"])] = arg
+                    changes.append(("insert", meta["seq"], arg))
+                elif op == "delete":
+                    old = items.pop(str(arg), None)
+                    if old is not None:
+                        changes.append(("delete", int(arg), old))
+                else:
+                    raise ValueError(f"Unknown store operation: {op}")
+            if changes:
+                meta["version"] = meta.get("version", 0) + 1
+                new = {**d, "_meta": meta, "items": items}
+                self._write(new)
+                self._shared.views.apply(d, new, changes)
+        return changes
+
+    def insert_item(self, doc: Dict[str, Any]) -> int:
+        return self.apply([("insert", doc)])[0][1]
+
+    def delete_item(self, id_: int) -> bool:
+        return bool(self.apply([("delete", id_)]))
+
+    def select(self, query: Query) -> Iterator[Row]:
+        items = self.read().get("items", {})
+        return query.run(candidate_rows(query, items, lambda: self.view(RowIds)))
+
+    # Lock for one key (e.g. a car id). Writers that only conflict per key hold
+    # their stripe while checking and writing; self.lock is still taken for
+    # the write itself.
+    def stripe_lock(self, key: int) -> TimedLock:
+        return self._shared.stripes[hash(key) % STRIPES]
+
+    def stripe_locks(self) -> List[TimedLock]:
+        return self._shared.stripes
+
+    def view(self, factory: type) -> Any:
+        if self._shared.changes is not None:
+            v = self._shared.views.peek(factory, self.read())
+            if v is not None:
+                return v
+        with self.lock:
+            d = self.read()
+            return self._shared.views.get(factory, d, lambda: d.get("items", {}))
+
+    def cache_stats(self) -> Dict[str, int]:
+        c = self._shared
+        return {"hits": c.hits, "misses": c.misses}
@@ -0,0 +1,62 @@
+"""One-shot copy of the JSON tables into SQLite, or of bookings into binary files.
+
+    python -m app.json_handler.migrate [--data-dir data] [--tables cars,bookings]
+    python -m app.json_handler.migrate --to binary --tables bookings,bookings_archive
+"""
+import argparse
+import logging
+from pathlib import Path
+
+from .binary_store import BinaryStore
+from .json_store import JSONStore
+from .journal_store import JournalStore
+from .sqlite_store import SQLiteStore
+from .factory import BINARY_TABLES, DATA_DIR, SQLITE_DB, SQLITE_INDEXES
+
+logger = logging.getLogger("app.migrate")
+
+# Replaces the SQLite table's contents (ids and sequence included) with the
+# JSON table, replaying a pending journal first if there is one.
+def migrate_json_to_sqlite(json_path: Path, store: SQLiteStore) -> int:
+    doc = _read_json_table(json_path)
+    store.write(doc)
+    n = len(doc.get("items", {}))
+    logger.info("migrated table=%s rows=%d from=%s", store.table, n, json_path)
+    return n
+
+# Same for a bookings table kept in a BinaryStore.
+def migrate_json_to_binary(json_path: Path, store: BinaryStore) -> int:
+    doc = _read_json_table(json_path)
+    store.write(doc)
+    n = len(doc.get("items", {}))
+    logger.info("migrated table=%s rows=%d from=%s", store.path.name, n, json_path)
+    return n
+
+def _read_json_table(json_path: Path):
+    journal = json_path.with_name(json_path.name + ".journal")
+    src = JournalStore(json_path) if journal.exists() else JSONStore(json_path)
+    return src.read()
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    ap.add_argument("--tables", default="cars,bookings")
+    ap.add_argument("--to", choices=("sqlite", "binary"), default="sqlite")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    for name in args.tables.split(","):
+        src = args.data_dir / f"{name}.json"
+        if not src.exists():
+            logger.warning("skip table=%s missing=%s", name, src)
+            continue
+        if args.to == "binary":
+            if name not in BINARY_TABLES:
+                logger.warning("skip table=%s binary=bookings only", name)
+                continue
+            migrate_json_to_binary(src, BinaryStore(args.data_dir / f"{name}.bin"))
+        else:
+            migrate_json_to_sqlite(src, SQLiteStore(args.data_dir / SQLITE_DB, name, SQLITE_INDEXES.get(name, ())))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+from dataclasses import dataclass, field
+from datetime import date
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import operator
+
+Row = Tuple[int, Dict[str, Any]]
+
+OPS = {
+    "eq": operator.eq,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "gt": operator.gt,
+    "gte": operator.ge,
+}
+
+# A filtered, ordered slice of one table. Conditions are (field, op, value)
+# triples combined with AND; the pseudo-field "id" is the row id. Dates are
+# compared as ISO strings, which is how they are stored.
+@dataclass
+class Query:
+    conditions: List[Tuple[str, str, Any]] = field(default_factory=list)
+    order_by: Optional[str] = None
+    descending: bool = False
+    limit: Optional[int] = None
+    offset: int = 0
+
+    # Django-style lookups: find(car_id=3, start_date__lte=end, order_by="-start_date").
+    @classmethod
+    def from_lookups(cls, order_by: Optional[str] = None, limit: Optional[int] = None,
+                     offset: int = 0, **lookups: Any) -> "Query":
+        conditions = []
+        for key, value in lookups.items():
+            name, _, op = key.partition("__")
+            op = op or "eq"
+            if op not in OPS:
+                raise ValueError(f"Unsupported lookup: {key}")
+            if isinstance(value, date):
+                value = value.isoformat()
+            conditions.append((name, op, value))
+        descending = bool(order_by and order_by.startswith("-"))
+        return cls(conditions, order_by.lstrip("-") if order_by else None, descending, limit, offset)
+
+    def matches(self, id_: int, doc: Dict[str, Any]) -> bool:
+        for name, op, want in self.conditions:
+            have = id_ if name == "id" else doc.get(name)
+            if have is None or not OPS[op](have, want):
+                return False
+        return True
+
+    # Smallest id a matching row can have, when an id condition bounds it.
+    def min_id(self) -> Optional[int]:
+        lo = None
+        for name, op, value in self.conditions:
+            if name == "id" and op in ("eq", "gt", "gte"):
+                bound = int(value) + (op == "gt")
+                lo = bound if lo is None else max(lo, bound)
+        return lo
+
+    # Upper bound on rows to scan for an unordered query, None if unbounded.
+    def scan_bound(self) -> Optional[int]:
+        if self.order_by not in (None, "id") or self.descending or self.limit is None:
+            return None
+        if len(self.conditions) > sum(1 for n, _, _ in self.conditions if n == "id"):
+            return None
+        return self.offset + self.limit
+
+    # Plain scan for the in-memory stores. Without order_by rows come out in id
+    # order and the scan stops as soon as the page is full.
+    def run(self, rows: Iterable[Row]) -> Iterator[Row]:
+        hits: Iterable[Row] = (r for r in rows if self.matches(*r))
+        if self.order_by == "id" and self.descending:
+            hits = sorted(hits, key=lambda r: r[0], reverse=True)
+        elif self.order_by not in (None, "id"):
+            key = self.order_by
+            hits = sorted(hits, key=lambda r: (r[1].get(key) is None, r[1].get(key), r[0]), reverse=self.descending)
+        stop = None if self.limit is None else self.offset + self.limit
+        return islice(hits, self.offset, stop)
+
+# Rows of an in-memory table for `query`, starting at the first id it can match
+# (via a RowIds view) instead of the first row of the table.
+def candidate_rows(query: Query, items: Dict[str, Dict[str, Any]], row_ids) -> Iterable[Row]:
+    lo = query.min_id()
+    if lo is None:
+        return ((int(k), v) for k, v in items.items())
+    ids = row_ids().from_id(lo, query.scan_bound())
+    return ((i, items[str(i)]) for i in ids if str(i) in items)
@@ -0,0 +1,206 @@
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import sqlite3, threading
+from filelock import FileLock
+
+from app.core.metrics import TimedLock
+from . import codec
+from .json_store import Op, STRIPES
+from .query import Query, Row
+from .views import Change, ViewSet
+
+_SQL_OPS = {"eq": "=", "lt": "<", "lte": "<=", "gt": ">", "gte": ">="}
+
+def _text(doc: Dict[str, Any]) -> str:
+    return codec.dumps(doc).decode("utf-8")
+
+def _ident(name: str) -> str:
+    if not name.isidentifier():
+        raise ValueError(f"Invalid SQL identifier: {name!r}")
+    return name
+
+class _TableState:
+    # Shared by every SQLiteStore opened on the same (database, table).
+    def __init__(self, lock_base: str, name: str):
+        self.local = threading.local()
+        self.lock = TimedLock(FileLock(lock_base + ".lock"), name, "table")
+        self.stripes = [TimedLock(FileLock(f"{lock_base}.stripe-{i}.lock"), name, "stripe") for i in range(STRIPES)]
+        self.views = ViewSet()
+        self.token = object()
+        self.version: Optional[int] = None
+        self.ready = False
+
+_states: Dict[Tuple[str, str], _TableState] = {}
+_states_guard = threading.Lock()
+
+# One table of a SQLite database (WAL mode, one connection per thread). Rows are
+# stored as JSON documents next to their integer id, so the store is a drop-in
+# for JSONStore; `indexes` lists field tuples that get expression indexes, and
+# queries built with field() use them.
+class SQLiteStore:
+    def __init__(self, path: Path, table: str, indexes: Sequence[Sequence[str]] = ()):
+        self.path = path
+        self.table = _ident(table)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        key = (str(path.resolve()), table)
+        with _states_guard:
+            if key not in _states:
+                _states[key] = _TableState(f"{key[0]}.{table}", f"{path.name}:{table}")
+            self._state = _states[key]
+        self.lock = self._state.lock
+        if not self._state.ready:
+            self._create(indexes)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._state.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), isolation_level=None, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._state.local.conn = conn
+        return conn
+
+    def _create(self, indexes: Sequence[Sequence[str]]) -> None:
+        t = self.table
+        with self.lock:
+            c = self._conn()
+            c.execute('CREATE TABLE IF NOT EXISTS _meta (tbl TEXT PRIMARY KEY, seq INTEGER NOT NULL, version INTEGER NOT NULL)')
+            c.execute(f'CREATE TABLE IF NOT EXISTS "{t}" (id INTEGER PRIMARY KEY, doc TEXT NOT NULL)')
+            c.execute("INSERT OR IGNORE INTO _meta VALUES (?, 0, 0)", (t,))
+            for fields in indexes:
+                cols = ", ".join(self.field(f) for f in fields)
+                c.execute(f'CREATE INDEX IF NOT EXISTS "ix_{t}_{"_".join(fields)}" ON "{t}"({cols})')
+        self._state.ready = True
+
+    def field(self, name: str) -> str:
+        return f"json_extract(doc, '$.{_ident(name)}')"
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> sqlite3.Cursor:
+        return self._conn().execute(sql, params)
+
+    def _meta(self) -> Tuple[int, int]:
+        return self.execute("SELECT seq, version FROM _meta WHERE tbl = ?", (self.table,)).fetchone()
+
+    # Token for the current table version; a version bumped by another
+    # connection drops the views built so far.
+    def _token(self, version: int) -> object:
+        st = self._state
+        if version != st.version:
+            st.version, st.token = version, object()
+        return st.token
+
+    def _items(self) -> Dict[str, Dict[str, Any]]:
+        rows = self.execute(f'SELECT id, doc FROM "{self.table}" ORDER BY id')
+        return {str(i): codec.loads(doc) for i, doc in rows}
+
+    # ---- store interface ----
+
+    def read(self) -> Dict[str, Any]:
+        c = self._conn()
+        c.execute("BEGIN")
+        try:
+            seq, version = self._meta()
+            items = self._items()
+        finally:
+            c.execute("COMMIT")
+        return {"_meta": {"seq": seq, "version": version}, "items": items}
+
+    def write(self, data: Dict[str, Any]) -> None:
+        t = self.table
+        with self.lock:
+            c = self._conn()
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                c.execute(f'DELETE FROM "{t}"')
+                c.executemany(
+                    f'INSERT INTO "{t}" (id, doc) VALUES (?, ?)',
+                    ((int(k), _text(v)) for k, v in data.get("items", {}).items()),
+                )
+                c.execute(
+                    "UPDATE _meta SET seq = ?, version = version + 1 WHERE tbl = ?",
+                    (int(data.get("_meta", {}).get("seq", 0)), t),
+                )
+            except BaseException:
+                c.execute("ROLLBACK")
+                raise
+            c.execute("COMMIT")
+
+    def version(self) -> int:
+        return self._meta()[1]
+
+    def get_item(self, id_: int) -> Optional[Dict[str, Any]]:
+        row = self.execute(f'SELECT doc FROM "{self.table}" WHERE id = ?', (id_,)).fetchone()
+        return codec.loads(row[0]) if row else None
+
+    def apply(self, ops: List[Op]) -> List[Change]:
+        t = self.table
+        with self.lock:
+            c = self._conn()
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                seq, version = self._meta()
+                changes: List[Change] = []
+                for op, arg in ops:
+                    if op == "insert":
+                        seq += 1
+                        c.execute(f'INSERT INTO "{t}" (id, doc) VALUES (?, ?)', (seq, _text(arg)))
+                        changes.append(("insert", seq, arg))
+                    elif op == "delete":
+                        row = c.execute(f'DELETE FROM "{t}" WHERE id = ? RETURNING doc', (int(arg),)).fetchone()
+                        if row:
+                            changes.append(("delete", int(arg), codec.loads(row[0])))
+                    else:
+                        raise ValueError(f"Unknown store operation: {op}")
+                if changes:
+                    c.execute("UPDATE _meta SET seq = ?, version = ? WHERE tbl = ?", (seq, version + 1, t))
+            except BaseException:
+                c.execute("ROLLBACK")
+                raise
+            c.execute("COMMIT")
+            if changes:
+                old = self._token(version)
+                self._state.version, self._state.token = version + 1, object()
+                self._state.views.apply(old, self._state.token, changes)
+        return changes
+
+    def insert_item(self, doc: Dict[str, Any]) -> int:
+        return self.apply([("insert", doc)])[0][1]
+
+    def delete_item(self, id_: int) -> bool:
+        return bool(self.apply([("delete", id_)]))
+
+    def _column(self, name: str) -> str:
+        return "id" if name == "id" else self.field(name)
+
+    def select(self, query: Query) -> Iterator[Row]:
+        cond = " AND ".join(f"{self._column(n)} {_SQL_OPS[op]} ?" for n, op, _ in query.conditions) or "1"
+        params: List[Any] = [v for _, _, v in query.conditions]
+        direction = "DESC" if query.descending else "ASC"
+        order = f"{self._column(query.order_by)} {direction}, id {direction}" if query.order_by else "id"
+        sql = f'SELECT id, doc FROM "{self.table}" WHERE {cond} ORDER BY {order}'
+        if query.limit is not None or query.offset:
+            sql += " LIMIT ? OFFSET ?"
+            params += [-1 if query.limit is None else query.limit, query.offset]
+        rows = self.execute(sql, params)
+        return ((i, codec.loads(doc)) for i, doc in rows)
+
+    # A view class may provide `from_sqlite(store)` to answer its queries with
+    # SQL instead of being built in memory from every row.
+    def view(self, factory: type) -> Any:
+        hook = getattr(factory, "from_sqlite", None)
+        if hook is not None:
+            return hook(self)
+        token = self._token(self._meta()[1])
+        return self._state.views.get(factory, token, self._items)
+
+    def stripe_lock(self, key: int) -> TimedLock:
+        return self._state.stripes[hash(key) % STRIPES]
+
+    def stripe_locks(self) -> List[TimedLock]:
+        return self._state.stripes
+
+    def close(self) -> None:
+        conn = getattr(self._state.local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._state.local.conn = None
@@ -0,0 +1,110 @@
+import threading
+from bisect import bisect_left, insort
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+Change = Tuple[str, int, Dict[str, Any]]  # ("insert" | "delete", id, doc)
+
+# Derived in-memory structures (indexes, typed columns) kept next to a store's
+# cached document. A view class provides:
+#   build(items)           -> view built from the {"<id>": doc} mapping, which is
+#                             only read from the store on first use (see LazyItems)
+#   on_insert(id_, doc)    -> apply one insert
+#   on_delete(id_, doc)    -> apply one delete
+# Views built for one version of the document are reused as long as the store
+# reports its writes through apply(); anything else (e.g. another worker rewriting
+# the file) drops them and they are rebuilt on next use.
+# Readers query a view without holding the mutex (see JSONStore.view and
+# JournalStore._on_state), so on_insert/on_delete must leave it queryable after
+# every step: a structure that is edited in several places at once is replaced
+# by an updated copy rather than edited in place.
+class ViewSet:
+    def __init__(self):
+        self.mutex = threading.RLock()
+        self.token: Optional[object] = None
+        self.views: Dict[type, Any] = {}
+
+    # `build`, if given, replaces factory.build(load()) (see BinaryStore.view).
+    def get(self, factory: type, token: object, load: Callable[[], Dict[str, Dict[str, Any]]],
+            build: Optional[Callable[[], Any]] = None) -> Any:
+        with self.mutex:
+            if token is not self.token:
+                self.views = {}
+                self.token = token
+            v = self.views.get(factory)
+            if v is None:
+                v = self.views[factory] = build() if build is not None else factory.build(LazyItems(load))
+            return v
+
+    # The view for `token` if it is already built, else None.
+    def peek(self, factory: type, token: object) -> Any:
+        with self.mutex:
+            return self.views.get(factory) if token is self.token else None
+
+    def apply(self, old_token: object, new_token: object, changes: List[Change]) -> None:
+        with self.mutex:
+            if old_token is not self.token:
+                self.views = {}
+            else:
+                for v in self.views.values():
+                    for op, id_, doc in changes:
+                        getattr(v, "on_" + op)(id_, doc)
+            self.token = new_token
+
+    def clear(self) -> None:
+        with self.mutex:
+            self.views = {}
+            self.token = None
+
+# The {"<id>": doc} mapping handed to build(), loaded on first access. A view
+# that starts empty (e.g. UsageCache) never touches it, so building it does not
+# turn every row of a binary or SQLite table into a dict.
+class LazyItems(Mapping):
+    def __init__(self, load: Callable[[], Dict[str, Dict[str, Any]]]):
+        self._load = load
+        self._items: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def _get(self) -> Dict[str, Dict[str, Any]]:
+        if self._items is None:
+            self._items = self._load()
+        return self._items
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        return self._get()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._get())
+
+    def __len__(self) -> int:
+        return len(self._get())
+
+    def items(self):
+        return self._get().items()
+
+    def values(self):
+        return self._get().values()
+
+# Ascending row ids, so keyset pages (id > cursor) start with a bisect instead
+# of a scan from the first row.
+class RowIds:
+    def __init__(self, ids: List[int]):
+        self.ids = ids
+
+    @classmethod
+    def build(cls, items: Dict[str, Dict[str, Any]]) -> "RowIds":
+        return cls(sorted(int(k) for k in items))
+
+    def on_insert(self, id_: int, doc: Dict[str, Any]) -> None:
+        if not self.ids or id_ > self.ids[-1]:
+            self.ids.append(id_)
+        else:
+            insort(self.ids, id_)
+
+    def on_delete(self, id_: int, doc: Dict[str, Any]) -> None:
+        i = bisect_left(self.ids, id_)
+        if i < len(self.ids) and self.ids[i] == id_:
+            del self.ids[i]
+
+    def from_id(self, lo: int, count: Optional[int] = None) -> List[int]:
+        i = bisect_left(self.ids, lo)
+        return self.ids[i:] if count is None else self.ids[i:i + count]
@@ -1,27 +1,60 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from app.core.executor import shutdown_executor
 from app.core.logger import init_logging
+from app.core.metrics import MetricsMiddleware
+from app.api.deps import build_repos
+from app.service.compactor import Compactor
+from app.json_handler.factory import set_default_engine
 from app.api.logs_endpoints import router as logs_router
 from app.api.car_endpoints import router as cars_router
 from app.api.booking_endpoint import router as bookings_router
 from app.api.seed import router as seed_router
+from app.api.metrics_endpoints import router as metrics_router
+from app.api.analytics_endpoints import router as analytics_router
 
 tags_metadata = [
     {"name": "Cars", "description": "Operations to list, read, and create cars."},
     {"name": "Bookings", "description": "Create bookings and view them."},
-    {"name": "Admin Pannel", "description": "Admin endpoints for seeding db and logging"},
+    {"name": "Admin Pannel", "description": "Admin endpoints for seeding db, logging and metrics"},
 ]
 
 init_logging()
 
+# Storage engine for every table: json (default), journal or sqlite. Individual
+# tables can still be overridden with CARS_STORE / BOOKINGS_STORE.
+STORAGE_ENGINE = os.getenv("STORAGE_ENGINE", "json")
+set_default_engine(STORAGE_ENGINE)
+
+# Repositories live for the whole app, so store caches, views and SQLite
+# connections are reused across requests (see app/api/deps.py).
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.repos = build_repos()
+    compactor = Compactor(app.state.repos)
+    compactor.start()
+    try:
+        yield
+    finally:
+        compactor.stop()
+        repos, app.state.repos = app.state.repos, None
+        repos.close()
+        shutdown_executor()
+
 app = FastAPI(
     title="Car Rental API",
     version="0.1.0",
     description="Simple demo API using JSON files for storage.",
     openapi_tags=tags_metadata,
+    lifespan=lifespan,
 )
 
-app = FastAPI(title="Car Rental API")
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(cars_router, prefix="/api")
 app.include_router(bookings_router, prefix="/api")
 app.include_router(logs_router, prefix="/api")
-app.include_router(seed_router, prefix="/api") 
\ No newline at end of file
+app.include_router(seed_router, prefix="/api") 
+app.include_router(metrics_router, prefix="/api")
+app.include_router(analytics_router, prefix="/api")
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import date
+from typing import Any, List, Literal, Optional, Union
 
 class Car(BaseModel):
     id: int
@@ -32,4 +33,27 @@ class BookingCreateBySeats(BaseModel):
     end_date: date
 
 class BookingWithPrice(Booking):
-    total_price: float
\ No newline at end of file
+    total_price: float
+
+class BatchBookingRequest(BaseModel):
+    items: List[Union[BookingCreate, BookingCreateBySeats]] = Field(min_length=1, max_length=1000)
+    mode: Literal["all_or_nothing", "best_effort"] = "all_or_nothing"
+
+class BatchBookingFailure(BaseModel):
+    index: int
+    detail: Any
+
+class BatchBookingResult(BaseModel):
+    created: List[BookingWithPrice]
+    failed: List[BatchBookingFailure]
+
+# Bookings to cancel: the given ids and/or every booking matching the filter
+# (car_id, overlapping [start_date, end_date]); at least one must be set.
+class BookingCancelRequest(BaseModel):
+    ids: Optional[List[int]] = Field(None, max_length=10000)
+    car_id: Optional[int] = None
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+
+class BookingCancelResult(BaseModel):
+    cancelled: List[Booking]
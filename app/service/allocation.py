@@ -0,0 +1,52 @@
+import os
+from datetime import date
+from typing import Iterable, Optional, Tuple
+
+from app.service.car_index import CarPriceIndex
+
+# Seat-based allocation: which free car a "book by seats" request gets.
+# - first_fit: lowest car id (the original behaviour);
+# - best_fit: the car whose neighbouring bookings leave the fewest free days
+#   around the request, so calendars fill up without unusable holes;
+# - cheapest: lowest daily price, ties broken by best fit.
+# With allow_larger, seat classes above the requested one are tried in order
+# once the exact class has no free car. Candidates come from the per-seat-class
+# lists of CarPriceIndex and each is one bisect in the booking interval index,
+# so the cost depends on the size of the seat class, not on the number of
+# bookings.
+STRATEGIES = ("first_fit", "best_fit", "cheapest")
+ALLOCATION_STRATEGY = os.getenv("ALLOCATION_STRATEGY", "first_fit")
+
+UNBOUNDED_GAP = 100_000  # free days counted for a side with no booking
+
+def fit(gaps: Tuple[Optional[int], Optional[int]]) -> int:
+    before, after = gaps
+    return (UNBOUNDED_GAP if before is None else before) + (UNBOUNDED_GAP if after is None else after)
+
+def allocate(catalogue: CarPriceIndex, index, seats: int, start: date, end: date,
+             strategy: str = ALLOCATION_STRATEGY, allow_larger: bool = False,
+             exclude: Iterable[int] = ()) -> Optional[int]:
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown allocation strategy: {strategy}")
+    excluded = set(exclude)
+    classes = sorted(s for s in catalogue.by_seats if s > seats) if allow_larger else []
+    for cls in (seats, *classes):
+        best, best_key = None, None
+        for price, cid in catalogue.by_seats.get(cls, ()):
+            if cid in excluded:
+                continue
+            if strategy == "first_fit":
+                if (best is None or cid < best) and index.is_free(cid, start, end):
+                    best = cid
+                continue
+            if strategy == "cheapest" and best_key is not None and price > best_key[0]:
+                break  # the class is sorted by price
+            gaps = index.gaps(cid, start, end)
+            if gaps is None:
+                continue
+            key = (price, fit(gaps), cid) if strategy == "cheapest" else (fit(gaps), cid)
+            if best_key is None or key < best_key:
+                best, best_key = cid, key
+        if best is not None:
+            return best
+    return None
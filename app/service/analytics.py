@@ -0,0 +1,272 @@
+import logging
+import threading
+from collections import OrderedDict, deque
+from datetime import date
+from itertools import accumulate
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.service.car_index import CarPriceIndex
+from app.service.interval_index import BookingIntervalIndex, ordinal
+
+logger = logging.getLogger("app.service.analytics")
+
+MAX_ANALYTICS_DAYS = 3660
+MAX_CACHED_MONTHS = 240  # (group_by, month) entries kept by UsageCache
+MAX_PENDING_CHANGES = 10_000  # queued booking changes before UsageCache is dropped
+GROUPINGS = ("car", "seats", "make")
+
+# Per day of a period, for every group: booked cars and revenue (the booked
+# cars' daily_price), e.g. {5: ([3, 4, ...], [150.0, 220.0, ...])}.
+Usage = Dict[Any, Tuple[List[int], List[float]]]
+
+def _group_key(group_by: str, car_id: int, car: Dict[str, Any]) -> Any:
+    if group_by == "car":
+        return car_id
+    if group_by == "seats":
+        return int(car.get("seats", 0))
+    return str(car.get("make"))
+
+# Usage of [first, last] (day ordinals) in one pass over the overlapping
+# bookings of every index (hot table and archive): each booking adds
+# +1/+price where it starts and -1/-price after it ends, and running sums turn
+# those differences into per-day values. Older data files can hold overlapping
+# bookings of one car, so each car's bookings are merged first and a day
+# counts once however many bookings cover it.
+def compute_usage(catalogue: CarPriceIndex, indexes: Sequence, group_by: str, first: int, last: int) -> Usage:
+    n = last - first + 1
+    by_car: Dict[int, List[Tuple[int, int]]] = {}
+    for index in indexes:
+        for car_id, s, e in index.spans(date.fromordinal(first), date.fromordinal(last)):
+            by_car.setdefault(car_id, []).append((max(s, first) - first, min(e, last) - first + 1))
+    diffs: Dict[Any, Tuple[List[int], List[float]]] = {}
+    for car_id, spans in by_car.items():
+        car = catalogue.cars.get(car_id)
+        if car is None:
+            continue
+        key = _group_key(group_by, car_id, car)
+        d = diffs.get(key)
+        if d is None:
+            d = diffs[key] = ([0] * (n + 1), [0.0] * (n + 1))
+        price = float(car.get("daily_price", 0.0))
+        for a, b in _merged(spans):
+            d[0][a] += 1
+            d[0][b] -= 1
+            d[1][a] += price
+            d[1][b] -= price
+    return {key: (list(accumulate(c[:n])), list(accumulate(r[:n]))) for key, (c, r) in diffs.items()}
+
+# Half-open [a, b) spans joined where they overlap or touch.
+def _merged(spans: List[Tuple[int, int]]) -> Iterator[Tuple[int, int]]:
+    spans.sort()
+    a, b = spans[0]
+    for s, e in spans[1:]:
+        if s > b:
+            yield a, b
+            a, b = s, e
+        elif e > b:
+            b = e
+    yield a, b
+
+# Usage of closed months (ending before today), per grouping, kept as a view on
+# the bookings store. While months are cached, inserts and deletes are queued
+# by the view callbacks and applied to the cached months they touch on the
+# next request, which is when the cars (for group and price) are at hand.
+# Draining the queue and filling a month happen under the store lock, which
+# writers hold while updating views, so a booking is never both in a freshly
+# computed month and still queued.
+# A change moves its days by exactly one booked car only if no other booking
+# of the car covers them; when one does (older data files can hold overlaps),
+# the cached months it touches are dropped and computed again instead.
+# The cache starts empty whenever the store rebuilds its views, and is
+# dropped if the cars table was replaced.
+class UsageCache:
+    def __init__(self):
+        self.mutex = threading.Lock()
+        self.months: "OrderedDict[Tuple[str, int], Usage]" = OrderedDict()  # (group_by, first day) -> usage
+        self.pending: deque = deque()
+        self.catalogue: Optional[CarPriceIndex] = None
+
+    @classmethod
+    def build(cls, items: Dict[str, Dict[str, Any]]) -> "UsageCache":
+        return cls()
+
+    # With no cached month there is nothing to update: a month computed later
+    # already sees the row. Past MAX_PENDING_CHANGES the cache is dropped
+    # instead of queueing more.
+    def _queue(self, sign: int, id_: int, doc: Dict[str, Any]) -> None:
+        if not self.months:
+            return
+        if len(self.pending) >= MAX_PENDING_CHANGES:
+            with self.mutex:
+                self.months.clear()
+                self.pending.clear()
+            return
+        self.pending.append((sign, id_, doc))
+
+    def on_insert(self, id_: int, doc: Dict[str, Any]) -> None:
+        self._queue(1, id_, doc)
+
+    def on_delete(self, id_: int, doc: Dict[str, Any]) -> None:
+        self._queue(-1, id_, doc)
+
+    def _refresh(self, catalogue: CarPriceIndex, indexes: Sequence) -> None:
+        if catalogue is not self.catalogue:
+            self.months.clear()
+            self.catalogue = catalogue
+        changes = []
+        by_car: Dict[int, List[Tuple[int, int, int]]] = {}  # car_id -> queued (id, start, end)
+        while self.pending:
+            sign, id_, doc = self.pending.popleft()
+            car_id, s, e = int(doc["car_id"]), ordinal(doc["start_date"]), ordinal(doc["end_date"])
+            changes.append((sign, id_, car_id, s, e))
+            by_car.setdefault(car_id, []).append((id_, s, e))
+        for sign, id_, car_id, s, e in changes:
+            car = catalogue.cars.get(car_id)
+            if car is None:
+                continue
+            touched = [k for k in self.months if s <= _month_last(k[1]) and e >= k[1]]
+            if not touched:
+                continue
+            start, end = date.fromordinal(s), date.fromordinal(e)
+            if (any(other != id_ for index in indexes for other in index.overlapping(car_id, start, end))
+                    or any(other != id_ and a <= e and b >= s for other, a, b in by_car[car_id])):
+                for k in touched:
+                    del self.months[k]
+                continue
+            price = sign * float(car.get("daily_price", 0.0))
+            for group_by, first in touched:
+                usage, last = self.months[(group_by, first)], _month_last(first)
+                key = _group_key(group_by, car_id, car)
+                if key not in usage:
+                    usage[key] = ([0] * (last - first + 1), [0.0] * (last - first + 1))
+                counts, revenue = usage[key]
+                for i in range(max(s, first) - first, min(e, last) - first + 1):
+                    counts[i] += sign
+                    revenue[i] += price
+
+    # Days [lo, hi] of the month starting at `first`.
+    def window(self, catalogue: CarPriceIndex, indexes: Sequence, lock, group_by: str, first: int, lo: int, hi: int) -> Usage:
+        key = (group_by, first)
+        with self.mutex:
+            usage = self.months.get(key)
+            if usage is not None and not self.pending and catalogue is self.catalogue:
+                self.months.move_to_end(key)
+                return _slice(usage, lo - first, hi - first)
+        with lock, self.mutex:
+            self._refresh(catalogue, indexes)
+            usage = self.months.get(key)
+            if usage is None:
+                usage = self.months[key] = compute_usage(catalogue, indexes, group_by, first, _month_last(first))
+                if len(self.months) > MAX_CACHED_MONTHS:
+                    self.months.popitem(last=False)
+            return _slice(usage, lo - first, hi - first)
+
+def _slice(usage: Usage, a: int, b: int) -> Usage:
+    return {key: (counts[a:b + 1], revenue[a:b + 1]) for key, (counts, revenue) in usage.items()}
+
+def _month_last(first: int) -> int:
+    d = date.fromordinal(first)
+    nxt = date(d.year + d.month // 12, d.month % 12 + 1, 1)
+    return nxt.toordinal() - 1
+
+# (first, last) ordinals of the calendar months covering [start, end].
+def _months(start: date, end: date) -> Iterator[Tuple[int, int]]:
+    first = start.replace(day=1).toordinal()
+    while first <= end.toordinal():
+        last = _month_last(first)
+        yield first, last
+        first = last + 1
+
+# Usage of [start, end] per group, assembled month by month: closed months
+# come from the UsageCache, the current and future months are computed. The
+# archive only changes together with a rewrite of the hot table (see
+# compactor.py), which also starts a new UsageCache.
+def _usage(cars_repo, bookings_repo, archive_repo, group_by: str, start: date,
+           end: date) -> Tuple[CarPriceIndex, Usage, int]:
+    if group_by not in GROUPINGS:
+        raise ValueError(f"Unknown grouping: {group_by}")
+    if end < start:
+        raise ValueError("end must be the same as or after start")
+    n = (end - start).days + 1
+    if n > MAX_ANALYTICS_DAYS:
+        raise ValueError(f"Analytics range is limited to {MAX_ANALYTICS_DAYS} days")
+
+    catalogue = cars_repo.view(CarPriceIndex)
+    indexes = [bookings_repo.view(BookingIntervalIndex)]
+    if archive_repo is not None:
+        indexes.append(archive_repo.view(BookingIntervalIndex))
+    cache = bookings_repo.view(UsageCache)
+    today = date.today().toordinal()
+    s0, e0 = start.toordinal(), end.toordinal()
+
+    out: Usage = {}
+    for first, last in _months(start, end):
+        lo, hi = max(first, s0), min(last, e0)
+        if last < today:
+            usage = cache.window(catalogue, indexes, bookings_repo.store.lock, group_by, first, lo, hi)
+        else:
+            usage = compute_usage(catalogue, indexes, group_by, lo, hi)
+        for key, (counts, revenue) in usage.items():
+            row = out.get(key)
+            if row is None:
+                row = out[key] = ([0] * n, [0.0] * n)
+            row[0][lo - s0:hi - s0 + 1] = counts
+            row[1][lo - s0:hi - s0 + 1] = revenue
+    return catalogue, out, n
+
+def _group_sizes(catalogue: CarPriceIndex, group_by: str) -> Dict[Any, int]:
+    sizes: Dict[Any, int] = {}
+    for car_id, car in list(catalogue.cars.items()):
+        key = _group_key(group_by, car_id, car)
+        sizes[key] = sizes.get(key, 0) + 1
+    return sizes
+
+# Share of car-days booked over [start, end], per group and overall, with an
+# optional per-day series (percent of the group's cars booked that day).
+def utilisation(cars_repo, bookings_repo, start: date, end: date, group_by: str = "seats",
+                daily: bool = True, archive_repo=None) -> Dict[str, Any]:
+    catalogue, usage, n = _usage(cars_repo, bookings_repo, archive_repo, group_by, start, end)
+    groups = []
+    total_cars = total_booked = 0
+    for key, size in sorted(_group_sizes(catalogue, group_by).items()):
+        counts = usage.get(key, ([0] * n,))[0]
+        booked = sum(counts)
+        total_cars += size
+        total_booked += booked
+        row = {"key": key, "cars": size, "booked_days": booked, "utilisation": round(booked / (size * n) * 100, 2)}
+        if daily:
+            row["daily"] = [round(c / size * 100, 2) for c in counts]
+        groups.append(row)
+
+    logger.info("analytics_utilisation start=%s end=%s group_by=%s groups=%d",
+                start.isoformat(), end.isoformat(), group_by, len(groups))
+    return {
+        "start": start, "end": end, "group_by": group_by, "days": n,
+        "total": {"cars": total_cars, "booked_days": total_booked,
+                  "utilisation": round(total_booked / (total_cars * n) * 100, 2) if total_cars else 0.0},
+        "groups": groups,
+    }
+
+# Revenue earned over [start, end] (each booked day at the car's daily_price),
+# per group and overall, with an optional per-day series.
+def revenue(cars_repo, bookings_repo, start: date, end: date, group_by: str = "seats",
+            daily: bool = True, archive_repo=None) -> Dict[str, Any]:
+    catalogue, usage, n = _usage(cars_repo, bookings_repo, archive_repo, group_by, start, end)
+    groups = []
+    total = 0.0
+    for key, size in sorted(_group_sizes(catalogue, group_by).items()):
+        per_day = usage[key][1] if key in usage else [0.0] * n
+        amount = round(sum(per_day), 2)
+        total += amount
+        row = {"key": key, "cars": size, "revenue": amount}
+        if daily:
+            row["daily"] = [round(r, 2) for r in per_day]
+        groups.append(row)
+
+    logger.info("analytics_revenue start=%s end=%s group_by=%s groups=%d",
+                start.isoformat(), end.isoformat(), group_by, len(groups))
+    return {
+        "start": start, "end": end, "group_by": group_by, "days": n,
+        "total": {"revenue": round(total, 2)},
+        "groups": groups,
+    }
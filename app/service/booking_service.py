@@ -1,36 +1,74 @@
 import logging
+import os
 from datetime import date
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, List, Optional
+
+from app.service.allocation import ALLOCATION_STRATEGY, allocate
+from app.service.car_index import CarPriceIndex
+from app.service.interval_index import BookingIntervalIndex, MergedIntervalIndex
+from app.service.occupancy import OccupancyBitsets
 
 logger = logging.getLogger("app.service.booking")
 
+# Conflict alternatives: how many to suggest and how to rank them (see RANKINGS).
+ALTERNATIVES_LIMIT = int(os.getenv("ALTERNATIVES_LIMIT", "3"))
+ALTERNATIVES_RANK = os.getenv("ALTERNATIVES_RANK", "price")
+RANKINGS = ("price", "nearest_price", "same_make")
+
+class BookingConflict(ValueError):
+    pass
+
 def _validate_and_days(start: date, end: date) -> int:
     if end < start:
         raise ValueError("end_date must be the same as or after start_date")
     return (end - start).days + 1
 
-def _overlaps(a_start: date, a_end: date, b_start: date, b_end: date) -> bool:
-    return (a_start <= b_end) and (b_start <= a_end)
+# Interval index that availability is checked against. Archived bookings (see
+# compactor.py) still hold their cars, so with `archive_repo` the archive is
+# checked as well. The archive only changes while compact_bookings holds every
+# lock of the hot table, so inside a bookings transaction both checks see one
+# consistent state.
+def _booking_index(bookings_repo, archive_repo=None):
+    index = bookings_repo.view(BookingIntervalIndex)
+    if archive_repo is None:
+        return index
+    return MergedIntervalIndex(index, archive_repo.view(BookingIntervalIndex))
 
-def _row_to_range(b: Dict[str, Any]) -> tuple[date, date]:
-    bs = date.fromisoformat(str(b["start_date"]))
-    be = date.fromisoformat(str(b["end_date"]))
-    return bs, be
+# Free cars with the same seat count as `car`, walked in ranking order from the
+# price-sorted car index and checked against the booking index until `limit`
+# are found:
+# - price: cheapest first;
+# - nearest_price: closest daily price to `car` first;
+# - same_make: cars of the same make first, then the rest, by nearest price.
+def _alternative_cars_same_seats(cars_repo, bookings_repo, car: Dict[str, Any], start: date, end: date,
+                                 limit: int = ALTERNATIVES_LIMIT, rank: str = ALTERNATIVES_RANK,
+                                 archive_repo=None) -> List[Dict[str, Any]]:
+    if rank not in RANKINGS:
+        raise ValueError(f"Unknown alternatives ranking: {rank}")
+    catalogue = cars_repo.view(CarPriceIndex)
+    index = _booking_index(bookings_repo, archive_repo)
+    seats, price = int(car.get("seats", 0)), float(car.get("daily_price", 0.0))
+    if rank == "price":
+        ranked = catalogue.by_price(seats)
+    elif rank == "nearest_price":
+        ranked = catalogue.by_nearest_price(seats, price)
+    else:
+        ranked = catalogue.by_same_make(seats, str(car.get("make")), price)
 
-def _alternative_cars_same_seats(cars_repo, bookings_repo, seats: int, start: date, end: date, exclude_car_id, limit: int = 3) -> List[Dict[str, Any]]:
-    available = list_available_cars_for_period(cars_repo, bookings_repo, start, end)
-    candidates = [
-        c for c in available
-        if int(c.get("seats", 0)) == int(seats) and (exclude_car_id is None or c["id"] != exclude_car_id)
-    ]
-    candidates.sort(key=lambda c: (float(c.get("daily_price", 0.0)), c["id"]))
-    return [
-        {"id": c["id"], "make": c.get("make"), "model": c.get("model"), "daily_price": c.get("daily_price")}
-        for c in candidates[:limit]
-    ]
+    out: List[Dict[str, Any]] = []
+    for cid in ranked:
+        if len(out) >= limit:
+            break
+        if cid == car["id"] or not index.is_free(cid, start, end):
+            continue
+        c = catalogue.cars[cid]
+        out.append({"id": cid, "make": c.get("make"), "model": c.get("model"), "daily_price": c.get("daily_price")})
+    return out
 
 def ensure_available_and_create_booking(
-    cars_repo, bookings_repo, car_id: int, start: date, end: date
+    cars_repo, bookings_repo, car_id: int, start: date, end: date,
+    alternatives_limit: int = ALTERNATIVES_LIMIT, alternatives_rank: str = ALTERNATIVES_RANK,
+    archive_repo=None,
 ) -> Dict[str, Any]:
     car = cars_repo.get(car_id)
     if not car:
@@ -39,31 +77,34 @@ def ensure_available_and_create_booking(
 
     days = _validate_and_days(start, end)
 
-    for b in bookings_repo.list():
-        if b["car_id"] != car_id:
-            continue
-        bs, be = _row_to_range(b)
-        if _overlaps(start, end, bs, be):
-            seats = int(car.get("seats", 0))
-            alternatives = _alternative_cars_same_seats(
-                cars_repo, bookings_repo, seats, start, end, exclude_car_id=car_id, limit=3
-            )
-            logger.info(
-                "booking_conflict car_id=%s start=%s end=%s alternatives=%d",
-                car_id, start.isoformat(), end.isoformat(), len(alternatives)
-            )
-            raise ValueError({
-                "message": "Car already booked for that period",
-                "alternatives": alternatives
-            })
-
     doc = {
         "car_id": car_id,
         "start_date": start.isoformat(),
         "end_date": end.isoformat(),
         "days": days,
     }
-    created = bookings_repo.insert(doc)
+    # Every booking write for a car goes through its stripe, so the check and
+    # the insert below cannot interleave with another booking of the same car.
+    with bookings_repo.transaction(stripe=car_id) as tx:
+        free = _booking_index(tx, archive_repo).is_free(car_id, start, end)
+        if free:
+            tx.insert(doc)
+
+    if not free:
+        alternatives = _alternative_cars_same_seats(
+            cars_repo, bookings_repo, car, start, end,
+            limit=alternatives_limit, rank=alternatives_rank, archive_repo=archive_repo
+        )
+        logger.info(
+            "booking_conflict car_id=%s start=%s end=%s alternatives=%d",
+            car_id, start.isoformat(), end.isoformat(), len(alternatives)
+        )
+        raise BookingConflict({
+            "message": "Car already booked for that period",
+            "alternatives": alternatives
+        })
+
+    created = tx.created[0]
 
     total_price = round(days * float(car.get("daily_price", 0.0)), 2)
 
@@ -75,42 +116,186 @@ def ensure_available_and_create_booking(
     return {**created, "total_price": total_price}
 
 def list_available_cars_for_period(
-    cars_repo, bookings_repo, start: date, end: date
+    cars_repo, bookings_repo, start: date, end: date, archive_repo=None
 ) -> List[Dict[str, Any]]:
     _validate_and_days(start, end)
 
-    booked: dict[int, list[tuple[date, date]]] = {}
-    for b in bookings_repo.list():
-        cid = b["car_id"]
-        bs, be = _row_to_range(b)
-        booked.setdefault(cid, []).append((bs, be))
-
-    available: List[Dict[str, Any]] = []
-    for c in cars_repo.list():
-        cid = c["id"]
-        ranges = booked.get(cid, [])
-        if any(_overlaps(start, end, bs, be) for (bs, be) in ranges):
-            continue
-        available.append(c)
+    index = _booking_index(bookings_repo, archive_repo)
+    available = [c for c in cars_repo.list() if index.is_free(c["id"], start, end)]
 
     logger.info("available_cars start=%s end=%s result=%d", start.isoformat(), end.isoformat(), len(available))
     return available
 
-def choose_car_by_seats(cars_repo, bookings_repo, seats: int, start: date, end: date) -> Dict[str, Any]:
+def choose_car_by_seats(
+    cars_repo, bookings_repo, seats: int, start: date, end: date, exclude: Iterable[int] = (),
+    strategy: str = ALLOCATION_STRATEGY, allow_larger: bool = False, archive_repo=None,
+) -> Dict[str, Any]:
     _validate_and_days(start, end)
 
-    available = list_available_cars_for_period(cars_repo, bookings_repo, start, end)
+    catalogue = cars_repo.view(CarPriceIndex)
+    index = _booking_index(bookings_repo, archive_repo)
+    cid = allocate(catalogue, index, seats, start, end, strategy=strategy, allow_larger=allow_larger, exclude=exclude)
+    if cid is None:
+        raise ValueError("No available car with the requested number of seats for that period")
 
-    candidates = [c for c in available if c.get("seats") == seats]
+    logger.info("choose_car_by_seats chosen_id=%s seats=%s strategy=%s", cid, seats, strategy)
+    return {"id": cid, **catalogue.cars[cid]}
 
-    if not candidates:
-        raise ValueError("No available car with the requested number of seats for that period")
+# The chosen car can be taken by a concurrent request between choosing and
+# booking; in that case move on to the next candidate.
+def book_by_seats(cars_repo, bookings_repo, seats: int, start: date, end: date,
+                  strategy: str = ALLOCATION_STRATEGY, allow_larger: bool = False,
+                  archive_repo=None) -> Dict[str, Any]:
+    lost: List[int] = []
+    while True:
+        chosen = choose_car_by_seats(cars_repo, bookings_repo, seats, start, end, exclude=lost,
+                                     strategy=strategy, allow_larger=allow_larger, archive_repo=archive_repo)
+        try:
+            return ensure_available_and_create_booking(cars_repo, bookings_repo, chosen["id"], start, end,
+                                                       archive_repo=archive_repo)
+        except BookingConflict:
+            logger.info("booking_by_seats_retry lost_car_id=%s seats=%s", chosen["id"], seats)
+            lost.append(chosen["id"])
+
+# Books many items against one snapshot of availability and commits them in a
+# single write. Items are {"car_id" | "seats", "start_date", "end_date"} with
+# date values; seat-based items get the lowest-id free car, counting the cars
+# already assigned earlier in the same batch. With all_or_nothing, any failure
+# leaves the store untouched. Returns (created, failed) where failed holds
+# {"index", "detail"} entries.
+def create_bookings_batch(
+    cars_repo, bookings_repo, items: List[Dict[str, Any]], all_or_nothing: bool = True, archive_repo=None
+) -> tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    cars = {c["id"]: c for c in cars_repo.list()}
+    by_seats: Dict[int, List[int]] = {}
+    for cid in sorted(cars):
+        by_seats.setdefault(int(cars[cid].get("seats", 0)), []).append(cid)
+
+    accepted: List[Dict[str, Any]] = []
+    failed: List[Dict[str, Any]] = []
+    taken: Dict[int, List[tuple[int, int]]] = {}  # car_id -> accepted (start, end) ordinals
 
-    candidates.sort(key=lambda c: c["id"])
-    chosen = candidates[0]
-    logger.info("choose_car_by_seats chosen_id=%s seats=%s", chosen["id"], seats)
-    return chosen
+    def free(index, cid: int, start: date, end: date) -> bool:
+        s, e = start.toordinal(), end.toordinal()
+        return index.is_free(cid, start, end) and all(not (s <= te and ts <= e) for ts, te in taken.get(cid, ()))
 
-def book_by_seats(cars_repo, bookings_repo, seats: int, start: date, end: date) -> Dict[str, Any]:
-    chosen = choose_car_by_seats(cars_repo, bookings_repo, seats, start, end)
-    return ensure_available_and_create_booking(cars_repo, bookings_repo, chosen["id"], start, end)
\ No newline at end of file
+    with bookings_repo.transaction() as tx:
+        index = _booking_index(tx, archive_repo)
+        for i, item in enumerate(items):
+            start, end = item["start_date"], item["end_date"]
+            if end < start:
+                failed.append({"index": i, "detail": "end_date must be the same as or after start_date"})
+                continue
+            if item.get("car_id") is not None:
+                cid = item["car_id"]
+                if cid not in cars:
+                    failed.append({"index": i, "detail": "Car not found"})
+                    continue
+                if not free(index, cid, start, end):
+                    failed.append({"index": i, "detail": "Car already booked for that period"})
+                    continue
+            else:
+                cid = next((c for c in by_seats.get(item["seats"], ()) if free(index, c, start, end)), None)
+                if cid is None:
+                    failed.append({"index": i, "detail": "No available car with the requested number of seats for that period"})
+                    continue
+            taken.setdefault(cid, []).append((start.toordinal(), end.toordinal()))
+            accepted.append({
+                "car_id": cid,
+                "start_date": start.isoformat(),
+                "end_date": end.isoformat(),
+                "days": (end - start).days + 1,
+            })
+
+        if failed and all_or_nothing:
+            accepted = []
+        for doc in accepted:
+            tx.insert(doc)
+
+    created = [
+        {**row, "total_price": round(row["days"] * float(cars[row["car_id"]].get("daily_price", 0.0)), 2)}
+        for row in tx.created
+    ]
+    logger.info(
+        "booking_batch items=%d created=%d failed=%d all_or_nothing=%s",
+        len(items), len(created), len(failed), all_or_nothing
+    )
+    return created, failed
+
+# Ids of the bookings in `repo` that a cancel request selects: the given ids,
+# every booking matching the filter, or, with both, the ids that match it.
+def _cancel_matches(repo, ids: Optional[List[int]], lookups: Dict[str, Any]) -> List[int]:
+    if not lookups:
+        return sorted(set(ids))
+    matched = [b["id"] for b in repo.find(**lookups)]
+    if ids is not None:
+        wanted = set(ids)
+        matched = [i for i in matched if i in wanted]
+    return matched
+
+# Cancels the given ids and/or every booking matching the filter (car_id,
+# overlapping [start, end]); with both, only ids that also match the filter.
+# All matches are deleted in one store write. Archived bookings still hold
+# their cars, so with `archive_repo` the archive is searched for what the hot
+# table did not have. Rows only move into the archive while the compactor
+# holds every lock of the hot table, so after the hot delete a selected
+# booking is either cancelled or archived, and the archive delete takes the
+# same locks so it cannot interleave with an archive rewrite. Returns the
+# cancelled bookings.
+def cancel_bookings(
+    bookings_repo, ids: Optional[List[int]] = None, car_id: Optional[int] = None,
+    start: Optional[date] = None, end: Optional[date] = None, archive_repo=None,
+) -> List[Dict[str, Any]]:
+    lookups: Dict[str, Any] = {}
+    if car_id is not None:
+        lookups["car_id"] = car_id
+    if start is not None:
+        lookups["end_date__gte"] = start
+    if end is not None:
+        lookups["start_date__lte"] = end
+    if ids is None and not lookups:
+        raise ValueError("Give booking ids or a filter (car_id, start_date, end_date)")
+    if start is not None and end is not None and end < start:
+        raise ValueError("end_date must be the same as or after start_date")
+
+    cancelled = bookings_repo.delete_many(_cancel_matches(bookings_repo, ids, lookups))
+    archived: List[Dict[str, Any]] = []
+    if archive_repo is not None:
+        done = {b["id"] for b in cancelled}
+        rest = [i for i in _cancel_matches(archive_repo, ids, lookups) if i not in done]
+        if rest:
+            with bookings_repo.transaction():
+                archived = archive_repo.delete_many(rest)
+    logger.info("bookings_cancelled count=%d archived=%d car_id=%s start=%s end=%s ids=%d",
+                len(cancelled) + len(archived), len(archived), car_id, start, end, len(ids or ()))
+    return cancelled + archived
+
+MAX_CALENDAR_DAYS = 366
+
+# Day-by-day availability of every car over [start, end]. Booked days come
+# from the per-car occupancy bitsets; each car's free days are rendered as a
+# string ("1" = free, "0" = booked, character i = start + i days) and the
+# per-day free counts are column counts over those strings.
+def availability_calendar(cars_repo, bookings_repo, start: date, end: date, archive_repo=None) -> Dict[str, Any]:
+    n_days = _validate_and_days(start, end)
+    if n_days > MAX_CALENDAR_DAYS:
+        raise ValueError(f"Calendar range is limited to {MAX_CALENDAR_DAYS} days")
+
+    busy = bookings_repo.view(OccupancyBitsets).busy(start, end)
+    if archive_repo is not None:
+        for cid, bits in archive_repo.view(OccupancyBitsets).busy(start, end).items():
+            busy[cid] = busy.get(cid, 0) | bits
+    full = (1 << n_days) - 1
+    car_ids = [c["id"] for c in cars_repo.list()]
+    rows = [format(full & ~busy.get(cid, 0), f"0{n_days}b")[::-1] for cid in car_ids]
+
+    grid = "".join(rows)
+    free_count = [grid[i::n_days].count("1") for i in range(n_days)]
+
+    logger.info("availability_calendar start=%s end=%s cars=%d", start.isoformat(), end.isoformat(), len(car_ids))
+    return {
+        "start": start,
+        "end": end,
+        "free_count": free_count,
+        "cars": [{"id": cid, "free": row} for cid, row in zip(car_ids, rows)],
+    }
@@ -0,0 +1,77 @@
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterator, List, Tuple
+
+PriceKey = Tuple[float, int]  # (daily_price, car id)
+
+# Cars grouped by seat count (and by seat count + make), each group sorted by
+# daily price, maintained as a view on the cars store. Ranked candidates are
+# produced lazily, so a caller that stops after k free cars pays O(k) steps
+# plus one O(log n) bisect, not a scan and sort of the fleet.
+class CarPriceIndex:
+    def __init__(self):
+        self.cars: Dict[int, Dict[str, Any]] = {}
+        self.by_seats: Dict[int, List[PriceKey]] = {}
+        self.by_seats_make: Dict[Tuple[int, str], List[PriceKey]] = {}
+
+    @classmethod
+    def build(cls, items: Dict[str, Dict[str, Any]]) -> "CarPriceIndex":
+        idx = cls()
+        for k, c in items.items():
+            idx._add(int(k), c, sort=False)
+        for keys in (*idx.by_seats.values(), *idx.by_seats_make.values()):
+            keys.sort()
+        return idx
+
+    def _groups(self, car: Dict[str, Any]) -> List[List[PriceKey]]:
+        seats = int(car.get("seats", 0))
+        return [self.by_seats.setdefault(seats, []),
+                self.by_seats_make.setdefault((seats, str(car.get("make"))), [])]
+
+    def _add(self, id_: int, car: Dict[str, Any], sort: bool = True) -> None:
+        self.cars[id_] = car
+        key = (float(car.get("daily_price", 0.0)), id_)
+        for keys in self._groups(car):
+            if sort:
+                insort(keys, key)
+            else:
+                keys.append(key)
+
+    def on_insert(self, id_: int, doc: Dict[str, Any]) -> None:
+        self._add(id_, doc)
+
+    def on_delete(self, id_: int, doc: Dict[str, Any]) -> None:
+        self.cars.pop(id_, None)
+        key = (float(doc.get("daily_price", 0.0)), id_)
+        for keys in self._groups(doc):
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                del keys[i]
+
+    # Cheapest first.
+    def by_price(self, seats: int) -> Iterator[int]:
+        return (id_ for _, id_ in self.by_seats.get(seats, ()))
+
+    # Closest daily price first (ties go to the cheaper car).
+    def by_nearest_price(self, seats: int, price: float) -> Iterator[int]:
+        return _nearest(self.by_seats.get(seats, []), price)
+
+    # Same make first, then the rest of the seat group, each by nearest price.
+    def by_same_make(self, seats: int, make: str, price: float) -> Iterator[int]:
+        same = self.by_seats_make.get((seats, make), [])
+        yield from _nearest(same, price)
+        for id_ in _nearest(self.by_seats.get(seats, []), price):
+            if self.cars[id_].get("make") != make:
+                yield id_
+
+# Ids of `keys` ordered by distance of their price to `price`, walking outwards
+# from the bisect position.
+def _nearest(keys: List[PriceKey], price: float) -> Iterator[int]:
+    hi = bisect_left(keys, (price, -1))
+    lo = hi - 1
+    while lo >= 0 or hi < len(keys):
+        if hi >= len(keys) or (lo >= 0 and price - keys[lo][0] <= keys[hi][0] - price):
+            yield keys[lo][1]
+            lo -= 1
+        else:
+            yield keys[hi][1]
+            hi += 1
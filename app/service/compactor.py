@@ -0,0 +1,82 @@
+import logging
+import os
+import threading
+from datetime import date, timedelta
+from typing import Optional
+
+from filelock import FileLock, Timeout
+
+logger = logging.getLogger("app.service.compactor")
+
+# Bookings that ended more than ARCHIVE_AFTER_DAYS ago are moved to the
+# archive table every COMPACT_INTERVAL seconds. Archiving is opt-in: the
+# default 0 disables the thread, because the booking list endpoints only read
+# the hot table.
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+COMPACT_INTERVAL = float(os.getenv("COMPACT_INTERVAL", "0"))
+
+# Moves past bookings out of the hot table and rewrites it. The rewrite is also
+# what purges cancelled rows: a journal table gets a fresh snapshot with an
+# empty journal. Archived rows keep their ids and the hot table keeps its id
+# sequence. The archive is written first, so a crash in between leaves rows in
+# both tables and the next run simply moves them again. Holds every lock of
+# the hot table while it runs, so no booking is checked against a half-moved
+# table. Archived rows still block their cars: the booking service checks the
+# archive too (see booking_service._booking_index). Returns the number of rows
+# archived.
+def compact_bookings(bookings_repo, archive_repo, today: Optional[date] = None,
+                     keep_days: int = ARCHIVE_AFTER_DAYS) -> int:
+    cutoff = ((today or date.today()) - timedelta(days=keep_days)).isoformat()
+    with bookings_repo.transaction():
+        doc = bookings_repo.store.read()
+        items = doc.get("items", {})
+        old = {k: b for k, b in items.items() if b["end_date"] < cutoff}
+        if old:
+            archive = archive_repo.store.read()
+            archive_repo.store.write({**archive, "items": {**archive.get("items", {}), **old}})
+            bookings_repo.store.write({**doc, "items": {k: b for k, b in items.items() if k not in old}})
+        else:
+            compact = getattr(bookings_repo.store, "compact", None)
+            if compact is not None:
+                compact()
+    logger.info("bookings_compacted archived=%d hot=%d cutoff=%s", len(old), len(items) - len(old), cutoff)
+    return len(old)
+
+# Runs compact_bookings every `interval` seconds until stopped. Every worker
+# starts one, but only the worker holding `<data_dir>/compactor.lock` compacts:
+# the others try the lock without waiting on each tick and take over once the
+# holder's process exits.
+class Compactor:
+    def __init__(self, repos, interval: float = COMPACT_INTERVAL):
+        self.repos = repos
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = FileLock(str(repos.data_dir / "compactor.lock"), thread_local=False)
+
+    def start(self) -> None:
+        if self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name="bookings-compactor", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.wait(self.interval):
+                if not self._lock.is_locked:
+                    try:
+                        self._lock.acquire(timeout=0)
+                    except Timeout:
+                        continue
+                    logger.info("compactor_started pid=%d", os.getpid())
+                try:
+                    compact_bookings(self.repos.bookings, self.repos.bookings_archive)
+                except Exception:
+                    logger.exception("bookings_compaction_failed")
+        finally:
+            if self._lock.is_locked:
+                self._lock.release()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
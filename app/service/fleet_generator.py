@@ -0,0 +1,85 @@
+import random
+from datetime import date
+from typing import Any, Dict, List, Tuple
+
+# Synthetic fleet and booking history for local load testing. Everything comes
+# from one random.Random(seed), so the same arguments always give the same data.
+
+# (make, model, seats, base daily price)
+CATALOGUE: List[Tuple[str, str, int, float]] = [
+    ("Fiat", "500", 4, 35.0),
+    ("Smart", "ForTwo", 2, 40.0),
+    ("Mazda", "MX-5", 2, 75.0),
+    ("Toyota", "Yaris", 5, 38.0),
+    ("Toyota", "Corolla", 5, 45.0),
+    ("VW", "Golf", 5, 48.0),
+    ("Skoda", "Octavia", 5, 50.0),
+    ("BMW", "3 Series", 5, 85.0),
+    ("Tesla", "Model 3", 5, 80.0),
+    ("Tesla", "Model Y", 5, 95.0),
+    ("VW", "Tayron", 7, 70.0),
+    ("Skoda", "Kodiaq", 7, 72.0),
+    ("Ford", "Galaxy", 7, 68.0),
+    ("VW", "Transporter", 9, 110.0),
+    ("Mercedes", "Vito", 9, 120.0),
+]
+# Relative share of each seat count in the fleet.
+SEAT_WEIGHTS = {2: 4, 4: 10, 5: 60, 7: 20, 9: 6}
+
+MEAN_BOOKING_DAYS = 4.0
+MAX_BOOKING_DAYS = 28
+MEAN_GAP_DAYS = 6.0
+# Demand by month (1 = average): busy summer and holidays, quiet late winter.
+SEASON = [0.7, 0.6, 0.8, 0.9, 1.0, 1.3, 1.6, 1.6, 1.1, 0.9, 0.8, 1.2]
+
+def generate_cars(n: int, seed: int = 42) -> Dict[str, Dict[str, Any]]:
+    rnd = random.Random(seed)
+    by_seats: Dict[int, List[Tuple[str, str, int, float]]] = {}
+    for entry in CATALOGUE:
+        by_seats.setdefault(entry[2], []).append(entry)
+    seat_values = list(SEAT_WEIGHTS)
+    seat_weights = list(SEAT_WEIGHTS.values())
+    items = {}
+    for i in range(1, n + 1):
+        seats = rnd.choices(seat_values, seat_weights)[0]
+        make, model, _, base = rnd.choice(by_seats[seats])
+        price = round(base * rnd.lognormvariate(0, 0.15) * 2) / 2  # to the nearest 0.50
+        items[str(i)] = {"make": make, "model": model, "seats": seats, "daily_price": price}
+    return items
+
+# `n` bookings spread evenly over `car_ids`, starting at `start`. Each car's
+# bookings are laid out one after another with a gap between them, so they
+# never overlap; booking lengths are roughly exponential (mean 4 days, max 28)
+# and gaps shrink in busy months. Ids follow start date, as if booked in order.
+def generate_bookings(car_ids: List[int], n: int, start: date, seed: int = 42) -> Dict[str, Dict[str, Any]]:
+    if n and not car_ids:
+        raise ValueError("Cannot generate bookings without cars")
+    rnd = random.Random(seed)
+    expo = rnd.expovariate
+    iso: Dict[int, str] = {}
+    season: Dict[int, float] = {}
+
+    def iso_of(ordinal: int) -> str:
+        s = iso.get(ordinal)
+        if s is None:
+            d = date.fromordinal(ordinal)
+            s = iso[ordinal] = d.isoformat()
+            season[ordinal] = SEASON[d.month - 1]
+        return s
+
+    rows: List[Tuple[int, int, int]] = []
+    per_car, extra = divmod(n, len(car_ids)) if car_ids else (0, 0)
+    day0 = start.toordinal()
+    for k, car_id in enumerate(car_ids):
+        day = day0 + int(expo(1 / MEAN_GAP_DAYS))
+        for _ in range(per_car + (k < extra)):
+            iso_of(day)
+            days = min(MAX_BOOKING_DAYS, 1 + int(expo(1 / (MEAN_BOOKING_DAYS - 1))))
+            rows.append((day, car_id, days))
+            day += days + int(expo(season[day] / MEAN_GAP_DAYS))
+    rows.sort()
+
+    items = {}
+    for i, (s, car_id, days) in enumerate(rows, 1):
+        items[str(i)] = {"car_id": car_id, "start_date": iso[s], "end_date": iso_of(s + days - 1), "days": days}
+    return items
@@ -0,0 +1,266 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# ISO date -> day ordinal. Bookings share few distinct dates, so parsing is
+# mostly a cache hit.
+@lru_cache(maxsize=1 << 16)
+def ordinal(value: str) -> int:
+    return date.fromisoformat(value).toordinal()
+
+# One car's bookings as parallel int32 columns sorted by start day: 16 bytes
+# per booking instead of a tuple of boxed ints. reach[i] is the latest end of
+# bookings 0..i, so it never decreases even when bookings overlap.
+# insert() and remove() edit the columns one at a time, so a CarIntervals that
+# readers can reach is never edited: BookingIntervalIndex updates a copy and
+# swaps it in.
+class CarIntervals:
+    __slots__ = ("starts", "ends", "ids", "reach")
+
+    def __init__(self):
+        self.starts = array("i")
+        self.ends = array("i")
+        self.ids = array("i")
+        self.reach = array("i")
+
+    def append(self, start: int, end: int, id_: int) -> None:
+        self.starts.append(start)
+        self.ends.append(end)
+        self.ids.append(id_)
+        self.reach.append(max(end, self.reach[-1]) if self.reach else end)
+
+    def copy(self) -> "CarIntervals":
+        ivs = CarIntervals()
+        ivs.starts, ivs.ends, ivs.ids, ivs.reach = self.starts[:], self.ends[:], self.ids[:], self.reach[:]
+        return ivs
+
+    def insert(self, start: int, end: int, id_: int) -> None:
+        i = bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.ids.insert(i, id_)
+        self.reach.insert(i, max(end, self.reach[i - 1]) if i else end)
+        for j in range(i + 1, len(self.reach)):
+            if self.reach[j] >= end:
+                break
+            self.reach[j] = end
+
+    def remove(self, start: int, id_: int) -> None:
+        i = bisect_left(self.starts, start)
+        while i < len(self.starts) and self.starts[i] == start:
+            if self.ids[i] == id_:
+                del self.starts[i], self.ends[i], self.ids[i], self.reach[i]
+                top = self.reach[i - 1] if i else None
+                for j in range(i, len(self.reach)):
+                    top = self.ends[j] if top is None else max(top, self.ends[j])
+                    if self.reach[j] == top:
+                        break
+                    self.reach[j] = top
+                return
+            i += 1
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+# Per-car bookings sorted by start day, maintained as a view on the bookings
+# store. The booking service never lets two bookings of one car overlap, but
+# older data files can hold overlaps, so queries go through the reach column:
+# [start, end] conflicts iff a booking starting on or before `end` reaches
+# `start`, which is one bisect plus a lookup.
+# Stores hand this view to readers without a lock while writers apply changes
+# (see ViewSet), so each change replaces the car's CarIntervals with an updated
+# copy: a reader sees the car's bookings before or after it, never columns of
+# different lengths. Copying costs no more than the array inserts themselves.
+class BookingIntervalIndex:
+    def __init__(self):
+        self.by_car: Dict[int, CarIntervals] = {}
+
+    @classmethod
+    def build(cls, items: Dict[str, Dict[str, Any]]) -> "BookingIntervalIndex":
+        return cls._from_rows(
+            (int(b["car_id"]), ordinal(b["start_date"]), ordinal(b["end_date"]), int(k))
+            for k, b in items.items()
+        )
+
+    # Built from (id, car_id, start, end, days) records of a BinaryStore, whose
+    # dates are already day ordinals.
+    @classmethod
+    def from_records(cls, records: Iterable[Tuple[int, int, int, int, int]]) -> "BookingIntervalIndex":
+        return cls._from_rows((car_id, start, end, id_) for id_, car_id, start, end, _ in records)
+
+    @classmethod
+    def _from_rows(cls, rows: Iterable[Tuple[int, int, int, int]]) -> "BookingIntervalIndex":
+        rows = sorted(rows)
+        idx = cls()
+        car = None
+        for car_id, start, end, id_ in rows:
+            if car_id != car:
+                car, ivs = car_id, idx.by_car.setdefault(car_id, CarIntervals())
+            ivs.append(start, end, id_)
+        return idx
+
+    def on_insert(self, id_: int, doc: Dict[str, Any]) -> None:
+        car_id = int(doc["car_id"])
+        ivs = self.by_car.get(car_id)
+        ivs = CarIntervals() if ivs is None else ivs.copy()
+        ivs.insert(ordinal(doc["start_date"]), ordinal(doc["end_date"]), id_)
+        self.by_car[car_id] = ivs
+
+    def on_delete(self, id_: int, doc: Dict[str, Any]) -> None:
+        car_id = int(doc["car_id"])
+        ivs = self.by_car.get(car_id)
+        if ivs is not None:
+            ivs = ivs.copy()
+            ivs.remove(ordinal(doc["start_date"]), id_)
+            self.by_car[car_id] = ivs
+
+    # Overlap test on day ordinals, [start, end] inclusive. Returns the id of a
+    # conflicting booking; without overlaps in the data that is booking i.
+    def conflict_ord(self, car_id: int, start: int, end: int) -> Optional[int]:
+        ivs = self.by_car.get(car_id)
+        if not ivs:
+            return None
+        i = bisect_right(ivs.starts, end) - 1
+        if i < 0 or ivs.reach[i] < start:
+            return None
+        while ivs.ends[i] < start:
+            i -= 1
+        return ivs.ids[i]
+
+    def conflict(self, car_id: int, start: date, end: date) -> Optional[int]:
+        return self.conflict_ord(car_id, start.toordinal(), end.toordinal())
+
+    def is_free(self, car_id: int, start: date, end: date) -> bool:
+        return self.conflict_ord(car_id, start.toordinal(), end.toordinal()) is None
+
+    # Ids of every booking of the car overlapping [start, end]: walks back from
+    # the last booking starting on or before `end` while the reach gets to `start`.
+    def overlapping(self, car_id: int, start: date, end: date) -> List[int]:
+        ivs = self.by_car.get(car_id)
+        if not ivs:
+            return []
+        s = start.toordinal()
+        i = bisect_right(ivs.starts, end.toordinal()) - 1
+        out = []
+        while i >= 0 and ivs.reach[i] >= s:
+            if ivs.ends[i] >= s:
+                out.append(ivs.ids[i])
+            i -= 1
+        return out
+
+    # Free days between [start, end] and the car's neighbouring bookings as
+    # (before, after), None on a side with no booking; None if [start, end]
+    # is not free.
+    def gaps_ord(self, car_id: int, start: int, end: int) -> Optional[Tuple[Optional[int], Optional[int]]]:
+        ivs = self.by_car.get(car_id)
+        if not ivs:
+            return None, None
+        i = bisect_right(ivs.starts, end) - 1
+        if i >= 0 and ivs.reach[i] >= start:
+            return None
+        before = start - ivs.reach[i] - 1 if i >= 0 else None
+        after = ivs.starts[i + 1] - end - 1 if i + 1 < len(ivs) else None
+        return before, after
+
+    def gaps(self, car_id: int, start: date, end: date) -> Optional[Tuple[Optional[int], Optional[int]]]:
+        return self.gaps_ord(car_id, start.toordinal(), end.toordinal())
+
+    # (car_id, start, end) day ordinals of every booking overlapping [start, end].
+    # Bookings before the first one whose reach gets to `start` all end before
+    # it, so each car is two bisects plus the rows in between.
+    def spans(self, start: date, end: date) -> Iterator[Tuple[int, int, int]]:
+        s, e = start.toordinal(), end.toordinal()
+        for car_id, ivs in list(self.by_car.items()):
+            lo, hi = bisect_left(ivs.reach, s), bisect_right(ivs.starts, e)
+            for i in range(lo, hi):
+                if ivs.ends[i] >= s:
+                    yield car_id, ivs.starts[i], ivs.ends[i]
+
+    @classmethod
+    def from_sqlite(cls, store) -> "SQLiteIntervalIndex":
+        return SQLiteIntervalIndex(store)
+
+# Same queries answered by the (car_id, start_date, end_date) expression index
+# of a SQLiteStore. ISO dates compare correctly as text.
+class SQLiteIntervalIndex:
+    def __init__(self, store):
+        self.store = store
+        f = store.field
+        self._overlapping_sql = (
+            f'SELECT id FROM "{store.table}" WHERE {f("car_id")} = ? '
+            f'AND {f("start_date")} <= ? AND {f("end_date")} >= ?'
+        )
+        self._conflict_sql = self._overlapping_sql + " LIMIT 1"
+        self._spans_sql = (
+            f'SELECT {f("car_id")}, {f("start_date")}, {f("end_date")} FROM "{store.table}" '
+            f'WHERE {f("start_date")} <= ? AND {f("end_date")} >= ?'
+        )
+        self._prev_sql = (
+            f'SELECT {f("end_date")} FROM "{store.table}" WHERE {f("car_id")} = ? '
+            f'AND {f("end_date")} < ? ORDER BY {f("end_date")} DESC LIMIT 1'
+        )
+        self._next_sql = (
+            f'SELECT {f("start_date")} FROM "{store.table}" WHERE {f("car_id")} = ? '
+            f'AND {f("start_date")} > ? ORDER BY {f("start_date")} LIMIT 1'
+        )
+
+    def conflict(self, car_id: int, start: date, end: date) -> Optional[int]:
+        row = self.store.execute(self._conflict_sql, (car_id, end.isoformat(), start.isoformat())).fetchone()
+        return row[0] if row else None
+
+    def is_free(self, car_id: int, start: date, end: date) -> bool:
+        return self.conflict(car_id, start, end) is None
+
+    def overlapping(self, car_id: int, start: date, end: date) -> List[int]:
+        rows = self.store.execute(self._overlapping_sql, (car_id, end.isoformat(), start.isoformat())).fetchall()
+        return [row[0] for row in rows]
+
+    def gaps(self, car_id: int, start: date, end: date) -> Optional[Tuple[Optional[int], Optional[int]]]:
+        if self.conflict(car_id, start, end) is not None:
+            return None
+        prev = self.store.execute(self._prev_sql, (car_id, start.isoformat())).fetchone()
+        nxt = self.store.execute(self._next_sql, (car_id, end.isoformat())).fetchone()
+        before = start.toordinal() - ordinal(prev[0]) - 1 if prev else None
+        after = ordinal(nxt[0]) - end.toordinal() - 1 if nxt else None
+        return before, after
+
+    def spans(self, start: date, end: date) -> Iterator[Tuple[int, int, int]]:
+        for car_id, s, e in self.store.execute(self._spans_sql, (end.isoformat(), start.isoformat())).fetchall():
+            yield int(car_id), ordinal(s), ordinal(e)
+
+# Several indexes answered as one, e.g. the hot bookings table and its archive:
+# a period is free only if it is free in every index, and each gap is the
+# smallest one any index reports.
+class MergedIntervalIndex:
+    def __init__(self, *indexes):
+        self.indexes = indexes
+
+    def conflict(self, car_id: int, start: date, end: date) -> Optional[int]:
+        for index in self.indexes:
+            hit = index.conflict(car_id, start, end)
+            if hit is not None:
+                return hit
+        return None
+
+    def is_free(self, car_id: int, start: date, end: date) -> bool:
+        return self.conflict(car_id, start, end) is None
+
+    def overlapping(self, car_id: int, start: date, end: date) -> List[int]:
+        return [id_ for index in self.indexes for id_ in index.overlapping(car_id, start, end)]
+
+    def gaps(self, car_id: int, start: date, end: date) -> Optional[Tuple[Optional[int], Optional[int]]]:
+        before = after = None
+        for index in self.indexes:
+            gaps = index.gaps(car_id, start, end)
+            if gaps is None:
+                return None
+            b, a = gaps
+            before = b if before is None or (b is not None and b < before) else before
+            after = a if after is None or (a is not None and a < after) else after
+        return before, after
+
+    def spans(self, start: date, end: date) -> Iterator[Tuple[int, int, int]]:
+        for index in self.indexes:
+            yield from index.spans(start, end)
@@ -0,0 +1,101 @@
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, Tuple
+
+from app.service.interval_index import SQLiteIntervalIndex, ordinal
+
+# Booked days per car as one int bitset (bit i = day `base + i`), maintained as
+# a view on the bookings store. A calendar window for one car is a shift and a
+# mask, so a whole-fleet calendar costs O(cars) big-int operations regardless
+# of how many bookings fall in the window. The booking service never lets two
+# bookings of one car overlap, but older data files can, so days booked more
+# than once are counted in `extra`: deleting a booking clears only the days no
+# other booking covers. Without overlaps `extra` stays empty.
+class OccupancyBitsets:
+    def __init__(self):
+        self.cars: Dict[int, Tuple[int, int]] = {}  # car_id -> (base ordinal, bits)
+        self.extra: Dict[int, Dict[int, int]] = {}  # car_id -> {day ordinal: bookings beyond the first}
+
+    @classmethod
+    def build(cls, items: Dict[str, Dict[str, Any]]) -> "OccupancyBitsets":
+        occ = cls()
+        for b in items.values():
+            occ._mark(int(b["car_id"]), ordinal(b["start_date"]), ordinal(b["end_date"]), True)
+        return occ
+
+    # Built from (id, car_id, start, end, days) records of a BinaryStore, whose
+    # dates are already day ordinals.
+    @classmethod
+    def from_records(cls, records: Iterable[Tuple[int, int, int, int, int]]) -> "OccupancyBitsets":
+        occ = cls()
+        for _, car_id, start, end, _ in records:
+            occ._mark(car_id, start, end, True)
+        return occ
+
+    @classmethod
+    def from_sqlite(cls, store) -> "SQLiteOccupancy":
+        return SQLiteOccupancy(store)
+
+    def _mark(self, car_id: int, start: int, end: int, booked: bool) -> None:
+        base, bits = self.cars.get(car_id, (start, 0))
+        if start < base:
+            bits <<= base - start
+            base = start
+        span = ((1 << (end - start + 1)) - 1) << (start - base)
+        if booked:
+            overlap = bits & span
+            if overlap:
+                extra = self.extra.setdefault(car_id, {})
+                for day in _days(base, overlap):
+                    extra[day] = extra.get(day, 0) + 1
+            self.cars[car_id] = (base, bits | span)
+            return
+        keep = 0
+        extra = self.extra.get(car_id)
+        if extra:
+            for day in [d for d in extra if start <= d <= end]:
+                keep |= 1 << (day - base)
+                if extra[day] == 1:
+                    del extra[day]
+                else:
+                    extra[day] -= 1
+        self.cars[car_id] = (base, bits & ~span | keep)
+
+    def on_insert(self, id_: int, doc: Dict[str, Any]) -> None:
+        self._mark(int(doc["car_id"]), ordinal(doc["start_date"]), ordinal(doc["end_date"]), True)
+
+    def on_delete(self, id_: int, doc: Dict[str, Any]) -> None:
+        self._mark(int(doc["car_id"]), ordinal(doc["start_date"]), ordinal(doc["end_date"]), False)
+
+    # {car_id: bits} for cars with at least one booked day in [start, end];
+    # bit i is day start + i.
+    def busy(self, start: date, end: date) -> Dict[int, int]:
+        s = start.toordinal()
+        full = (1 << (end.toordinal() - s + 1)) - 1
+        out = {}
+        for car_id, (base, bits) in list(self.cars.items()):
+            window = (bits >> (s - base) if s >= base else bits << (base - s)) & full
+            if window:
+                out[car_id] = window
+        return out
+
+# Same busy() answered from the bookings overlapping the window, found through
+# the (car_id, start_date, end_date) index of a SQLiteStore, so a calendar
+# never loads the whole table.
+class SQLiteOccupancy:
+    def __init__(self, store):
+        self.index = SQLiteIntervalIndex(store)
+
+    def busy(self, start: date, end: date) -> Dict[int, int]:
+        s, e = start.toordinal(), end.toordinal()
+        out: Dict[int, int] = {}
+        for car_id, a, b in self.index.spans(start, end):
+            a, b = max(a, s) - s, min(b, e) - s
+            out[car_id] = out.get(car_id, 0) | ((1 << (b - a + 1)) - 1) << a
+        return out
+
+# Day ordinals of the set bits of `bits` (bit i = day base + i).
+def _days(base: int, bits: int) -> Iterator[int]:
+    while bits:
+        low = bits & -bits
+        yield base + low.bit_length() - 1
+        bits ^= low
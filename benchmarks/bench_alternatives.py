@@ -0,0 +1,72 @@
+"""Conflict alternatives: seat-filtered, price-sorted store query vs. the car index.
+
+    python -m benchmarks.bench_alternatives --cars 100000 --bookings 1000000
+
+`query` is what booking conflicts used to do: find(seats=..., order_by=
+"daily_price") over the cars table, then is_free per row until `--limit` free
+cars are found. `index` walks CarPriceIndex in the requested ranking instead.
+Both report the mean time per conflict.
+"""
+import argparse
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from app.json_handler.db_handler import GenericRepo
+from app.json_handler.json_store import JSONStore
+from app.service.booking_service import _alternative_cars_same_seats
+from app.service.fleet_generator import generate_bookings, generate_cars
+from app.service.interval_index import BookingIntervalIndex
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--cars", type=int, default=100_000)
+    ap.add_argument("--bookings", type=int, default=1_000_000)
+    ap.add_argument("--limit", type=int, default=3)
+    ap.add_argument("--queries", type=int, default=50)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cars = GenericRepo(JSONStore(Path(tmp) / "cars.json"))
+        bookings = GenericRepo(JSONStore(Path(tmp) / "bookings.json"))
+        car_items = generate_cars(args.cars)
+        cars.store.write({"items": car_items, "next_id": args.cars + 1})
+        bookings.store.write({"items": generate_bookings(list(range(1, args.cars + 1)), args.bookings,
+                                                         date(2025, 1, 1)),
+                              "next_id": args.bookings + 1})
+        index = bookings.view(BookingIntervalIndex)
+
+        rnd = random.Random(1)
+        conflicts = []
+        for _ in range(args.queries):
+            car = cars.get(rnd.randint(1, args.cars))
+            start = date(2025, 1, 1) + timedelta(days=rnd.randrange(365))
+            conflicts.append((car, start, start + timedelta(days=3)))
+
+        def query(car, s, e):
+            out = []
+            for c in cars.find(seats=car["seats"], order_by="daily_price"):
+                if c["id"] != car["id"] and index.is_free(c["id"], s, e):
+                    out.append(c["id"])
+                    if len(out) == args.limit:
+                        break
+            return out
+
+        def ranked(rank):
+            return lambda car, s, e: [a["id"] for a in _alternative_cars_same_seats(
+                cars, bookings, car, s, e, limit=args.limit, rank=rank)]
+
+        assert all(query(*c) == ranked("price")(*c) for c in conflicts[:5])
+        print(f"{'':<22} {'ms/conflict':>12}")
+        for name, fn in (("query", query), ("index price", ranked("price")),
+                         ("index nearest_price", ranked("nearest_price")),
+                         ("index same_make", ranked("same_make"))):
+            t0 = time.perf_counter()
+            for c in conflicts:
+                fn(*c)
+            print(f"{name:<22} {(time.perf_counter() - t0) / len(conflicts) * 1e3:>12.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Utilisation/revenue analytics: cold pass vs. repeat loads served from cached months.
+
+    python -m benchmarks.bench_analytics --cars 1000 --bookings 1000000
+
+Times analytics.utilisation over --days days of closed history for each
+grouping: the first call computes every month, repeats reuse the cached
+months, and after one new booking only the months it touches are updated.
+"""
+import argparse
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from app.json_handler.db_handler import GenericRepo
+from app.json_handler.json_store import JSONStore
+from app.service import analytics
+from app.service.fleet_generator import generate_bookings, generate_cars
+
+def _ms(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return (time.perf_counter() - t0) * 1e3
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--cars", type=int, default=1000)
+    ap.add_argument("--bookings", type=int, default=1_000_000)
+    ap.add_argument("--days", type=int, default=365)
+    args = ap.parse_args()
+
+    day0 = date(2020, 1, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        cars = GenericRepo(JSONStore(Path(tmp) / "cars.json"))
+        bookings = GenericRepo(JSONStore(Path(tmp) / "bookings.json"))
+        cars.store.write({"items": generate_cars(args.cars), "_meta": {"seq": args.cars}})
+        bookings.store.write({"items": generate_bookings(list(range(1, args.cars + 1)), args.bookings, day0),
+                              "_meta": {"seq": args.bookings}})
+        start, end = day0, day0 + timedelta(days=args.days - 1)
+        bookings.view(analytics.BookingIntervalIndex)  # not part of the timings
+
+        print(f"{'group_by':<8} {'cold ms':>9} {'repeat ms':>10} {'after insert ms':>16}")
+        for group_by in analytics.GROUPINGS:
+            run = lambda: analytics.utilisation(cars, bookings, start, end, group_by)
+            cold = _ms(run)
+            repeat = _ms(run)
+            bookings.insert({"car_id": 1, "start_date": "2020-03-01", "end_date": "2020-03-01", "days": 1})
+            after = _ms(run)
+            print(f"{group_by:<8} {cold:>9.1f} {repeat:>10.1f} {after:>16.1f}")
+
+if __name__ == "__main__":
+    main()
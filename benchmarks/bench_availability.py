@@ -0,0 +1,60 @@
+"""Availability query latency vs. number of historical bookings.
+
+    python -m benchmarks.bench_availability --cars 500 --sizes 1000,10000,100000
+
+For every size, JSON tables hold --cars cars and that many past bookings,
+spread evenly over the cars without overlaps. After one warm-up call builds
+the interval index, --queries list_available_cars_for_period calls over
+shifting 4-day windows are timed, and p50/p99 latency is reported.
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from app.json_handler.json_store import JSONStore
+from app.json_handler.db_handler import GenericRepo
+from app.service.booking_service import list_available_cars_for_period
+
+def _fill(tmp: Path, cars: int, bookings: int):
+    cars_store = JSONStore(tmp / f"cars-{bookings}.json")
+    cars_store.write({"_meta": {"seq": cars}, "items": {
+        str(i): {"make": "VW", "model": "Golf", "seats": 5, "daily_price": 50.0} for i in range(1, cars + 1)
+    }})
+    day0 = date(2020, 1, 1)
+    items = {}
+    for i in range(bookings):
+        car, slot = i % cars + 1, i // cars
+        s = day0 + timedelta(days=slot * 4)
+        items[str(i + 1)] = {"car_id": car, "start_date": s.isoformat(),
+                             "end_date": (s + timedelta(days=2)).isoformat(), "days": 3}
+    bookings_store = JSONStore(tmp / f"bookings-{bookings}.json")
+    bookings_store.write({"_meta": {"seq": bookings}, "items": items})
+    return GenericRepo(cars_store), GenericRepo(bookings_store)
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cars", type=int, default=500)
+    ap.add_argument("--sizes", default="1000,10000,100000")
+    ap.add_argument("--queries", type=int, default=200)
+    args = ap.parse_args()
+
+    print(f"{'bookings':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    with tempfile.TemporaryDirectory() as d:
+        for n in (int(s) for s in args.sizes.split(",")):
+            cars, bookings = _fill(Path(d), args.cars, n)
+            list_available_cars_for_period(cars, bookings, date(2020, 1, 1), date(2020, 1, 2))  # build index
+            samples = []
+            for q in range(args.queries):
+                s = date(2020, 1, 1) + timedelta(days=q)
+                t0 = time.perf_counter()
+                list_available_cars_for_period(cars, bookings, s, s + timedelta(days=3))
+                samples.append((time.perf_counter() - t0) * 1e3)
+            samples.sort()
+            p99 = samples[int(len(samples) * 0.99) - 1]
+            print(f"{n:>10} {statistics.median(samples):>8.2f} {p99:>8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Bookings kept as JSON, journal or binary records: open, get, index and insert.
+
+    python -m benchmarks.bench_binary_store --sizes 10000,100000,1000000
+
+Per size and backend: file size, the first get(id) of a fresh process (the
+whole table is parsed unless the backend can seek to the row), a warm get(id),
+building the booking interval index, and one insert. "Fresh process" is
+simulated by dropping the module-level store caches.
+"""
+import argparse
+import random
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+from app.json_handler import binary_store, journal_store, json_store
+from app.json_handler.binary_store import BinaryStore
+from app.json_handler.db_handler import GenericRepo
+from app.json_handler.journal_store import JournalStore
+from app.json_handler.json_store import JSONStore
+from app.service.fleet_generator import generate_bookings
+from app.service.interval_index import BookingIntervalIndex
+
+BACKENDS = {"json": (JSONStore, ".json"), "journal": (JournalStore, ".json"), "binary": (BinaryStore, ".bin")}
+
+def _fresh() -> None:
+    json_store._cache.clear()
+    journal_store._states.clear()
+    binary_store._states.clear()
+
+def _time(fn, repeat: int = 1) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+def bench(name: str, items, n: int, tmp: Path):
+    cls, suffix = BACKENDS[name]
+    path = tmp / f"{name}-{n}{suffix}"
+    cls(path).write({"_meta": {"seq": n}, "items": items})
+    ids = [random.randint(1, n) for _ in range(1000)]
+
+    _fresh()
+    repo = GenericRepo(cls(path))
+    first = _time(lambda: repo.get(ids[0]))
+    it = iter(ids * 10)
+    warm = _time(lambda: repo.get(next(it)), repeat=10_000)
+    _fresh()
+    repo = GenericRepo(cls(path))
+    index = _time(lambda: repo.view(BookingIntervalIndex))
+    doc = {"car_id": 1, "start_date": "2030-01-01", "end_date": "2030-01-02", "days": 2}
+    insert = _time(lambda: repo.insert(doc), repeat=20)
+    return path.stat().st_size / 1e6, first, warm, index, insert
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="10000,100000,1000000")
+    ap.add_argument("--cars", type=int, default=1000)
+    args = ap.parse_args()
+
+    print(f"{'bookings':>9} {'backend':>8} {'MB':>7} {'first get ms':>13} {'get us':>7} {'index ms':>9} {'insert ms':>10}")
+    with tempfile.TemporaryDirectory() as d:
+        for n in (int(s) for s in args.sizes.split(",")):
+            items = generate_bookings(list(range(1, args.cars + 1)), n, date(2025, 1, 1), 7)
+            for name in BACKENDS:
+                mb, first, warm, index, insert = bench(name, items, n, Path(d))
+                print(f"{n:>9} {name:>8} {mb:>7.1f} {first * 1e3:>13.2f} {warm * 1e6:>7.2f} "
+                      f"{index * 1e3:>9.1f} {insert * 1e3:>10.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Memory per booking and availability-scan time: raw booking dicts vs. the index.
+
+    python -m benchmarks.bench_booking_index --bookings 1000000 --cars 10000
+
+`dicts` is the bookings table as decoded from JSON (what the store caches);
+its scan parses both dates of every row per query. `index` is
+BookingIntervalIndex built from those rows; its scan answers is_free for every
+car.
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from app.service.fleet_generator import generate_bookings
+from app.service.interval_index import BookingIntervalIndex
+
+def _measured(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn()
+    elapsed = time.perf_counter() - t0
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return out, size, elapsed
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--bookings", type=int, default=1_000_000)
+    ap.add_argument("--cars", type=int, default=10_000)
+    ap.add_argument("--queries", type=int, default=20)
+    args = ap.parse_args()
+
+    car_ids = list(range(1, args.cars + 1))
+    raw = json.dumps(generate_bookings(car_ids, args.bookings, date(2025, 1, 1)))
+    items, dict_bytes, _ = _measured(lambda: json.loads(raw))
+    index, index_bytes, build_s = _measured(lambda: BookingIntervalIndex.build(items))
+
+    windows = [(date(2025, 3, 1) + timedelta(days=7 * q), date(2025, 3, 4) + timedelta(days=7 * q))
+               for q in range(args.queries)]
+
+    def dict_scan(s, e):
+        busy = set()
+        for b in items.values():
+            if date.fromisoformat(b["start_date"]) <= e and s <= date.fromisoformat(b["end_date"]):
+                busy.add(b["car_id"])
+        return [c for c in car_ids if c not in busy]
+
+    def index_scan(s, e):
+        return [c for c in car_ids if index.is_free(c, s, e)]
+
+    t0 = time.perf_counter()
+    for s, e in windows[:2]:
+        dict_scan(s, e)
+    dict_ms = (time.perf_counter() - t0) / 2 * 1e3
+    t0 = time.perf_counter()
+    for s, e in windows:
+        index_scan(s, e)
+    index_ms = (time.perf_counter() - t0) / len(windows) * 1e3
+    assert dict_scan(*windows[0]) == index_scan(*windows[0])
+
+    n = args.bookings
+    print(f"{'':<6} {'bytes/booking':>14} {'scan ms':>9}")
+    print(f"{'dicts':<6} {dict_bytes / n:>14.1f} {dict_ms:>9.1f}")
+    print(f"{'index':<6} {index_bytes / n:>14.1f} {index_ms:>9.1f}   (build {build_s:.2f} s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Availability calendar latency for a large fleet.
+
+    python -m benchmarks.bench_calendar --cars 5000 --days 90 --bookings 200000
+
+Fills the tables the same way as bench_availability, builds the occupancy
+bitsets with one warm-up call, then times --runs availability_calendar calls
+for a --days window across the whole fleet and reports the mean per calendar.
+"""
+import argparse
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from app.service.booking_service import availability_calendar
+from benchmarks.bench_availability import _fill
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cars", type=int, default=5000)
+    ap.add_argument("--bookings", type=int, default=200000)
+    ap.add_argument("--days", type=int, default=90)
+    ap.add_argument("--runs", type=int, default=20)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as d:
+        cars, bookings = _fill(Path(d), args.cars, args.bookings)
+        start = date(2020, 3, 1)
+        end = start + timedelta(days=args.days - 1)
+        availability_calendar(cars, bookings, start, end)  # build index
+        t0 = time.perf_counter()
+        for _ in range(args.runs):
+            availability_calendar(cars, bookings, start, end)
+        ms = (time.perf_counter() - t0) / args.runs * 1e3
+    print(f"{args.days} days x {args.cars} cars, {args.bookings} bookings: {ms:.1f} ms per calendar")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Table file encode/decode time and size: stdlib indented vs fast codec.
+
+    python -m benchmarks.bench_codec --bookings 1000000
+
+Generates a bookings table with app.service.fleet_generator and times
+codec.dump_table / codec.loads for STORE_CODEC=std and STORE_CODEC=fast
+(orjson when installed, stdlib compact otherwise).
+"""
+import argparse
+import importlib
+import os
+import time
+from datetime import date
+
+from app.json_handler import codec
+from app.service.fleet_generator import generate_bookings
+
+def _best(fn, runs: int) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--bookings", type=int, default=1_000_000)
+    ap.add_argument("--cars", type=int, default=10_000)
+    ap.add_argument("--runs", type=int, default=3)
+    args = ap.parse_args()
+
+    items = generate_bookings(list(range(1, args.cars + 1)), args.bookings, date(2025, 1, 1))
+    doc = {"_meta": {"seq": args.bookings}, "items": items}
+
+    print(f"{'codec':<6} {'orjson':>6} {'size MB':>9} {'encode s':>9} {'decode s':>9}")
+    for mode in ("std", "fast"):
+        os.environ["STORE_CODEC"] = mode
+        c = importlib.reload(codec)
+        raw = c.dump_table(doc)
+        enc = _best(lambda: c.dump_table(doc), args.runs)
+        dec = _best(lambda: c.loads(raw), args.runs)
+        print(f"{mode:<6} {str(c._ORJSON):>6} {len(raw) / 1e6:>9.1f} {enc:>9.2f} {dec:>9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Request throughput with logging off and on.
+
+    python -m benchmarks.bench_logging --clients 100 --duration 10
+    python -m benchmarks.bench_logging --app-dir /path/to/other/checkout   # compare
+
+Runs the load_test mix against a fresh server once per mode: `off` (LOG_LEVEL
+WARNING, so request-path INFO records are dropped), `text` and `json` (INFO,
+written to a log file in the temporary data directory).
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+from pathlib import Path
+
+from benchmarks.load_test import _free_port, default_mix, run_load, start_server, write_dataset
+
+MODES = {
+    "off": {"LOG_LEVEL": "WARNING"},
+    "text": {"LOG_LEVEL": "INFO", "LOG_FORMAT": "text"},
+    "json": {"LOG_LEVEL": "INFO", "LOG_FORMAT": "json"},
+}
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--app-dir", type=Path, default=Path(__file__).resolve().parents[1])
+    ap.add_argument("--clients", type=int, default=100)
+    ap.add_argument("--duration", type=float, default=10.0)
+    ap.add_argument("--cars", type=int, default=500)
+    ap.add_argument("--bookings", type=int, default=20000)
+    ap.add_argument("--modes", default=",".join(MODES))
+    args = ap.parse_args()
+
+    results = {}
+    for mode in args.modes.split(","):
+        with tempfile.TemporaryDirectory() as tmp:
+            write_dataset(Path(tmp) / "data", args.cars, args.bookings)
+            port = _free_port()
+            env = {**MODES[mode], "LOG_FILE": str(Path(tmp) / "data" / "app.log")}
+            proc = start_server(args.app_dir, Path(tmp), port, env=env)
+            try:
+                results[mode] = asyncio.run(run_load(f"http://127.0.0.1:{port}", args.clients, args.duration,
+                                                     lambda rnd: default_mix(rnd, args.cars)))
+            finally:
+                proc.terminate()
+                proc.wait()
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
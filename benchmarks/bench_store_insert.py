@@ -0,0 +1,52 @@
+"""Insert cost vs. table size for the JSON and journal backends.
+
+    python -m benchmarks.bench_store_insert --sizes 1000,10000,50000
+
+For every size, a JSONStore and a JournalStore are prefilled with that many
+bookings in one write, then --inserts single-row inserts are timed through
+GenericRepo. JSONStore rewrites the whole file on each insert, the journal
+appends one line, so only the first grows with the table. Reports the mean
+milliseconds per insert.
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from app.json_handler.json_store import JSONStore
+from app.json_handler.journal_store import JournalStore
+from app.json_handler.db_handler import GenericRepo
+
+def _prefill(n: int):
+    items = {
+        str(i): {"car_id": i % 500 + 1, "start_date": "2025-01-01", "end_date": "2025-01-03", "days": 3}
+        for i in range(1, n + 1)
+    }
+    return {"_meta": {"seq": n}, "items": items}
+
+def bench(store_cls, n: int, inserts: int, tmp: Path) -> float:
+    path = tmp / f"{store_cls.__name__}-{n}.json"
+    store = store_cls(path)
+    store.write(_prefill(n))
+    repo = GenericRepo(store)
+    doc = {"car_id": 1, "start_date": "2026-01-01", "end_date": "2026-01-02", "days": 2}
+    t0 = time.perf_counter()
+    for _ in range(inserts):
+        repo.insert(doc)
+    return (time.perf_counter() - t0) / inserts
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1000,10000,50000")
+    ap.add_argument("--inserts", type=int, default=50)
+    args = ap.parse_args()
+
+    print(f"{'bookings':>10} {'json ms/insert':>16} {'journal ms/insert':>18}")
+    with tempfile.TemporaryDirectory() as d:
+        for n in (int(s) for s in args.sizes.split(",")):
+            j = bench(JSONStore, n, args.inserts, Path(d))
+            w = bench(JournalStore, n, args.inserts, Path(d))
+            print(f"{n:>10} {j * 1e3:>16.3f} {w * 1e3:>18.3f}")
+
+if __name__ == "__main__":
+    main()
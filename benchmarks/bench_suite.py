@@ -0,0 +1,237 @@
+"""Benchmark suite: in-process micro-benchmarks plus an HTTP load run, per data size.
+
+    python -m benchmarks.bench_suite --sizes 1000,100000,1000000
+    python -m benchmarks.bench_suite --sizes 1000 --skip-load --compare benchmarks/results/abc1234.json
+
+For every size (number of bookings, spread over --cars cars):
+
+* micro: the service/repo calls behind car listing, availability, booking by
+  car, booking by seats and cancellation are timed directly, --rounds calls
+  each (at most --max-seconds per case);
+* load: a fresh `uvicorn app.main:app` is started on that dataset and every
+  scenario in --scenarios (benchmarks/scenarios.jsonl) is driven by --clients
+  keep-alive clients for --duration seconds.
+
+Each case reports ops/s (requests/s), p50/p95/p99 latency in ms and peak RSS in
+MB (benchmark process for micro, server process for load). Results go to
+--out (default benchmarks/results/<git sha>.json); --compare prints the change
+against an earlier results file.
+"""
+import argparse
+import asyncio
+import json
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import httpx
+
+from app.json_handler.db_handler import GenericRepo
+from app.json_handler.json_store import JSONStore
+from app.service.booking_service import (
+    BookingConflict, book_by_seats, ensure_available_and_create_booking, list_available_cars_for_period,
+)
+from benchmarks.load_test import _free_port, run_load, start_server, write_dataset
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_DAY0 = date(2025, 1, 1)
+FUTURE_DAY0 = date(2100, 1, 1)
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    pct = lambda p: samples[min(len(samples) - 1, int(len(samples) * p))] * 1e3
+    return {"p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99)}
+
+def _self_peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+def _proc_peak_rss_mb(pid: int) -> float:
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+# ---- placeholders shared by micro cases and HTTP scenarios ----
+
+def _values(rnd: random.Random, cars: int, bookings: int) -> Dict[str, Any]:
+    start = DATA_DAY0 + timedelta(days=rnd.randrange(365))
+    future = FUTURE_DAY0 + timedelta(days=rnd.randrange(36500))
+    return {
+        "car": rnd.randint(1, cars),
+        "seats": rnd.choice((2, 4, 5, 7)),
+        "booking": rnd.randint(1, max(1, bookings)),
+        "start": start.isoformat(),
+        "end": (start + timedelta(days=3)).isoformat(),
+        "future_start": future.isoformat(),
+        "future_end": (future + timedelta(days=2)).isoformat(),
+    }
+
+# Strings that are exactly one placeholder take the value's own type, so
+# {"car_id": "{car}"} becomes an int.
+def _fill(template: Any, values: Dict[str, Any]) -> Any:
+    if isinstance(template, dict):
+        return {k: _fill(v, values) for k, v in template.items()}
+    if isinstance(template, list):
+        return [_fill(v, values) for v in template]
+    if isinstance(template, str):
+        if template.startswith("{") and template.endswith("}") and template[1:-1] in values:
+            return values[template[1:-1]]
+        return template.format(**values)
+    return template
+
+# ---- micro ----
+
+def _micro_cases(cars, bookings, n_cars: int, n_bookings: int) -> Dict[str, Callable[[random.Random], Any]]:
+    ids = list(range(1, n_bookings + 1))
+    random.Random(1).shuffle(ids)
+
+    def availability(rnd):
+        v = _values(rnd, n_cars, n_bookings)
+        list_available_cars_for_period(cars, bookings, date.fromisoformat(v["start"]), date.fromisoformat(v["end"]))
+
+    def book(rnd):
+        v = _values(rnd, n_cars, n_bookings)
+        try:
+            ensure_available_and_create_booking(cars, bookings, v["car"], date.fromisoformat(v["future_start"]),
+                                                date.fromisoformat(v["future_end"]))
+        except BookingConflict:
+            pass
+
+    def book_seats(rnd):
+        v = _values(rnd, n_cars, n_bookings)
+        try:
+            book_by_seats(cars, bookings, v["seats"], date.fromisoformat(v["future_start"]),
+                          date.fromisoformat(v["future_end"]))
+        except ValueError:
+            pass
+
+    def cancel(rnd):
+        bookings.delete(ids.pop() if ids else 0)
+
+    return {
+        "list_cars": lambda rnd: cars.list(),
+        "availability": availability,
+        "book": book,
+        "book_by_seats": book_seats,
+        "cancel": cancel,
+    }
+
+def run_micro(data_dir: Path, n_cars: int, n_bookings: int, rounds: int, max_seconds: float) -> Dict[str, Any]:
+    cars = GenericRepo(JSONStore(data_dir / "cars.json"))
+    bookings = GenericRepo(JSONStore(data_dir / "bookings.json"))
+    out = {}
+    for name, case in _micro_cases(cars, bookings, n_cars, n_bookings).items():
+        rnd = random.Random(name)
+        case(rnd)  # warm-up: loads the files and builds views
+        samples: List[float] = []
+        t_end = time.perf_counter() + max_seconds
+        t0 = time.perf_counter()
+        while len(samples) < rounds and (len(samples) < 3 or time.perf_counter() < t_end):
+            t = time.perf_counter()
+            case(rnd)
+            samples.append(time.perf_counter() - t)
+        elapsed = time.perf_counter() - t0
+        out[name] = {"rounds": len(samples), "ops_per_s": len(samples) / elapsed, **_percentiles(samples),
+                     "peak_rss_mb": _self_peak_rss_mb()}
+        print(f"  micro {name:<14} {out[name]['ops_per_s']:>10.1f} ops/s  p50 {out[name]['p50_ms']:.2f} ms"
+              f"  p99 {out[name]['p99_ms']:.2f} ms", flush=True)
+    return out
+
+# ---- load ----
+
+def load_scenarios(path: Path) -> List[Dict[str, Any]]:
+    with path.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def run_http(data_dir: Path, scenarios, n_cars: int, n_bookings: int, clients: int, duration: float) -> Dict[str, Any]:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    proc = start_server(ROOT, data_dir.parent, port)
+    out = {}
+    try:
+        for sc in scenarios:
+            def make_request(rnd, sc=sc):
+                v = _values(rnd, n_cars, n_bookings)
+                return sc["method"], _fill(sc["path"], v), _fill(sc.get("body"), v)
+
+            # Warm-up request so index/view builds are not counted.
+            method, path, body = make_request(random.Random(0))
+            httpx.request(method, base + path, json=body, timeout=600)
+            stats = asyncio.run(run_load(base, clients, duration, make_request))
+            out[sc["name"]] = {**stats, "peak_rss_mb": _proc_peak_rss_mb(proc.pid)}
+            print(f"  load  {sc['name']:<14} {stats['rps']:>10.1f} req/s  p50 {stats['p50_ms']:.2f} ms"
+                  f"  p99 {stats['p99_ms']:.2f} ms  errors {stats['errors']}", flush=True)
+    finally:
+        proc.terminate()
+        proc.wait()
+    return out
+
+# ---- results ----
+
+def _git_sha() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def compare(old: Dict[str, Any], new: Dict[str, Any]) -> None:
+    print(f"\n{'case':<36} {'old':>10} {'new':>10} {'change':>8}")
+    for size, kinds in new["results"].items():
+        for kind, cases in kinds.items():
+            for name, stats in cases.items():
+                prev = old.get("results", {}).get(size, {}).get(kind, {}).get(name)
+                if not prev:
+                    continue
+                key = "ops_per_s" if kind == "micro" else "rps"
+                change = (stats[key] / prev[key] - 1) * 100 if prev[key] else float("nan")
+                print(f"{f'{size}/{kind}/{name} {key}':<36} {prev[key]:>10.1f} {stats[key]:>10.1f} {change:>+7.1f}%")
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="1000,100000,1000000")
+    ap.add_argument("--cars", type=int, default=1000)
+    ap.add_argument("--rounds", type=int, default=200)
+    ap.add_argument("--max-seconds", type=float, default=10.0)
+    ap.add_argument("--scenarios", type=Path, default=Path(__file__).with_name("scenarios.jsonl"))
+    ap.add_argument("--clients", type=int, default=50)
+    ap.add_argument("--duration", type=float, default=5.0)
+    ap.add_argument("--skip-micro", action="store_true")
+    ap.add_argument("--skip-load", action="store_true")
+    ap.add_argument("--out", type=Path)
+    ap.add_argument("--compare", type=Path)
+    args = ap.parse_args()
+
+    sha = _git_sha()
+    report: Dict[str, Any] = {"commit": sha, "python": sys.version.split()[0], "cars": args.cars,
+                              "started": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": {}}
+    scenarios = load_scenarios(args.scenarios)
+    for n in (int(s) for s in args.sizes.split(",")):
+        print(f"bookings={n} cars={args.cars}", flush=True)
+        report["results"][str(n)] = res = {}
+        if not args.skip_micro:
+            with tempfile.TemporaryDirectory() as tmp:
+                write_dataset(Path(tmp) / "data", args.cars, n)
+                res["micro"] = run_micro(Path(tmp) / "data", args.cars, n, args.rounds, args.max_seconds)
+        if not args.skip_load:
+            with tempfile.TemporaryDirectory() as tmp:
+                write_dataset(Path(tmp) / "data", args.cars, n)
+                res["load"] = run_http(Path(tmp) / "data", scenarios, args.cars, n, args.clients, args.duration)
+
+    out = args.out or ROOT / "benchmarks" / "results" / f"{sha}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"results written to {out}")
+    if args.compare:
+        compare(json.loads(args.compare.read_text()), report)
+
+if __name__ == "__main__":
+    main()
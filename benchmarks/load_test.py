@@ -0,0 +1,163 @@
+"""HTTP load test against a locally started uvicorn.
+
+    python -m benchmarks.load_test --clients 200 --duration 10
+    python -m benchmarks.load_test --app-dir /path/to/other/checkout   # compare
+    python -m benchmarks.load_test --workers 4 --change-seq mmap
+    python -m benchmarks.load_test --workers 4 --change-seq mmap --scaling
+
+Starts `uvicorn app.main:app` from --app-dir on a free port with a fresh data
+directory (--cars cars, --bookings bookings), then runs --clients concurrent
+keep-alive clients issuing a read-heavy mix for --duration seconds and reports
+requests/second and latency percentiles. --workers starts that many uvicorn
+worker processes, --change-seq and --engine set STORE_CHANGE_SEQ and
+STORAGE_ENGINE for them. --scaling runs the same load with 1 worker first and
+reports both runs and the speedup.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import httpx
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def write_dataset(data_dir: Path, cars: int, bookings: int, seed: int = 7) -> None:
+    rnd = random.Random(seed)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    car_items = {
+        str(i): {"make": "VW", "model": "Golf", "seats": rnd.choice((2, 4, 5, 7)), "daily_price": float(rnd.randint(30, 150))}
+        for i in range(1, cars + 1)
+    }
+    (data_dir / "cars.json").write_text(json.dumps({"_meta": {"seq": cars}, "items": car_items}))
+    day0 = date(2025, 1, 1)
+    items = {}
+    for i in range(bookings):
+        s = day0 + timedelta(days=(i // cars) * 5)
+        items[str(i + 1)] = {"car_id": i % cars + 1, "start_date": s.isoformat(),
+                             "end_date": (s + timedelta(days=2)).isoformat(), "days": 3}
+    (data_dir / "bookings.json").write_text(json.dumps({"_meta": {"seq": bookings}, "items": items}))
+
+def start_server(app_dir: Path, cwd: Path, port: int, workers: int = 1, env=None) -> subprocess.Popen:
+    cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+           "--log-level", "warning", "--app-dir", str(app_dir), "--workers", str(workers)]
+    proc = subprocess.Popen(cmd, cwd=cwd, env={**os.environ, "WORKERS": str(workers), **(env or {})},
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/cars/1", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+def default_mix(rnd: random.Random, cars: int):
+    day = date(2025, 1, 1) + timedelta(days=rnd.randrange(365))
+    r = rnd.random()
+    if r < 0.5:
+        return "GET", f"/api/cars/{rnd.randint(1, cars)}", None
+    if r < 0.9:
+        return "GET", f"/api/cars/available?start={day}&end={day + timedelta(days=3)}", None
+    return "GET", f"/api/bookings/by-car/{rnd.randint(1, cars)}", None
+
+# Minimal HTTP/1.1 keep-alive client: the generator shares the machine with the
+# server, so it has to cost far less per request than a full client library.
+async def _request(reader, writer, host: str, method: str, path: str, body) -> int:
+    payload = b"" if body is None else json.dumps(body).encode()
+    head = f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Length: {len(payload)}\r\n"
+    if payload:
+        head += "Content-Type: application/json\r\n"
+    writer.write(head.encode() + b"\r\n" + payload)
+    raw = await reader.readuntil(b"\r\n\r\n")
+    status = int(raw.split(b" ", 2)[1])
+    headers = raw.lower()
+    if b"transfer-encoding: chunked" in headers:
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        length = int(headers.split(b"content-length:", 1)[1].split(b"\r\n", 1)[0]) if b"content-length:" in headers else 0
+        await reader.readexactly(length)
+    return status
+
+async def run_load(base: str, clients: int, duration: float, make_request):
+    host, port = base.split("//", 1)[1].split(":")
+    latencies, errors = [], 0
+    stop = time.perf_counter() + duration
+
+    async def client(seed: int):
+        nonlocal errors
+        rnd = random.Random(seed)
+        reader, writer = await asyncio.open_connection(host, int(port))
+        try:
+            while time.perf_counter() < stop:
+                method, path, body = make_request(rnd)
+                t0 = time.perf_counter()
+                try:
+                    if await _request(reader, writer, host, method, path, body) >= 500:
+                        errors += 1
+                except (OSError, asyncio.IncompleteReadError):
+                    errors += 1
+                    writer.close()
+                    reader, writer = await asyncio.open_connection(host, int(port))
+                latencies.append(time.perf_counter() - t0)
+        finally:
+            writer.close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1e3
+    return {"requests": len(latencies), "errors": errors, "rps": len(latencies) / elapsed,
+            "p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99)}
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--app-dir", type=Path, default=Path(__file__).resolve().parents[1])
+    ap.add_argument("--clients", type=int, default=200)
+    ap.add_argument("--duration", type=float, default=10.0)
+    ap.add_argument("--cars", type=int, default=500)
+    ap.add_argument("--bookings", type=int, default=20000)
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--change-seq", choices=("stat", "mmap"), default="stat")
+    ap.add_argument("--engine", choices=("json", "journal"), default="json")
+    ap.add_argument("--scaling", action="store_true")
+    args = ap.parse_args()
+
+    if args.scaling:
+        single, multi = _load(args, 1), _load(args, args.workers)
+        print(json.dumps({"1": single, str(args.workers): multi, "speedup": multi["rps"] / single["rps"]}, indent=2))
+    else:
+        print(json.dumps(_load(args, args.workers), indent=2))
+
+def _load(args, workers: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        write_dataset(Path(tmp) / "data", args.cars, args.bookings)
+        port = _free_port()
+        proc = start_server(args.app_dir, Path(tmp), port, workers=workers,
+                            env={"STORE_CHANGE_SEQ": args.change_seq, "STORAGE_ENGINE": args.engine})
+        try:
+            return asyncio.run(run_load(f"http://127.0.0.1:{port}", args.clients, args.duration,
+                                        lambda rnd: default_mix(rnd, args.cars)))
+        finally:
+            proc.terminate()
+            proc.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Replay a stream of booking-by-seats requests against each allocation strategy.
+
+    python -m benchmarks.sim_allocation --cars 500 --days 180 --load 0.9
+
+The fleet comes from generate_cars. Requests have the fleet's seat mix, a
+seasonal start date inside the --days horizon, a roughly exponential length
+(mean 4 days) and arrive in booking order, --lead days ahead on average, so
+later requests have to fit into calendars that are already partly filled.
+--load is the requested car-days as a share of the fleet's capacity.
+
+Every strategy (with and without allow_larger) sees the same stream through
+app.service.allocation.allocate and an in-memory BookingIntervalIndex. It
+reports the refusal rate, utilisation (booked car-days / capacity), revenue
+and the mean allocation time.
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+from typing import List, Tuple
+
+from app.service.allocation import STRATEGIES, allocate
+from app.service.car_index import CarPriceIndex
+from app.service.fleet_generator import MAX_BOOKING_DAYS, MEAN_BOOKING_DAYS, SEASON, SEAT_WEIGHTS, generate_cars
+from app.service.interval_index import BookingIntervalIndex
+
+Request = Tuple[int, date, date]  # (seats, start, end)
+
+def request_stream(n_cars: int, days: int, load: float, lead: float, day0: date, seed: int) -> List[Request]:
+    rnd = random.Random(seed)
+    seat_values, seat_weights = list(SEAT_WEIGHTS), list(SEAT_WEIGHTS.values())
+    day_weights = [SEASON[(day0 + timedelta(days=d)).month - 1] for d in range(days)]
+    n = int(load * n_cars * days / MEAN_BOOKING_DAYS)
+    rows = []
+    for _ in range(n):
+        length = min(MAX_BOOKING_DAYS, days, 1 + int(rnd.expovariate(1 / (MEAN_BOOKING_DAYS - 1))))
+        offset = min(rnd.choices(range(days), day_weights)[0], days - length)
+        start = day0 + timedelta(days=offset)
+        arrival = offset - rnd.expovariate(1 / lead)
+        rows.append((arrival, rnd.choices(seat_values, seat_weights)[0], start, start + timedelta(days=length - 1)))
+    rows.sort(key=lambda r: r[0])
+    return [(seats, start, end) for _, seats, start, end in rows]
+
+def simulate(cars, stream: List[Request], strategy: str, allow_larger: bool):
+    catalogue = CarPriceIndex.build(cars)
+    index = BookingIntervalIndex()
+    booked_days = refused = 0
+    revenue = 0.0
+    t0 = time.perf_counter()
+    for i, (seats, start, end) in enumerate(stream, 1):
+        cid = allocate(catalogue, index, seats, start, end, strategy=strategy, allow_larger=allow_larger)
+        if cid is None:
+            refused += 1
+            continue
+        days = (end - start).days + 1
+        index.on_insert(i, {"car_id": cid, "start_date": start.isoformat(), "end_date": end.isoformat()})
+        booked_days += days
+        revenue += days * cars[str(cid)]["daily_price"]
+    return refused, booked_days, revenue, time.perf_counter() - t0
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--cars", type=int, default=500)
+    ap.add_argument("--days", type=int, default=180)
+    ap.add_argument("--load", type=float, default=0.9)
+    ap.add_argument("--lead", type=float, default=21.0)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    cars = generate_cars(args.cars, args.seed)
+    stream = request_stream(args.cars, args.days, args.load, args.lead, date(2025, 1, 1), args.seed)
+    capacity = args.cars * args.days
+    print(f"{len(stream)} requests, {args.cars} cars, {args.days} days")
+    print(f"{'strategy':<26} {'refused %':>10} {'utilisation %':>14} {'revenue':>12} {'us/alloc':>9}")
+    for strategy in STRATEGIES:
+        for allow_larger in (False, True):
+            refused, booked, revenue, elapsed = simulate(cars, stream, strategy, allow_larger)
+            name = strategy + (" +larger" if allow_larger else "")
+            print(f"{name:<26} {refused / len(stream) * 100:>10.2f} {booked / capacity * 100:>14.2f} "
+                  f"{revenue:>12.0f} {elapsed / len(stream) * 1e6:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,21 @@
 import json
+import os
+import shutil
+import tempfile
 from pathlib import Path
 import pytest
 from fastapi.testclient import TestClient
 
+# The app logs to LOG_FILE, by default data/app.log in the checkout, and so do
+# the uvicorn workers some tests start. Point it at a temporary directory
+# before any test module imports the app.
+def pytest_configure(config):
+    config._log_dir = tempfile.mkdtemp(prefix="car-booking-logs-")
+    os.environ["LOG_FILE"] = str(Path(config._log_dir) / "app.log")
+
+def pytest_unconfigure(config):
+    shutil.rmtree(getattr(config, "_log_dir", ""), ignore_errors=True)
+
 def _init_empty_store(path: Path):
     path.parent.mkdir(parents=True, exist_ok=True)
     path.write_text(json.dumps({"_meta": {"seq": 0}, "items": {}}), encoding="utf-8")
@@ -27,3 +40,10 @@ def client(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> TestClient:
     cars_repo.insert({"make": "VW",     "model": "Sharan", "seats": 7, "daily_price": 90.0})
 
     return TestClient(app)
+
+# Same data, driven through the app lifespan: repos (and their caches) are
+# built once and shared by every request. Yields (client, repos).
+@pytest.fixture
+def lifespan_client(client: TestClient):
+    with TestClient(client.app) as c:
+        yield c, c.app.state.repos
@@ -0,0 +1,79 @@
+from pathlib import Path
+
+from app.json_handler.db_handler import GenericRepo
+from app.json_handler.json_store import JSONStore
+
+def _book(client, car_id, start, end):
+    r = client.post("/api/bookings", json={"car_id": car_id, "start_date": start, "end_date": end})
+    assert r.status_code == 201, r.text
+    return r.json()["id"]
+
+def test_utilisation_and_revenue_by_seats(client):
+    _book(client, 1, "2025-01-30", "2025-02-02")  # spans the month boundary
+    _book(client, 3, "2025-02-01", "2025-02-01")
+    params = {"start": "2025-02-01", "end": "2025-02-04", "group_by": "seats"}
+
+    u = client.get("/api/analytics/utilisation", params=params).json()
+    assert u["days"] == 4
+    assert u["groups"] == [
+        {"key": 5, "cars": 2, "booked_days": 2, "utilisation": 25.0, "daily": [50.0, 50.0, 0.0, 0.0]},
+        {"key": 7, "cars": 1, "booked_days": 1, "utilisation": 25.0, "daily": [100.0, 0.0, 0.0, 0.0]},
+    ]
+    assert u["total"] == {"cars": 3, "booked_days": 3, "utilisation": 25.0}
+
+    rev = client.get("/api/analytics/revenue", params={**params, "group_by": "make", "daily": False}).json()
+    assert [(g["key"], g["revenue"]) for g in rev["groups"]] == [("Tesla", 0.0), ("Toyota", 100.0), ("VW", 90.0)]
+    assert rev["total"] == {"revenue": 190.0}
+
+def test_cached_months_follow_new_and_cancelled_bookings(client):
+    params = {"start": "2025-03-01", "end": "2025-04-30", "group_by": "car", "daily": False}
+    revenue = lambda: {g["key"]: g["revenue"] for g in client.get("/api/analytics/revenue", params=params).json()["groups"]}
+
+    first = _book(client, 2, "2025-03-31", "2025-04-01")
+    assert revenue() == {1: 0.0, 2: 140.0, 3: 0.0}  # months now cached
+
+    _book(client, 1, "2025-04-10", "2025-04-12")
+    assert revenue() == {1: 150.0, 2: 140.0, 3: 0.0}
+    assert client.delete(f"/api/bookings/{first}").status_code == 204
+    assert revenue() == {1: 150.0, 2: 0.0, 3: 0.0}
+
+    r = client.get("/api/analytics/utilisation", params={**params, "end": "2025-02-01"})
+    assert r.status_code == 400
+
+# Older data files can hold overlapping bookings of one car: a day counts once,
+# in computed and in cached months, and cancelling one of them only frees the
+# days no other booking covers.
+def test_overlapping_bookings_count_each_day_once(client):
+    bookings = GenericRepo(JSONStore(Path("data/bookings.json")))
+    outer = bookings.insert({"car_id": 1, "start_date": "2025-01-01", "end_date": "2025-01-10", "days": 10})
+    inner = bookings.insert({"car_id": 1, "start_date": "2025-01-02", "end_date": "2025-01-03", "days": 2})
+    params = {"start": "2025-01-01", "end": "2025-01-31", "group_by": "car", "daily": False}
+    usage = lambda: {g["key"]: g["booked_days"] for g in client.get("/api/analytics/utilisation", params=params).json()["groups"]}
+    revenue = lambda: client.get("/api/analytics/revenue", params=params).json()["total"]["revenue"]
+
+    assert usage()[1] == 10
+    assert revenue() == 500.0
+    bookings.insert({"car_id": 1, "start_date": "2025-01-09", "end_date": "2025-01-12", "days": 4})
+    assert usage()[1] == 12
+    assert client.delete(f"/api/bookings/{inner['id']}").status_code == 204
+    assert usage()[1] == 12
+    assert client.delete(f"/api/bookings/{outer['id']}").status_code == 204
+    assert usage()[1] == 4
+    assert revenue() == 200.0
+
+def test_usage_cache_only_queues_changes_for_cached_months(monkeypatch):
+    from app.service import analytics
+    from app.service.analytics import UsageCache
+
+    doc = {"car_id": 1, "start_date": "2025-01-01", "end_date": "2025-01-01"}
+    cache = UsageCache()
+    cache.on_insert(1, doc)
+    assert not cache.pending
+
+    monkeypatch.setattr(analytics, "MAX_PENDING_CHANGES", 2)
+    cache.months[("car", 1)] = {}
+    cache.on_insert(1, doc)
+    cache.on_delete(1, doc)
+    assert len(cache.pending) == 2
+    cache.on_insert(2, doc)  # overflow drops the cache
+    assert not cache.months and not cache.pending
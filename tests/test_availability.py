@@ -1,3 +1,8 @@
+from pathlib import Path
+
+from app.json_handler.db_handler import GenericRepo
+from app.json_handler.json_store import JSONStore
+
 def test_availability_endpoint_excludes_booked_ids(client):
     assert client.post("/api/bookings", json={
         "car_id": 3, "start_date": "2025-08-10", "end_date": "2025-08-12"
@@ -9,4 +14,86 @@ def test_availability_endpoint_excludes_booked_ids(client):
     assert res.status_code == 200, res.text
     payload = res.json()
     available_ids = {c["id"] for c in payload["cars"]}
-    assert 3 not in available_ids
\ No newline at end of file
+    assert 3 not in available_ids
+
+def test_availability_reflects_cancellation(client):
+    created = client.post("/api/bookings", json={
+        "car_id": 2, "start_date": "2025-08-10", "end_date": "2025-08-12"
+    }).json()
+    params = {"start": "2025-08-12", "end": "2025-08-20"}
+    assert 2 not in {c["id"] for c in client.get("/api/cars/available", params=params).json()["cars"]}
+
+    assert client.delete(f"/api/bookings/{created['id']}").status_code == 204
+    assert 2 in {c["id"] for c in client.get("/api/cars/available", params=params).json()["cars"]}
+
+    # Edges are inclusive on both sides.
+    assert client.post("/api/bookings", json={
+        "car_id": 2, "start_date": "2025-08-20", "end_date": "2025-08-21"
+    }).status_code == 201
+    assert 2 not in {c["id"] for c in client.get("/api/cars/available", params=params).json()["cars"]}
+    assert 2 in {c["id"] for c in client.get("/api/cars/available", params={
+        "start": "2025-08-01", "end": "2025-08-19"
+    }).json()["cars"]}
+
+def test_availability_calendar_marks_booked_days(client):
+    for car_id, start, end in ((1, "2025-07-01", "2025-07-02"), (2, "2025-06-28", "2025-07-01"), (3, "2025-07-04", "2025-07-09")):
+        assert client.post("/api/bookings", json={
+            "car_id": car_id, "start_date": start, "end_date": end
+        }).status_code == 201
+
+    r = client.get("/api/cars/availability-calendar", params={"start": "2025-07-01", "end": "2025-07-05"})
+    assert r.status_code == 200, r.text
+    payload = r.json()
+    assert {c["id"]: c["free"] for c in payload["cars"]} == {1: "00111", 2: "01111", 3: "11100"}
+    assert payload["free_count"] == [1, 2, 3, 2, 2]
+
+    assert client.get("/api/cars/availability-calendar", params={
+        "start": "2025-01-01", "end": "2026-06-01"
+    }).status_code == 400
+
+# Older data files can hold overlapping bookings of one car; cancelling the
+# inner one must leave the outer booking's days booked.
+def test_availability_calendar_keeps_days_of_overlapping_bookings(client):
+    bookings = GenericRepo(JSONStore(Path("data/bookings.json")))
+    bookings.insert({"car_id": 1, "start_date": "2025-01-01", "end_date": "2025-01-10", "days": 10})
+    inner = bookings.insert({"car_id": 1, "start_date": "2025-01-02", "end_date": "2025-01-03", "days": 2})
+    params = {"start": "2025-01-01", "end": "2025-01-05"}
+    calendar = lambda: {c["id"]: c["free"] for c in client.get("/api/cars/availability-calendar", params=params).json()["cars"]}
+    assert calendar()[1] == "00000"
+
+    assert client.delete(f"/api/bookings/{inner['id']}").status_code == 204
+    assert calendar()[1] == "00000"
+    assert 1 not in {c["id"] for c in client.get("/api/cars/available", params=params).json()["cars"]}
+
+def test_car_reads_send_etags_and_answer_304(client):
+    r = client.get("/api/cars")
+    tag = r.headers["etag"]
+    assert r.headers["cache-control"] == "no-cache"
+    assert client.get("/api/cars", headers={"If-None-Match": tag}).status_code == 304
+    assert client.get("/api/cars/1", headers={"If-None-Match": tag}).status_code == 304
+
+    params = {"start": "2025-08-10", "end": "2025-08-12"}
+    avail_tag = client.get("/api/cars/available", params=params).headers["etag"]
+    client.post("/api/bookings", json={"car_id": 3, "start_date": "2025-08-10", "end_date": "2025-08-12"})
+    assert client.get("/api/cars", headers={"If-None-Match": tag}).status_code == 304  # bookings only
+    r = client.get("/api/cars/available", params=params, headers={"If-None-Match": avail_tag})
+    assert r.status_code == 200 and 3 not in {c["id"] for c in r.json()["cars"]}
+
+    client.post("/api/cars", json={"make": "Fiat", "model": "500", "seats": 4, "daily_price": 30.0})
+    r = client.get("/api/cars", headers={"If-None-Match": tag})
+    assert r.status_code == 200 and len(r.json()) == 4 and r.headers["etag"] != tag
+
+def test_available_cars_served_from_response_cache(lifespan_client):
+    c, repos = lifespan_client
+    cache = repos.available_cache
+    params = {"start": "2025-09-01", "end": "2025-09-03"}
+    first = c.get("/api/cars/available", params=params)
+    assert len(cache.entries) == 1
+    hits = cache.hits.value
+    assert c.get("/api/cars/available", params=params).content == first.content
+    assert cache.hits.value == hits + 1
+
+    c.post("/api/bookings", json={"car_id": 1, "start_date": "2025-09-02", "end_date": "2025-09-02"})
+    r = c.get("/api/cars/available", params=params)
+    assert [car["id"] for car in r.json()["cars"]] == [2, 3]
+    assert len(cache.entries) == 2
@@ -1,3 +1,8 @@
+import json
+from datetime import date
+
+from app.service.compactor import compact_bookings
+
 def detail_text(resp):
     d = resp.json().get("detail")
     if isinstance(d, str):
@@ -74,3 +79,168 @@ def test_create_booking_by_seats_when_none_available(client):
     })
     assert r2.status_code == 400
     assert "no available car" in detail_text(r2).lower()
+
+def test_bookings_by_car_filters_by_window(client):
+    for start, end in (("2025-03-01", "2025-03-02"), ("2025-03-10", "2025-03-12"), ("2025-04-01", "2025-04-01")):
+        assert client.post("/api/bookings", json={"car_id": 1, "start_date": start, "end_date": end}).status_code == 201
+    assert client.post("/api/bookings", json={
+        "car_id": 2, "start_date": "2025-03-10", "end_date": "2025-03-12"
+    }).status_code == 201
+
+    assert len(client.get("/api/bookings/by-car/1").json()) == 3
+    r = client.get("/api/bookings/by-car/1", params={"start": "2025-03-02", "end": "2025-03-10"})
+    assert [(b["start_date"], b["end_date"]) for b in r.json()] == [
+        ("2025-03-01", "2025-03-02"), ("2025-03-10", "2025-03-12")
+    ]
+
+def test_list_bookings_cursor_pages_and_ndjson_stream(client):
+    for day in range(1, 6):
+        d = f"2025-05-0{day}"
+        assert client.post("/api/bookings", json={"car_id": 1, "start_date": d, "end_date": d}).status_code == 201
+
+    r1 = client.get("/api/bookings", params={"limit": 2})
+    assert [b["id"] for b in r1.json()] == [1, 2]
+    cursor = r1.headers["X-Next-After-Id"]
+    r2 = client.get("/api/bookings", params={"limit": 2, "after_id": cursor})
+    r3 = client.get("/api/bookings", params={"limit": 2, "after_id": r2.headers["X-Next-After-Id"]})
+    assert [b["id"] for b in r2.json()] == [3, 4]
+    assert [b["id"] for b in r3.json()] == [5]
+    assert "X-Next-After-Id" not in r3.headers
+
+    r = client.get("/api/bookings", params={"format": "ndjson", "after_id": 2})
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert [b["id"] for b in lines] == [3, 4, 5]
+    assert lines[0]["start_date"] == "2025-05-03"
+
+    cars = client.get("/api/cars", params={"format": "ndjson"}).text.splitlines()
+    assert len(cars) == 3
+
+def test_batch_booking_all_or_nothing_and_best_effort(client):
+    items = [
+        {"car_id": 1, "start_date": "2025-06-01", "end_date": "2025-06-03"},
+        {"seats": 5, "start_date": "2025-06-01", "end_date": "2025-06-03"},
+        {"seats": 5, "start_date": "2025-06-02", "end_date": "2025-06-02"},
+    ]
+    r = client.post("/api/bookings/batch", json={"items": items})
+    assert r.status_code == 400
+    assert r.json()["detail"]["failed"] == [{"index": 2, "detail": "No available car with the requested number of seats for that period"}]
+    assert client.get("/api/bookings").json() == []
+
+    r = client.post("/api/bookings/batch", json={"items": items, "mode": "best_effort"})
+    assert r.status_code == 201, r.text
+    data = r.json()
+    assert [(b["car_id"], b["total_price"]) for b in data["created"]] == [(1, 150.0), (2, 210.0)]
+    assert [f["index"] for f in data["failed"]] == [2]
+    assert len(client.get("/api/bookings").json()) == 2
+
+def test_seed_fleet_is_reproducible_and_non_overlapping(client):
+    r = client.post("/api/seed/fleet", params={"cars": 50, "bookings": 2000, "seed": 3})
+    assert r.status_code == 200, r.text
+    assert r.json()["cars"] == 50 and r.json()["bookings"] == 2000
+
+    cars = client.get("/api/cars").json()
+    bookings = client.get("/api/bookings").json()
+    assert len(cars) == 50 and len(bookings) == 2000
+    assert [b["id"] for b in bookings] == list(range(1, 2001))
+
+    by_car = {}
+    for b in bookings:
+        by_car.setdefault(b["car_id"], []).append((b["start_date"], b["end_date"]))
+    for spans in by_car.values():
+        spans.sort()
+        assert all(prev[1] < nxt[0] for prev, nxt in zip(spans, spans[1:]))
+
+    client.post("/api/seed/fleet", params={"cars": 50, "bookings": 2000, "seed": 3})
+    assert client.get("/api/bookings").json() == bookings
+
+    # generated data is live: the next booking gets the next id
+    r = client.post("/api/bookings", json={"car_id": 1, "start_date": "2099-01-01", "end_date": "2099-01-02"})
+    assert r.status_code == 201 and r.json()["id"] == 2001
+
+def test_conflict_alternatives_ranking(client):
+    for make, price in (("Tesla", 52.0), ("Fiat", 25.0), ("Toyota", 90.0)):  # ids 4, 5, 6
+        client.post("/api/cars", json={"make": make, "model": "X", "seats": 5, "daily_price": price})
+    span = {"start_date": "2025-12-01", "end_date": "2025-12-03"}
+    assert client.post("/api/bookings", json={"car_id": 1, **span}).status_code == 201
+    assert client.post("/api/bookings", json={"car_id": 4, **span}).status_code == 201
+
+    def alternatives(**params):
+        r = client.post("/api/bookings", params=params, json={"car_id": 1, **span})
+        assert r.status_code == 400
+        return [a["id"] for a in r.json()["detail"]["alternatives"]]
+
+    assert alternatives() == [5, 2, 6]
+    assert alternatives(rank="nearest_price", alternatives=2) == [2, 5]
+    assert alternatives(rank="same_make", alternatives=2) == [6, 2]
+    assert alternatives(alternatives=0) == []
+    r = client.post("/api/bookings", params={"rank": "random"}, json={"car_id": 1, **span})
+    assert r.status_code == 422
+
+def test_booking_by_seats_strategies(client):
+    def by_seats(start, end, seats=5, **params):
+        return client.post("/api/bookings/by-seats", params=params,
+                           json={"seats": seats, "start_date": start, "end_date": end})
+
+    assert client.post("/api/bookings", json={"car_id": 2, "start_date": "2025-05-01", "end_date": "2025-05-05"}).status_code == 201
+    # best_fit fills the days right after car 2's booking; first_fit takes the lowest id
+    assert by_seats("2025-05-06", "2025-05-07", strategy="best_fit").json()["car_id"] == 2
+    assert by_seats("2025-05-08", "2025-05-09").json()["car_id"] == 1
+    assert by_seats("2025-06-01", "2025-06-02", strategy="cheapest").json()["car_id"] == 1
+
+    # both 5-seaters busy: refused unless larger cars are allowed
+    assert client.post("/api/bookings", json={"car_id": 1, "start_date": "2025-05-01", "end_date": "2025-05-02"}).status_code == 201
+    assert by_seats("2025-05-01", "2025-05-02").status_code == 400
+    r = by_seats("2025-05-01", "2025-05-02", allow_larger=True)
+    assert r.status_code == 201 and r.json()["car_id"] == 3
+
+def test_bulk_cancel_by_ids_and_filter(client):
+    spans = [(1, "2025-03-01", "2025-03-02"), (1, "2025-03-10", "2025-03-12"), (2, "2025-03-11", "2025-03-11"),
+             (3, "2025-04-01", "2025-04-03")]
+    ids = [client.post("/api/bookings", json={"car_id": c, "start_date": s, "end_date": e}).json()["id"]
+           for c, s, e in spans]
+
+    cancel = lambda body: client.request("DELETE", "/api/bookings", json=body)
+    r = cancel({"start_date": "2025-03-11", "end_date": "2025-03-31"})
+    assert r.status_code == 200, r.text
+    assert [b["id"] for b in r.json()["cancelled"]] == [ids[1], ids[2]]
+    assert set(r.json()["cancelled"][0]) == {"id", "car_id", "start_date", "end_date", "days"}
+
+    r = cancel({"ids": [ids[0], ids[3], 999], "car_id": 3})
+    assert [b["id"] for b in r.json()["cancelled"]] == [ids[3]]
+    assert [b["id"] for b in client.get("/api/bookings").json()] == [ids[0]]
+
+    assert cancel({}).status_code == 400
+    assert client.delete(f"/api/bookings/{ids[0]}").status_code == 204
+    assert client.delete(f"/api/bookings/{ids[0]}").status_code == 404
+
+def test_archived_bookings_still_block_their_car(lifespan_client):
+    c, repos = lifespan_client
+    assert c.post("/api/bookings", json={"car_id": 1, "start_date": "2025-01-01", "end_date": "2025-01-05"}).status_code == 201
+    assert compact_bookings(repos.bookings, repos.bookings_archive, today=date(2025, 7, 1), keep_days=30) == 1
+    assert c.get("/api/bookings").json() == []
+
+    r = c.post("/api/bookings", json={"car_id": 1, "start_date": "2025-01-02", "end_date": "2025-01-03"})
+    assert r.status_code == 400 and detail_text(r) == "Car already booked for that period"
+    r = c.post("/api/bookings/batch", json={"items": [{"car_id": 1, "start_date": "2025-01-04", "end_date": "2025-01-06"}]})
+    assert r.status_code == 400
+    r = c.post("/api/bookings/by-seats", json={"seats": 5, "start_date": "2025-01-01", "end_date": "2025-01-01"})
+    assert r.status_code == 201 and r.json()["car_id"] == 2
+    available = c.get("/api/cars/available", params={"start": "2025-01-01", "end": "2025-01-01"}).json()["cars"]
+    assert [car["id"] for car in available] == [3]
+
+def test_cancelling_reaches_archived_bookings(lifespan_client):
+    c, repos = lifespan_client
+    ids = [c.post("/api/bookings", json={"car_id": car, "start_date": "2025-01-01", "end_date": "2025-01-05"}).json()["id"]
+           for car in (1, 2)]
+    hot = c.post("/api/bookings", json={"car_id": 2, "start_date": "2025-06-20", "end_date": "2025-06-21"}).json()["id"]
+    assert compact_bookings(repos.bookings, repos.bookings_archive, today=date(2025, 7, 1), keep_days=30) == 2
+
+    assert c.delete(f"/api/bookings/{ids[0]}").status_code == 204
+    assert c.delete(f"/api/bookings/{ids[0]}").status_code == 404
+    assert c.post("/api/bookings", json={"car_id": 1, "start_date": "2025-01-02", "end_date": "2025-01-03"}).status_code == 201
+
+    r = c.request("DELETE", "/api/bookings", json={"car_id": 2})
+    assert r.status_code == 200
+    assert [b["id"] for b in r.json()["cancelled"]] == [hot, ids[1]]
+    assert repos.bookings_archive.list() == []
@@ -0,0 +1,143 @@
+import asyncio
+import time
+from pathlib import Path
+
+from app.api import logs_endpoints
+from app.api.logs_endpoints import follow, tail_lines
+
+def _write_lines(path: Path, start: int, count: int, mode: str = "a"):
+    with path.open(mode, encoding="utf-8") as f:
+        for i in range(start, start + count):
+            f.write(f"line {i}\n")
+
+def test_tail_reads_only_last_lines(tmp_path: Path):
+    log = tmp_path / "app.log"
+    _write_lines(log, 0, 10_000, "w")
+    assert tail_lines(log, 3, block=64) == ["line 9997\n", "line 9998\n", "line 9999\n"]
+    assert tail_lines(log, 20_000) == [f"line {i}\n" for i in range(10_000)]
+
+    with log.open("a", encoding="utf-8") as f:
+        f.write("no newline yet")
+    assert tail_lines(log, 2, block=7) == ["line 9999\n", "no newline yet"]
+
+def test_logs_endpoint_tail(client, monkeypatch, tmp_path: Path):
+    log = tmp_path / "tail.log"
+    _write_lines(log, 0, 500, "w")
+    monkeypatch.setattr("app.api.logs_endpoints.LOG_FILE", log)
+    r = client.get("/api/logs", params={"n": 2})
+    assert r.status_code == 200
+    assert r.text == "line 498\nline 499\n"
+
+def test_follow_survives_rotation(tmp_path: Path):
+    log = tmp_path / "app.log"
+    _write_lines(log, 0, 5, "w")
+
+    async def run():
+        seen = []
+        gen = follow(log, poll=0.01)
+        await gen.__anext__()  # opened at EOF, idle
+        _write_lines(log, 5, 2)
+        log.rename(tmp_path / "app.log.1")
+        _write_lines(tmp_path / "app.log.1", 7, 1)  # late write to the rotated file
+        _write_lines(log, 8, 2, "w")
+        async for line in gen:
+            if line is not None:
+                seen.append(line)
+            if len(seen) == 5:
+                break
+        await gen.aclose()
+        return seen
+
+    assert asyncio.run(run()) == [f"line {i}" for i in range(5, 10)]
+
+def test_follow_reads_bursts_in_bounded_chunks(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(logs_endpoints, "_BLOCK", 16)
+    log = tmp_path / "app.log"
+    log.write_text("")
+    reads = []
+    real_read = logs_endpoints._Follower.read
+
+    def read(self):
+        chunk = real_read(self)
+        reads.append(len(chunk))
+        return chunk
+    monkeypatch.setattr(logs_endpoints._Follower, "read", read)
+
+    async def run():
+        seen = []
+        gen = follow(log, poll=0.01)
+        await gen.__anext__()
+        _write_lines(log, 0, 200)
+        async for line in gen:
+            if line is not None:
+                seen.append(line)
+            if len(seen) == 200:
+                break
+        await gen.aclose()
+        return seen
+
+    assert asyncio.run(run()) == [f"line {i}" for i in range(200)]
+    assert max(reads) == 16
+
+def test_follow_reads_a_file_created_after_the_stream_started(tmp_path: Path):
+    log = tmp_path / "app.log"
+
+    async def run():
+        seen = []
+        gen = follow(log, poll=0.01)
+        await gen.__anext__()  # no file yet, idle
+        _write_lines(log, 0, 3, "w")
+        async for line in gen:
+            if line is not None:
+                seen.append(line)
+            if len(seen) == 3:
+                break
+        await gen.aclose()
+        return seen
+
+    assert asyncio.run(asyncio.wait_for(run(), 5)) == ["line 0", "line 1", "line 2"]
+
+def test_queue_logging_rotates_json_lines(tmp_path: Path, monkeypatch):
+    import json, logging
+    from app.core.logger import init_logging, shutdown_logging
+
+    monkeypatch.setattr(logging.getLogger(), "handlers", [])
+    monkeypatch.setenv("LOG_FORMAT", "json")
+    monkeypatch.setenv("LOG_MAX_BYTES", "2000")
+    monkeypatch.setenv("LOG_BACKUPS", "2")
+    log = tmp_path / "app.log"
+    init_logging(log)
+    try:
+        for i in range(100):
+            logging.getLogger("app.test").info("event i=%d", i)
+    finally:
+        shutdown_logging()
+
+    assert (tmp_path / "app.log.1").exists() and (tmp_path / "app.log.2").exists()
+    assert not (tmp_path / "app.log.3").exists()
+    last = json.loads(log.read_text(encoding="utf-8").splitlines()[-1])
+    assert last["msg"] == "event i=99" and last["logger"] == "app.test" and last["level"] == "INFO"
+
+def test_workers_share_the_log_file_and_leave_rotation_outside(tmp_path: Path, monkeypatch):
+    import logging
+    from app.core.logger import init_logging, shutdown_logging
+
+    monkeypatch.setattr(logging.getLogger(), "handlers", [])
+    monkeypatch.setenv("WORKERS", "4")
+    monkeypatch.setenv("LOG_MAX_BYTES", "2000")
+    log = tmp_path / "app.log"
+    init_logging(log)
+    try:
+        for i in range(100):
+            logging.getLogger("app.test").info("event i=%d", i)
+        deadline = time.time() + 5
+        while len(log.read_text(encoding="utf-8").splitlines()) < 100 and time.time() < deadline:
+            time.sleep(0.01)
+        log.rename(tmp_path / "rotated.log")  # e.g. logrotate
+        logging.getLogger("app.test").info("after rotation")
+    finally:
+        shutdown_logging()
+
+    assert not (tmp_path / "app.log.1").exists()
+    assert len((tmp_path / "rotated.log").read_text(encoding="utf-8").splitlines()) == 100
+    assert log.read_text(encoding="utf-8").splitlines()[-1].endswith("app.test - after rotation")
@@ -0,0 +1,23 @@
+import re
+
+def test_metrics_endpoint(client):
+    client.get("/api/cars/1")
+    client.get("/api/cars/999")
+    client.post("/api/bookings", json={"car_id": 1, "start_date": "2025-01-01", "end_date": "2025-01-02"})
+
+    r = client.get("/api/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    text = r.text
+
+    def value(pattern):
+        m = re.search(rf"^{pattern} (\S+)$", text, re.M)
+        assert m, pattern
+        return float(m.group(1))
+
+    assert value(r'http_requests_total\{method="GET",route="/api/cars/\{car_id\}",status="404"\}') >= 1
+    assert value(r'http_request_duration_seconds_count\{method="POST",route="/api/bookings"\}') >= 1
+    assert value(r'http_request_duration_seconds_bucket\{method="GET",route="/api/cars/\{car_id\}",le="\+Inf"\}') >= 2
+    assert value(r'store_bytes_written_total\{store="bookings.json"\}') > 0
+    assert value(r'store_operation_duration_seconds_count\{store="cars.json",op="read"\}') > 0
+    assert value(r'store_lock_wait_seconds_count\{store="bookings.json",lock="stripe"\}') >= 1
@@ -0,0 +1,413 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from app.api.deps import build_repos
+from app.json_handler import binary_store, changeseq, codec, journal_store, json_store
+from app.json_handler.binary_store import BinaryStore
+from app.json_handler.json_store import JSONStore
+from app.json_handler.journal_store import JournalStore
+from app.json_handler.sqlite_store import SQLiteStore
+from app.json_handler.db_handler import GenericRepo
+from app.json_handler.factory import open_store
+from app.json_handler.migrate import migrate_json_to_binary, migrate_json_to_sqlite
+from app.service.analytics import UsageCache
+from app.service.compactor import Compactor, compact_bookings
+from app.service.interval_index import BookingIntervalIndex
+from app.service.occupancy import OccupancyBitsets
+
+def test_json_store_serves_repeat_reads_from_cache(tmp_path):
+    store = JSONStore(tmp_path / "cars.json")
+    repo = GenericRepo(store)
+    repo.insert({"make": "Toyota"})
+    before = store.cache_stats()
+
+    assert repo.get(1) == {"id": 1, "make": "Toyota"}
+    assert len(repo.list()) == 1
+
+    after = store.cache_stats()
+    assert after["hits"] == before["hits"] + 2
+    assert after["misses"] == before["misses"]
+
+def test_json_store_sees_writes_from_other_processes(tmp_path):
+    path = tmp_path / "cars.json"
+    repo = GenericRepo(JSONStore(path))
+    repo.insert({"make": "Toyota"})
+    assert len(repo.list()) == 1
+
+    # Simulate another worker replacing the file behind our back.
+    tmp = tmp_path / "other.json"
+    tmp.write_text(json.dumps({"_meta": {"seq": 2}, "items": {"1": {"make": "Toyota"}, "2": {"make": "VW"}}}))
+    os.replace(tmp, path)
+
+    assert [c["make"] for c in repo.list()] == ["Toyota", "VW"]
+    assert repo.insert({"make": "Tesla"})["id"] == 3
+
+def test_journal_store_replays_and_compacts(tmp_path):
+    path = tmp_path / "bookings.json"
+    repo = GenericRepo(JournalStore(path, compact_every=1000))
+    for day in range(1, 6):
+        repo.insert({"car_id": 1, "start_date": f"2025-01-0{day}"})
+    assert repo.delete(2)
+    assert not repo.delete(2)
+
+    journal = path.with_name("bookings.json.journal")
+    assert len(journal.read_text().splitlines()) == 1 + 6
+    # The snapshot is untouched until compaction.
+    assert json.loads(path.read_text())["items"] == {}
+
+    # A torn trailing record (crash mid-append) is ignored and overwritten.
+    with journal.open("ab") as f:
+        f.write(b'{"op":"put","id":9')
+    fresh = GenericRepo(JournalStore(path))
+    assert [b["id"] for b in fresh.list()] == [1, 3, 4, 5]
+    assert fresh.insert({"car_id": 2})["id"] == 6
+
+    fresh.store.compact()
+    assert len(journal.read_text().splitlines()) == 1
+    assert sorted(json.loads(path.read_text())["items"]) == ["1", "3", "4", "5", "6"]
+    assert [b["id"] for b in repo.list()] == [1, 3, 4, 5, 6]
+    assert repo.insert({"car_id": 3})["id"] == 7
+
+def test_json_engine_folds_a_leftover_journal(tmp_path, monkeypatch):
+    monkeypatch.setenv("BOOKINGS_STORE", "journal")
+    journalled = GenericRepo(open_store("bookings", tmp_path))
+    for car_id in (1, 2, 3):
+        journalled.insert({"car_id": car_id})
+
+    monkeypatch.setenv("BOOKINGS_STORE", "json")
+    repo = GenericRepo(open_store("bookings", tmp_path))
+    assert [b["id"] for b in repo.list()] == [1, 2, 3]
+    assert not (tmp_path / "bookings.json.journal").exists()
+    assert repo.insert({"car_id": 9})["id"] == 4
+
+    monkeypatch.setenv("BOOKINGS_STORE", "journal")
+    assert GenericRepo(open_store("bookings", tmp_path)).list() == repo.list()
+
+def test_sqlite_store_matches_repo_semantics_and_migrates(tmp_path):
+    src = GenericRepo(JSONStore(tmp_path / "bookings.json"))
+    src.insert({"car_id": 1, "start_date": "2025-01-01", "end_date": "2025-01-03", "days": 3})
+    src.insert({"car_id": 2, "start_date": "2025-01-02", "end_date": "2025-01-02", "days": 1})
+    src.delete(1)
+
+    store = SQLiteStore(tmp_path / "app.db", "bookings", [("car_id", "start_date", "end_date")])
+    assert migrate_json_to_sqlite(tmp_path / "bookings.json", store) == 1
+
+    repo = GenericRepo(store)
+    assert repo.list() == src.list()
+    assert repo.insert({"car_id": 1, "start_date": "2025-01-05", "end_date": "2025-01-06", "days": 2})["id"] == 3
+    assert [b["id"] for b in repo.find(car_id=1)] == [3]
+    assert repo.get(1) is None and repo.delete(3) and not repo.delete(3)
+
+    index = repo.view(BookingIntervalIndex)
+    assert not index.is_free(2, date(2025, 1, 1), date(2025, 1, 2))
+    assert index.is_free(2, date(2025, 1, 3), date(2025, 1, 9))
+    plan = store.execute("EXPLAIN QUERY PLAN " + index._conflict_sql, (2, "2025-01-02", "2025-01-01")).fetchall()
+    assert "ix_bookings_car_id_start_date_end_date" in str(plan)
+
+def test_find_runs_the_same_query_on_every_backend(tmp_path):
+    stores = [
+        JSONStore(tmp_path / "a.json"),
+        JournalStore(tmp_path / "b.json"),
+        SQLiteStore(tmp_path / "app.db", "bookings", [("car_id", "start_date", "end_date")]),
+        BinaryStore(tmp_path / "c.bin"),
+    ]
+    rows = [(1, "2025-01-05"), (2, "2025-01-01"), (1, "2025-01-01"), (1, "2025-01-09"), (2, "2025-01-03")]
+    results = []
+    for store in stores:
+        repo = GenericRepo(store)
+        for car_id, start in rows:
+            repo.insert({"car_id": car_id, "start_date": start, "end_date": start})
+        results.append((
+            [b["id"] for b in repo.find(car_id=1)],
+            [b["id"] for b in repo.find(car_id=1, start_date__gte=date(2025, 1, 2), order_by="-start_date")],
+            [b["id"] for b in repo.find(order_by="start_date", limit=2, offset=1)],
+            [b["id"] for b in repo.find(id__gt=2, limit=2)],
+        ))
+    assert results[0] == ([1, 3, 4], [4, 1], [3, 5], [3, 4])
+    assert results[0] == results[1] == results[2] == results[3]
+
+def test_transaction_find_sees_committed_rows_only(tmp_path):
+    repo = GenericRepo(JSONStore(tmp_path / "bookings.json"))
+    repo.insert({"car_id": 1, "start_date": "2025-01-01"})
+    with repo.transaction(stripe=1) as tx:
+        tx.insert({"car_id": 1, "start_date": "2025-01-05"})
+        assert [b["id"] for b in tx.find(car_id=1, order_by="-start_date")] == [1]
+    assert [b["id"] for b in repo.find(car_id=1, order_by="-start_date")] == [2, 1]
+
+def test_lifespan_shares_repos_and_honours_data_dir(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    data_dir = tmp_path / "elsewhere"
+    monkeypatch.setattr("app.api.deps.DATA_DIR", data_dir)
+    with TestClient(app) as c:
+        repos = app.state.repos
+        r = c.post("/api/cars", json={"make": "Fiat", "model": "500", "seats": 4, "daily_price": 30.0})
+        assert r.status_code == 201
+        assert c.get(f"/api/cars/{r.json()['id']}").status_code == 200
+        assert app.state.repos is repos
+        assert repos.cars.store.path == data_dir / "cars.json"
+    assert (data_dir / "cars.json").exists()
+    assert app.state.repos is None
+
+def test_fast_codec_writes_compact_tables_readable_by_either_mode(tmp_path, monkeypatch):
+    path = tmp_path / "bookings.json"
+    JSONStore(path).write({"_meta": {"seq": 1}, "items": {"1": {"car_id": 1, "start_date": "2025-01-01"}}})
+    assert '"car_id": 1' in path.read_text(encoding="utf-8")
+
+    monkeypatch.setattr(codec, "FAST", True)
+    monkeypatch.setattr(codec, "_ORJSON", codec.orjson is not None)
+    repo = GenericRepo(JSONStore(path))
+    assert repo.get(1) == {"id": 1, "car_id": 1, "start_date": "2025-01-01"}
+    repo.insert({"car_id": 2, "start_date": "2025-02-01"})
+    assert path.read_text(encoding="utf-8").startswith('{"_meta":{"seq":2,')
+
+    monkeypatch.setattr(codec, "FAST", False)
+    monkeypatch.setattr(codec, "_ORJSON", False)
+    assert json.loads(path.read_text(encoding="utf-8"))["items"]["2"] == {"car_id": 2, "start_date": "2025-02-01"}
+
+def test_interval_index_columns_follow_inserts_and_deletes(tmp_path):
+    repo = GenericRepo(JSONStore(tmp_path / "bookings.json"))
+    repo.insert({"car_id": 1, "start_date": "2025-01-10", "end_date": "2025-01-12", "days": 3})
+    repo.insert({"car_id": 1, "start_date": "2025-01-01", "end_date": "2025-01-03", "days": 3})
+    index = repo.view(BookingIntervalIndex)
+    ivs = index.by_car[1]
+    assert list(ivs.ids) == [2, 1] and ivs.starts.typecode == "i"
+
+    repo.insert({"car_id": 1, "start_date": "2025-01-05", "end_date": "2025-01-06", "days": 2})
+    index = repo.view(BookingIntervalIndex)
+    assert list(index.by_car[1].ids) == [2, 3, 1]
+    assert index.conflict(1, date(2025, 1, 6), date(2025, 1, 9)) == 3
+    assert index.is_free(1, date(2025, 1, 7), date(2025, 1, 9))
+
+    repo.delete(3)
+    index = repo.view(BookingIntervalIndex)
+    assert list(index.by_car[1].ids) == [2, 1]
+    assert index.is_free(1, date(2025, 1, 4), date(2025, 1, 9))
+    assert index.conflict(1, date(2025, 1, 12), date(2025, 1, 20)) == 1
+
+# Older data files can hold overlapping bookings of one car (written before
+# check-and-insert was atomic); a long booking must still block later days.
+@pytest.mark.parametrize("engine", ["json", "sqlite"])
+def test_interval_index_handles_overlapping_bookings(tmp_path, engine):
+    if engine == "json":
+        store = JSONStore(tmp_path / "bookings.json")
+    else:
+        store = SQLiteStore(tmp_path / "app.db", "bookings", [("car_id", "start_date", "end_date")])
+    repo = GenericRepo(store)
+    repo.insert({"car_id": 1, "start_date": "2025-01-01", "end_date": "2025-01-10", "days": 10})
+    repo.insert({"car_id": 1, "start_date": "2025-01-02", "end_date": "2025-01-03", "days": 2})
+    index = repo.view(BookingIntervalIndex)
+    assert index.conflict(1, date(2025, 1, 5), date(2025, 1, 6)) == 1
+    assert not index.is_free(1, date(2025, 1, 10), date(2025, 1, 12))
+    assert index.gaps(1, date(2025, 1, 13), date(2025, 1, 14)) == (2, None)
+    assert sorted(index.spans(date(2025, 1, 5), date(2025, 1, 5))) == [(1, date(2025, 1, 1).toordinal(), date(2025, 1, 10).toordinal())]
+
+    repo.insert({"car_id": 1, "start_date": "2025-01-20", "end_date": "2025-01-21", "days": 2})
+    repo.delete(1)
+    index = repo.view(BookingIntervalIndex)
+    assert index.is_free(1, date(2025, 1, 5), date(2025, 1, 19))
+    assert index.gaps(1, date(2025, 1, 5), date(2025, 1, 6)) == (1, 13)
+
+def test_compactor_archives_past_bookings_and_purges_journal(tmp_path):
+    hot = GenericRepo(JournalStore(tmp_path / "bookings.json"))
+    archive = GenericRepo(JSONStore(tmp_path / "bookings_archive.json"))
+    for car_id, start, end in ((1, "2025-01-01", "2025-01-03"), (2, "2025-05-01", "2025-05-02"),
+                               (1, "2025-06-20", "2025-06-22"), (2, "2025-07-01", "2025-07-01")):
+        hot.insert({"car_id": car_id, "start_date": start, "end_date": end, "days": 1})
+    hot.delete_many([4])
+
+    assert compact_bookings(hot, archive, today=date(2025, 7, 1), keep_days=30) == 2
+    assert [b["id"] for b in archive.list()] == [1, 2]
+    assert [b["id"] for b in hot.list()] == [3]
+    journal = tmp_path / "bookings.json.journal"
+    assert len(journal.read_bytes().splitlines()) == 1  # header only
+    assert hot.insert({"car_id": 1, "start_date": "2025-08-01", "end_date": "2025-08-01", "days": 1})["id"] == 5
+
+    # nothing left to archive: a second run only compacts
+    hot.delete_many([5])
+    assert compact_bookings(hot, archive, today=date(2025, 7, 1), keep_days=30) == 0
+    assert len(journal.read_bytes().splitlines()) == 1
+    assert [b["id"] for b in GenericRepo(JournalStore(tmp_path / "bookings.json")).list()] == [3]
+
+def test_only_one_compactor_runs_per_data_dir(tmp_path, monkeypatch):
+    runs = []
+    monkeypatch.setattr("app.service.compactor.compact_bookings",
+                        lambda hot, archive: runs.append(threading.get_ident()))
+    repos = build_repos(tmp_path)
+    workers = [Compactor(repos, interval=0.01) for _ in range(3)]
+    for w in workers:
+        w.start()
+    time.sleep(0.3)
+    holder = next(w for w in workers if w._lock.is_locked)
+    holder.stop()
+    time.sleep(0.3)
+    seen = list(runs)
+    for w in workers:
+        w.stop()
+    repos.close()
+
+    # The holder ran alone; once it stopped, exactly one of the others took over.
+    blocks = [t for i, t in enumerate(seen) if i == 0 or seen[i - 1] != t]
+    assert len(blocks) == 2 and blocks[0] == holder._thread.ident
+
+def test_change_seq_refreshes_other_workers_incrementally(tmp_path, monkeypatch):
+    monkeypatch.setattr(changeseq, "CHANGE_SEQ", "mmap")
+    path = tmp_path / "bookings.json"
+    ours = GenericRepo(JSONStore(path))
+    ours.insert({"car_id": 1, "start_date": "2025-01-01", "end_date": "2025-01-03"})
+    index = ours.view(BookingIntervalIndex)
+
+    # A second worker: its own cached document and views on the same file.
+    monkeypatch.setattr(json_store, "_cache", {})
+    theirs = GenericRepo(JSONStore(path))
+    theirs.insert({"car_id": 1, "start_date": "2025-01-05", "end_date": "2025-01-07"})
+    theirs.delete(1)
+
+    assert ours.view(BookingIntervalIndex) is index  # updated, not rebuilt
+    assert index.is_free(1, date(2025, 1, 1), date(2025, 1, 3))
+    assert not index.is_free(1, date(2025, 1, 6), date(2025, 1, 6))
+    assert [b["id"] for b in ours.list()] == [2]
+
+    # A whole-table rewrite starts a new epoch: views are rebuilt.
+    theirs.store.write({"_meta": {"seq": 9}, "items": {}})
+    assert ours.view(BookingIntervalIndex) is not index
+    assert ours.list() == []
+    assert ours.insert({"car_id": 2, "start_date": "2025-02-01", "end_date": "2025-02-01"})["id"] == 10
+
+    # Journal tables follow the other worker's appends the same way.
+    jpath = tmp_path / "journal.json"
+    ours = GenericRepo(JournalStore(jpath))
+    ours.insert({"car_id": 1})
+    monkeypatch.setattr(journal_store, "_states", {})
+    GenericRepo(JournalStore(jpath)).insert({"car_id": 2})
+    assert [b["car_id"] for b in ours.list()] == [1, 2]
+
+def _booking(car_id, start, end=None):
+    return {"car_id": car_id, "start_date": start, "end_date": end or start, "days": 1}
+
+def test_binary_store_matches_repo_semantics_and_migrates(tmp_path):
+    src = GenericRepo(JSONStore(tmp_path / "bookings.json"))
+    src.insert({"car_id": 1, "start_date": "2025-01-01", "end_date": "2025-01-03", "days": 3})
+    src.insert({"car_id": 2, "start_date": "2025-01-02", "end_date": "2025-01-02", "days": 1})
+    src.delete(1)
+
+    store = BinaryStore(tmp_path / "bookings.bin")
+    assert migrate_json_to_binary(tmp_path / "bookings.json", store) == 1
+    repo = GenericRepo(store)
+    assert repo.list() == src.list()
+    assert repo.get(1) is None and repo.get(2)["start_date"] == "2025-01-02"
+    index = repo.view(BookingIntervalIndex)
+    assert not index.is_free(2, date(2025, 1, 1), date(2025, 1, 2))
+
+    # Past the first 1024 slots the file is rewritten with room to spare;
+    # ids, rows and views carry over.
+    created = repo.store.apply([("insert", _booking(3, "2026-01-01")) for _ in range(1500)])
+    assert created[0][1] == 3 and created[-1][1] == 1502
+    assert repo.view(BookingIntervalIndex) is index
+    assert not index.is_free(3, date(2026, 1, 1), date(2026, 1, 1))
+    assert repo.get(1502) == {"id": 1502, **_booking(3, "2026-01-01")} and len(repo.list()) == 1501
+    with pytest.raises(ValueError):
+        repo.insert({"car_id": 1, "start_date": "2025-01-01", "end_date": "2025-01-01", "note": "x"})
+
+# Views that do not need the rows (UsageCache) or can read the backend's own
+# format (OccupancyBitsets) are built without turning every row into a dict.
+@pytest.mark.parametrize("engine", ["binary", "sqlite"])
+def test_views_build_without_materialising_rows(tmp_path, monkeypatch, engine):
+    if engine == "binary":
+        store = BinaryStore(tmp_path / "bookings.bin")
+    else:
+        store = SQLiteStore(tmp_path / "app.db", "bookings", [("car_id", "start_date", "end_date")])
+    repo = GenericRepo(store)
+    for b in (_booking(1, "2025-01-01", "2025-01-10"), _booking(1, "2025-01-02", "2025-01-03"),
+              _booking(2, "2025-01-04", "2025-01-08")):
+        repo.insert(b)
+
+    def materialise(*args):
+        raise AssertionError("view build read every row")
+    monkeypatch.setattr(type(store), "read", materialise)
+    monkeypatch.setattr(type(store), "_items", materialise, raising=False)
+    assert isinstance(repo.view(UsageCache), UsageCache)
+    assert repo.view(OccupancyBitsets).busy(date(2025, 1, 2), date(2025, 1, 5)) == {1: 0b1111, 2: 0b1100}
+
+def test_binary_store_keeps_the_last_commit_after_crashes(tmp_path, monkeypatch):
+    path = tmp_path / "bookings.bin"
+    repo = GenericRepo(BinaryStore(path))
+    repo.insert(_booking(1, "2025-01-01"))
+    repo.insert(_booking(2, "2025-01-02"))
+    before = repo.list()
+
+    def reopen():
+        monkeypatch.setattr(binary_store, "_states", {})
+        return GenericRepo(BinaryStore(path))
+
+    # Records and bitmap written, header not: the batch never happened.
+    def crash(self, hdr):
+        raise RuntimeError("crash")
+    with monkeypatch.context() as m:
+        m.setattr(binary_store._File, "write_header", crash)
+        with pytest.raises(RuntimeError):
+            repo.store.apply([("insert", _booking(3, "2025-01-03")), ("delete", 1)])
+    repo = reopen()
+    assert repo.list() == before
+    assert repo.insert(_booking(3, "2025-01-03"))["id"] == 3
+
+    # A torn header write falls back to the previous header and its bitmap.
+    gen = repo.store._file().header()[0]
+    with path.open("r+b") as f:
+        f.seek(binary_store._HDR_AT + (gen & 1) * binary_store._HDR_SLOT + 8)
+        f.write(b"\xff\xff")
+    repo = reopen()
+    assert repo.list() == before and repo.version() == 2
+
+    # Retired but never replaced (crash inside a rewrite): still the table.
+    with monkeypatch.context() as m:
+        m.setattr(binary_store.os, "replace", crash)
+        with pytest.raises(RuntimeError):
+            repo.store.write({"_meta": {"seq": 0}, "items": {}})
+    assert repo.store._state.file.retired()
+    assert repo.list() == before and not repo.store._state.file.retired()
+    assert [p.name for p in tmp_path.iterdir() if not p.name.startswith("bookings.bin")] == []
+
+_CHURN = """
+import sys
+from pathlib import Path
+from app.json_handler.binary_store import BinaryStore
+store = BinaryStore(Path(sys.argv[1]))
+batch = store.version()
+while True:
+    batch += 1
+    live = [int(k) for k in store.read()["items"]]
+    store.apply([("delete", i) for i in live] + [("insert", {"car_id": batch, "start_date": "2025-01-01",
+                                                             "end_date": "2025-01-02"})] * 4)
+"""
+
+# Each commit replaces the 4 live rows with 4 new ones of one car, so after a
+# kill -9 at any point exactly one complete batch must be live.
+def test_binary_store_survives_kill_during_commits(tmp_path, monkeypatch):
+    path = tmp_path / "bookings.bin"
+    root = Path(__file__).resolve().parents[1]
+    env = {**os.environ, "PYTHONPATH": str(root)}
+    for round_ in range(4):
+        proc = subprocess.Popen([sys.executable, "-c", _CHURN, str(path)], env=env)
+        deadline = time.time() + 30
+        while not (path.exists() and BinaryStore(path).version() > 300 * (round_ + 1)) and time.time() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.01 * round_)
+        proc.kill()
+        proc.wait()
+
+        monkeypatch.setattr(binary_store, "_states", {})
+        repo = GenericRepo(BinaryStore(path))
+        rows = repo.list()
+        assert len(rows) == 4 and len({b["car_id"] for b in rows}) == 1, rows
+        assert repo.store._file().header()[2] == 4
+        assert all(b["end_date"] == "2025-01-02" and b["days"] == 2 for b in rows)